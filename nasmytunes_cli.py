@@ -7,8 +7,6 @@ import os
 import sys
 import argparse
 import tempfile
-import zipfile
-import platform
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -19,23 +17,13 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 load_dotenv()
 
 def get_ffmpeg_path():
-    """Get the path to bundled FFmpeg executable"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    system = platform.system().lower()
-    
-    if system == 'windows':
-        ffmpeg_path = os.path.join(script_dir, 'ffmpeg', 'ffmpeg.exe')
-    else:
-        ffmpeg_path = os.path.join(script_dir, 'ffmpeg', 'ffmpeg')
-    
-    if os.path.exists(ffmpeg_path):
-        return ffmpeg_path
-    
-    # Fallback to system FFmpeg
-    return 'ffmpeg'
+    """Get the path to FFmpeg (FFMPEG_PATH, bundled, then system FFmpeg)"""
+    from src.utils.ffmpeg_locator import ffmpeg_locator
+    return ffmpeg_locator.binary()
 
 class NasmyTunesCLI:
     def __init__(self):
+        self.ydl_pool = None
         self.setup_spotify()
     
     def setup_spotify(self):
@@ -74,36 +62,22 @@ class NasmyTunesCLI:
         except:
             return None
     
-    def validate_playlist_access(self, playlist_id):
-        """Check if playlist is accessible before full processing"""
-        try:
-            # Try to get basic playlist info first
-            playlist = self.sp.playlist(playlist_id, fields="name,public,owner,tracks.total")
-            
-            # Check if playlist is public
-            if not playlist.get('public', True):
-                print("⚠️  Warning: This playlist appears to be private")
-                print("   You can only convert public playlists")
-                return False
-                
-            print(f"✅ Playlist found: {playlist.get('name', 'Unknown')}")
-            print(f"📊 Total tracks: {playlist.get('tracks', {}).get('total', 0)}")
-            return True
-            
-        except Exception as e:
-            if "404" in str(e):
-                print("❌ Playlist not found or not accessible")
-                print("💡 Possible reasons:")
-                print("   • Playlist is private or deleted")
-                print("   • Playlist is region-restricted")
-                print("   • Invalid playlist URL")
-                print("   • You don't have access to this playlist")
-            else:
-                print(f"❌ Error accessing playlist: {e}")
+    def validate_playlist_access(self, playlist):
+        """Check the playlist metadata before fetching the remaining tracks"""
+        # Check if playlist is public
+        if not playlist.get('public', True):
+            print("⚠️  Warning: This playlist appears to be private")
+            print("   You can only convert public playlists")
             return False
+        
+        print(f"✅ Playlist found: {playlist.get('name', 'Unknown')}")
+        print(f"📊 Total tracks: {playlist.get('tracks', {}).get('total', 0)}")
+        return True
     
     def get_playlist_tracks(self, playlist_url):
         """Get tracks from Spotify playlist"""
+        from src.utils.spotify_loader import fetch_playlist_metadata, fetch_playlist_tracks, track_summary
+        
         print(f"🔍 Analyzing playlist...")
         
         playlist_id = self.extract_playlist_id(playlist_url)
@@ -113,33 +87,18 @@ class NasmyTunesCLI:
             print("   https://open.spotify.com/playlist/PLAYLIST_ID")
             return None, []
         
-        # Validate playlist access first
-        if not self.validate_playlist_access(playlist_id):
-            print("\n🎵 Try these working playlists instead:")
-            print("   • https://open.spotify.com/playlist/5VZvJmyPmCIsY6rJ5JJ10X")
-            print("   • https://open.spotify.com/playlist/37i9dQZF1DX0XUsuxWHRQd")
-            print("   • Or use any PUBLIC playlist you own")
-            return None, []
-        
         try:
-            playlist = self.sp.playlist(playlist_id)
-            tracks = []
+            # One filtered request for the metadata and first page; validation needs no extra call
+            playlist = fetch_playlist_metadata(self.sp, playlist_id)
             
-            results = self.sp.playlist_tracks(playlist_id)
-            while results:
-                for item in results['items']:
-                    if item['track'] and item['track']['type'] == 'track':
-                        track = item['track']
-                        tracks.append({
-                            'name': track['name'],
-                            'artists': [artist['name'] for artist in track['artists']],
-                            'duration_ms': track['duration_ms']
-                        })
-                
-                if results['next']:
-                    results = self.sp.next(results)
-                else:
-                    results = None
+            if not self.validate_playlist_access(playlist):
+                print("\n🎵 Try these working playlists instead:")
+                print("   • https://open.spotify.com/playlist/5VZvJmyPmCIsY6rJ5JJ10X")
+                print("   • https://open.spotify.com/playlist/37i9dQZF1DX0XUsuxWHRQd")
+                print("   • Or use any PUBLIC playlist you own")
+                return None, []
+            
+            tracks = [track_summary(track) for track in fetch_playlist_tracks(self.sp, playlist_id, playlist)]
             
             print(f"✅ Found playlist: {playlist['name']}")
             print(f"📊 Total tracks: {len(tracks)}")
@@ -168,21 +127,34 @@ class NasmyTunesCLI:
             
             return None, []
     
-    def download_track(self, track_name, artists, output_dir):
+    def download_track(self, track_name, artists, output_dir, duration_ms=None, album=None, year=None):
         """Download a single track using the most reliable method"""
         from youtube_search import YoutubeSearch
-        import yt_dlp
+        from src.utils.search_cache import search_cache
+        from src.utils.audio_cache import audio_cache
+        from src.utils.transcoder import first_audio_output
+        from src.utils.track_matcher import rank_candidates, verify_candidates
+        from src.utils.ydl_pool import YDLPool
         import random
         
         print(f"  🎵 {track_name} by {', '.join(artists)}")
         
-        # Search YouTube
+        # Search YouTube (shared search cache first)
         search_query = f"{track_name} {' '.join(artists)}"
         try:
-            results = YoutubeSearch(search_query, max_results=2).to_dict()
+            results = search_cache.get_or_search(
+                track_name, artists, duration_ms,
+                lambda: rank_candidates(YoutubeSearch(search_query, max_results=5).to_dict(),
+                                        track_name, artists, duration_ms, album, year)[:2]
+            )
             if not results:
                 return False, "No YouTube results found"
             
+            # Skip results whose length rules them out before downloading anything
+            results = verify_candidates(results, track_name, artists, duration_ms, album, year)
+            if not results:
+                return False, "No YouTube result matches the track length"
+            
             # Try each result
             for result in results:
                 video_url = f"https://www.youtube.com/watch?v={result['id']}"
@@ -192,6 +164,12 @@ class NasmyTunesCLI:
                 safe_name = "".join(c for c in f"{track_name} - {', '.join(artists)}" 
                                   if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
                 
+                # Reuse an earlier transcode of this video if we have one
+                if audio_cache.link_into(result['id'], os.path.join(output_dir, f"{safe_name}.mp3"), bitrate='128'):
+                    print(f"    ⚡ Cached: {result['title'][:50]}")
+                    search_cache.record_choice(track_name, artists, result, duration_ms)
+                    return True, f"Cached: {result['title']}"
+                
                 # Get FFmpeg path
                 ffmpeg_path = get_ffmpeg_path()
                 
@@ -219,15 +197,21 @@ class NasmyTunesCLI:
                     'retries': 3,
                 }
                 
+                # One yt-dlp instance for the whole run; only the output name changes per track
+                if self.ydl_pool is None:
+                    self.ydl_pool = YDLPool()
+                
                 try:
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        ydl.download([video_url])
+                    file_paths = self.ydl_pool.download('cli', lambda: ydl_opts, [video_url],
+                                                        outtmpl=ydl_opts['outtmpl'])
                     
-                    # Check if file was created
-                    for file in os.listdir(output_dir):
-                        if safe_name.lower() in file.lower() and file.endswith('.mp3'):
-                            print(f"    ✅ Success: {file}")
-                            return True, f"Downloaded: {result['title']}"
+                    # yt-dlp reports the final file; no need to scan the directory
+                    output_file = first_audio_output(file_paths)
+                    if output_file:
+                        print(f"    ✅ Success: {os.path.basename(output_file)}")
+                        search_cache.record_choice(track_name, artists, result, duration_ms)
+                        audio_cache.insert(result['id'], output_file, bitrate='128')
+                        return True, f"Downloaded: {result['title']}"
                     
                 except Exception as e:
                     print(f"    ❌ Failed: {str(e)[:50]}...")
@@ -272,7 +256,10 @@ class NasmyTunesCLI:
                 success, message = self.download_track(
                     track['name'], 
                     track['artists'], 
-                    output_dir
+                    output_dir,
+                    duration_ms=track.get('duration_ms'),
+                    album=track.get('album'),
+                    year=track.get('year')
                 )
                 
                 if success:
@@ -289,10 +276,9 @@ class NasmyTunesCLI:
             zip_name = f"{playlist_name.replace(' ', '_')}.zip"
             zip_path = os.path.join(output_dir, zip_name)
             
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for mp3_file in mp3_files:
-                    file_path = os.path.join(output_dir, mp3_file)
-                    zipf.write(file_path, mp3_file)
+            # MP3s are stored as-is, recompressing them only costs time
+            from src.utils.zip_packager import write_zip
+            write_zip(zip_path, [(mp3_file, os.path.join(output_dir, mp3_file)) for mp3_file in mp3_files])
             
             print(f"\n📦 Created ZIP: {zip_path}")
         
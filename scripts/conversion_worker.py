@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Conversion worker for NasmyTunes
+
+Runs playlist conversions queued in Redis by the web tier. Start as many of
+these as needed with JOB_STORE=redis and REDIS_URL pointing at the same Redis
+instance as the web processes.
+"""
+import os
+import sys
+import time
+import logging
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+def main():
+    """Pull queued jobs and run them on the local conversion scheduler"""
+    from src.routes import conversion
+    from src.utils.conversion_scheduler import scheduler
+    from src.utils.artifact_reaper import reaper
+    
+    store = conversion.init_job_store(None)
+    if conversion.job_queue is None:
+        logger.error("The conversion worker needs JOB_STORE=redis")
+        sys.exit(1)
+    
+    # Job directories live on this host; keep them under the disk budget
+    reaper.start()
+    
+    logger.info(f"🚀 Conversion worker started with {scheduler.download_slots} download slots")
+    
+    while True:
+        # Leave jobs in Redis for other workers while this one is busy
+        if scheduler.stats()['active_jobs'] >= scheduler.max_active_jobs:
+            time.sleep(1)
+            continue
+        
+        job_id = conversion.job_queue.dequeue(timeout=5)
+        if not job_id:
+            continue
+        
+        try:
+            store.claim(job_id)
+        except KeyError:
+            logger.warning(f"Skipping job {job_id}: no longer in the job store")
+            continue
+        
+        logger.info(f"Starting job {job_id}")
+        conversion.schedule_conversion(job_id)
+
+if __name__ == '__main__':
+    main()
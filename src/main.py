@@ -1,6 +1,5 @@
 import os
 import sys
-import subprocess
 from dotenv import load_dotenv
 
 # Environment variables loaded via .env file
@@ -11,34 +10,24 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
+from src.models.conversion_job import ConversionJob
 from src.routes.user import user_bp
 from src.routes.spotify import spotify_bp
 from src.routes.youtube import youtube_bp
-from src.routes.conversion import conversion_bp
+from src.routes.conversion import conversion_bp, init_job_store, transcode_pool
+from src.utils.conversion_scheduler import scheduler
+from src.utils.search_cache import search_cache
+from src.utils.audio_cache import audio_cache
+from src.utils.playlist_cache import playlist_cache
+from src.utils.strategy_runner import strategy_runner
+from src.utils.ffmpeg_locator import ffmpeg_locator
+from src.utils.artifact_reaper import reaper
 
 # Load environment variables
 load_dotenv()
 
-# Define FFmpeg path
-FFMPEG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'ffmpeg', 'ffmpeg.exe')
-
-# Check FFmpeg availability
-def check_ffmpeg():
-    try:
-        result = subprocess.run([FFMPEG_PATH, '-version'], capture_output=True, check=True, text=True)
-        print("✅ FFmpeg is available")
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
-        print(f"❌ FFmpeg not found: {e}")
-        print("Audio conversion may fail without FFmpeg")
-        return False
-
-# Check on startup (non-blocking)
-try:
-    ffmpeg_available = check_ffmpeg()
-except Exception as e:
-    print(f"FFmpeg check failed: {e}")
-    ffmpeg_available = False
+# Check FFmpeg availability and encoders on startup (non-blocking)
+ffmpeg_locator.start_probe()
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
@@ -52,12 +41,19 @@ app.register_blueprint(youtube_bp, url_prefix='/api/youtube')
 app.register_blueprint(conversion_bp, url_prefix='/api/convert')
 
 # uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
+    'DATABASE_URL', f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 with app.app_context():
     db.create_all()
 
+# Persist conversion jobs so every worker process can serve them
+init_job_store(app)
+
+# Remove expired jobs and keep job files under the disk budget
+reaper.start()
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for monitoring"""
@@ -101,13 +97,21 @@ def debug_info():
     """Debug endpoint to check system status"""
     import shutil
     debug_data = {
-        'ffmpeg_available': os.path.exists(FFMPEG_PATH),
-        'ffmpeg_path': FFMPEG_PATH if os.path.exists(FFMPEG_PATH) else None,
+        'ffmpeg_available': ffmpeg_locator.path is not None,
+        'ffmpeg_path': ffmpeg_locator.path,
+        'ffmpeg': ffmpeg_locator.stats(),
         'python_version': sys.version,
         'environment': os.environ.get('FLASK_ENV', 'unknown'),
         'spotify_configured': bool(os.getenv('SPOTIFY_CLIENT_ID')),
         'port': os.environ.get('PORT', '5001'),
         'demo_mode': os.getenv('DEMO_MODE', 'false').lower() == 'true',
+        'conversion_scheduler': scheduler.stats(),
+        'transcode_pool': transcode_pool.stats(),
+        'search_cache': search_cache.stats(),
+        'audio_cache': audio_cache.stats(),
+        'playlist_cache': playlist_cache.stats(),
+        'artifact_reaper': reaper.stats(),
+        'download_strategies': strategy_runner.stats(),
         'app_status': 'running'
     }
     return debug_data
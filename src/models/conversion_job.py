@@ -0,0 +1,39 @@
+import json
+from datetime import datetime
+from src.models.user import db
+
+class ConversionJob(db.Model):
+    __tablename__ = 'conversion_jobs'
+
+    id = db.Column(db.String(36), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    playlist_name = db.Column(db.String(255), nullable=False)
+    total_tracks = db.Column(db.Integer, nullable=False, default=0)
+    completed_tracks = db.Column(db.Integer, nullable=False, default=0)
+    failed_tracks = db.Column(db.Integer, nullable=False, default=0)
+    current_track = db.Column(db.String(512))
+    temp_dir = db.Column(db.String(512))
+    zip_path = db.Column(db.String(512))
+    error = db.Column(db.Text)
+    # Track lists and any other job fields, stored as JSON
+    data = db.Column(db.Text, nullable=False, default='{}')
+
+    COLUMNS = ('status', 'created_at', 'playlist_name', 'total_tracks', 'completed_tracks',
+               'failed_tracks', 'current_track', 'temp_dir', 'zip_path', 'error')
+
+    def __repr__(self):
+        return f'<ConversionJob {self.id} {self.status}>'
+
+    def update_from_dict(self, job):
+        for column in self.COLUMNS:
+            setattr(self, column, job.get(column))
+        self.data = json.dumps({k: v for k, v in job.items() if k not in self.COLUMNS})
+        self.updated_at = datetime.now()
+
+    def to_dict(self):
+        job = json.loads(self.data or '{}')
+        for column in self.COLUMNS:
+            job[column] = getattr(self, column)
+        return job
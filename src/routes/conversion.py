@@ -1,19 +1,25 @@
 import os
+import json
+import hashlib
 import tempfile
-import zipfile
 import shutil
 import random
-from flask import Blueprint, request, jsonify, send_file
-from youtube_search import YoutubeSearch
-import yt_dlp
-from src.utils.youtube_downloader import EnhancedYouTubeDownloader
-from src.utils.alternative_downloader import AlternativeAudioDownloader
-from src.utils.advanced_youtube_bypass import AdvancedYouTubeBypass
-from src.utils.simple_bypass import SimpleBypass
-from src.utils.authenticated_bypass import AuthenticatedBypass
+from flask import Blueprint, Response, request, jsonify, send_file
+from src.utils.conversion_scheduler import scheduler, SchedulerFullError
+from src.utils.job_store import InMemoryJobStore, create_job_store, create_job_queue
+from src.utils.job_events import JobEventLog, create_event_log
+from src.utils.zip_packager import IncrementalZipPackager, stream_zip
+from src.utils.transcoder import RAW_AUDIO_EXTENSIONS, TranscodePool, transcode_to_mp3
+from src.utils.search_cache import search_cache
+from src.utils.audio_cache import audio_cache
+from src.utils.artifact_reaper import reaper
+from src.utils.strategy_runner import strategy_runner
+from src.utils.deadline import Deadline, TrackTimeoutError, current_deadline, deadline_scope
+from src.utils.track_matcher import verify_candidates
 import threading
 import time
-from datetime import datetime, timedelta
+from functools import partial
+from datetime import datetime
 import uuid
 
 # User agents to rotate
@@ -27,8 +33,65 @@ USER_AGENTS = [
 
 conversion_bp = Blueprint('conversion', __name__)
 
-# Store conversion jobs in memory (in production, use Redis or database)
-conversion_jobs = {}
+# Conversion jobs, replaced by the configured persistent store in init_job_store()
+conversion_jobs = InMemoryJobStore()
+
+# Queue feeding separate conversion worker processes (JOB_STORE=redis only)
+job_queue = None
+
+# Per-track progress events streamed by /events/<job_id>
+job_events = JobEventLog()
+
+# Seconds between keep-alive comments on idle event streams
+HEARTBEAT_INTERVAL = 15
+
+# Guards job counters and track lists updated by parallel workers; the job store
+# copies jobs under it before writing them (reentrant: saves may run while it is held)
+jobs_lock = threading.RLock()
+
+# Default number of tracks converted in parallel per job (override with CONVERSION_WORKERS)
+DEFAULT_CONVERSION_WORKERS = scheduler.download_slots
+
+# How downloads are packaged: 'stream' builds the ZIP on the fly from the track
+# files, 'file' appends each finished track to playlist_<job_id>.zip
+ZIP_MODE = os.getenv('ZIP_MODE', 'stream').lower()
+
+# Encodes fetched audio for all jobs, one ffmpeg process per transcode slot
+transcode_pool = TranscodePool(
+    workers=scheduler.transcode_slot_count,
+    max_pending=int(os.getenv('TRANSCODE_QUEUE_SIZE', scheduler.transcode_slot_count * 2))
+)
+
+# Subdirectory of a job's directory holding per-track scratch directories
+TRACK_SCRATCH_DIR = '.tracks'
+
+# Bitrate of pipeline transcodes; matches AUDIO_BITRATE of the downloaders, which
+# produce and cache the same encodes (they are imported on first use, not here)
+PIPELINE_BITRATE = '128'
+
+def init_job_store(app):
+    """Switch conversion jobs to the store selected by JOB_STORE"""
+    global conversion_jobs, job_queue, job_events
+    conversion_jobs = create_job_store(app, job_lock=jobs_lock)
+    job_queue = create_job_queue()
+    job_events = create_event_log()
+    return conversion_jobs
+
+def enqueue_conversion(job_id):
+    """Queue a job for conversion and return its queue position (0 = running now)"""
+    if job_queue is None:
+        return schedule_conversion(job_id)
+    
+    # Separate worker processes pick the job up from Redis
+    if job_queue.is_full():
+        raise SchedulerFullError(len(job_queue))
+    return job_queue.enqueue(job_id)
+
+def get_queue_position(job_id):
+    """Estimated start position of a queued job"""
+    if job_queue is not None:
+        return job_queue.position(job_id)
+    return scheduler.queue_position(job_id)
 
 @conversion_bp.route('/start', methods=['POST'])
 def start_conversion():
@@ -51,6 +114,7 @@ def start_conversion():
             'total_tracks': len(tracks),
             'completed_tracks': 0,
             'failed_tracks': 0,
+            'timed_out_tracks': 0,
             'current_track': None,
             'download_url': None,
             'created_at': datetime.now(),
@@ -59,18 +123,28 @@ def start_conversion():
             'zip_path': None,
             'error': None,
             'failed_track_list': [],  # List of failed tracks with reasons
-            'completed_track_list': []  # List of successfully converted tracks
+            'completed_track_list': [],  # List of successfully converted tracks
+            'change_seq': 0  # Event sequence number of the latest track result
         }
         
-        # Start conversion in background thread
-        thread = threading.Thread(target=convert_tracks_background, args=(job_id,))
-        thread.daemon = True
-        thread.start()
+        # Hand the tracks to the conversion scheduler or worker queue
+        try:
+            queue_position = enqueue_conversion(job_id)
+        except SchedulerFullError as e:
+            cleanup_job_files(conversion_jobs.pop(job_id))
+            response = jsonify({
+                'error': 'Server is busy converting other playlists. Please try again shortly.',
+                'status': 'rejected',
+                'queue_position': e.queued_jobs + 1
+            })
+            response.headers['Retry-After'] = '30'
+            return response, 429
         
         return jsonify({
             'job_id': job_id,
             'status': 'queued',
-            'message': 'Conversion process started',
+            'message': 'Conversion process started' if queue_position == 0 else 'Conversion queued',
+            'queue_position': queue_position,
             'total_tracks': len(tracks)
         })
         
@@ -79,53 +153,162 @@ def start_conversion():
 
 @conversion_bp.route('/status/<job_id>', methods=['GET'])
 def get_conversion_status(job_id):
-    """Get the status of a conversion job"""
-    if job_id not in conversion_jobs:
+    """Get the status of a conversion job (?since=<cursor> for track changes after a cursor only)"""
+    try:
+        # Counters and status only; the track lists are read once the ETag check has passed
+        job = conversion_jobs.summary(job_id)
+    except KeyError:
         return jsonify({'error': 'Job not found'}), 404
     
-    job = conversion_jobs[job_id]
+    try:
+        since = int(request.args['since']) if 'since' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Invalid since cursor'}), 400
+    
+    cursor = job.get('change_seq', 0)
+    queue_position = get_queue_position(job_id) if job['status'] == 'queued' else None
+    # Changes without a progress update when the reaper removes the archive
+    download_ready = is_download_ready(job)
+    
+    # Cheap validator from the aggregate state, checked before serialising any track lists
+    etag = hashlib.md5(repr((
+        job['status'], job['completed_tracks'], job['failed_tracks'], job['current_track'],
+        job.get('error'), queue_position, cursor, since, download_ready, job.get('download_url')
+    )).encode('utf-8')).hexdigest()
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    completed_track_list, failed_track_list = conversion_jobs.track_lists(job_id, since)
     
     # Calculate progress percentage
     progress = 0
     if job['total_tracks'] > 0:
         progress = (job['completed_tracks'] / job['total_tracks']) * 100
     
-    return jsonify({
+    response = jsonify({
         'job_id': job_id,
         'status': job['status'],
         'playlist_name': job['playlist_name'],
         'total_tracks': job['total_tracks'],
         'completed_tracks': job['completed_tracks'],
         'failed_tracks': job['failed_tracks'],
+        'timed_out_tracks': job.get('timed_out_tracks', 0),
         'current_track': job['current_track'],
         'progress': round(progress, 1),
-        'download_ready': job['status'] == 'completed' and job['zip_path'] is not None,
+        'download_ready': download_ready,
         'error': job.get('error'),
         'created_at': job['created_at'].isoformat(),
-        'failed_track_list': job.get('failed_track_list', []),
-        'completed_track_list': job.get('completed_track_list', []),
-        'has_partial_success': job['completed_tracks'] > 0 and job['failed_tracks'] > 0
+        'failed_track_list': failed_track_list,
+        'completed_track_list': completed_track_list,
+        'has_partial_success': job['completed_tracks'] > 0 and job['failed_tracks'] > 0,
+        'queue_position': queue_position,
+        'cursor': cursor,
+        'since': since
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@conversion_bp.route('/events/<job_id>', methods=['GET'])
+def stream_conversion_events(job_id):
+    """Server-Sent Events stream of a job's progress"""
+    job = conversion_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # EventSource sends the last event it saw when it reconnects; new clients
+    # get a snapshot and only the events published after it
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        last_seq = int(cursor) if cursor else job_events.last_seq(job_id)
+    except ValueError:
+        last_seq = job_events.last_seq(job_id)
+    snapshot = job_status_payload(job_id, job)
+    
+    def generate():
+        seq = last_seq
+        
+        # Current counters first, so clients joining late start from the right state
+        yield format_sse('status', snapshot)
+        if snapshot['status'] in ('completed', 'failed'):
+            return
+        
+        last_sent = snapshot
+        while True:
+            events = job_events.wait(job_id, seq, HEARTBEAT_INTERVAL)
+            if not events:
+                # The job may run in another process whose events this log never sees:
+                # fall back to the stored job state and end the stream once it finishes
+                try:
+                    current = conversion_jobs.summary(job_id)
+                except KeyError:
+                    return
+                payload = job_status_payload(job_id, current)
+                if payload != last_sent:
+                    last_sent = payload
+                    yield format_sse('status', payload)
+                if payload['status'] in ('completed', 'failed'):
+                    return
+                yield ': heartbeat\n\n'
+                continue
+            
+            for event in events:
+                seq = event['seq']
+                yield format_sse(event['type'], event, event['seq'])
+                if event['type'] == 'status' and event['status'] in ('completed', 'failed'):
+                    return
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
     })
 
 @conversion_bp.route('/download/<job_id>', methods=['GET'])
 def download_zip(job_id):
-    """Download the converted tracks as a ZIP file"""
+    """Download the converted tracks as a ZIP file (?partial=1 for the tracks finished so far)"""
     if job_id not in conversion_jobs:
         return jsonify({'error': 'Job not found'}), 404
     
     job = conversion_jobs[job_id]
+    partial = request.args.get('partial', '').lower() in ('1', 'true')
+    
+    if partial and job['status'] in ('queued', 'processing'):
+        if not job['temp_dir'] or not os.path.isdir(job['temp_dir']):
+            return jsonify({'error': 'No tracks converted yet'}), 400
+        
+        safe_name = "".join(c for c in job['playlist_name'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        filename = f"{safe_name or 'playlist'}_{job_id[:8]}_partial.zip"
+        return Response(
+            stream_zip(get_archive_entries(job, partial=True)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
     
     if job['status'] != 'completed':
         return jsonify({'error': 'Conversion not completed'}), 400
     
-    if not job['zip_path'] or not os.path.exists(job['zip_path']):
+    if not is_download_ready(job):
         return jsonify({'error': 'Download file not available'}), 404
     
     try:
+        # Downloaded archives are the first to go when the reaper needs disk space
+        if not job.get('downloaded_at'):
+            conversion_jobs.update(job_id, downloaded_at=time.time())
+        
         # Generate a clean filename
         safe_name = "".join(c for c in job['playlist_name'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
         filename = f"{safe_name or 'playlist'}_{job_id[:8]}.zip"
         
+        if job.get('zip_mode') == 'stream':
+            # Build the archive while sending it; nothing is written to disk
+            return Response(
+                stream_zip(get_archive_entries(job)),
+                mimetype='application/zip',
+                headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+            )
+        
         return send_file(
             job['zip_path'], 
             as_attachment=True, 
@@ -145,162 +328,79 @@ def cleanup_job(job_id):
     
     try:
         # Clean up temporary directory
-        if job['temp_dir'] and os.path.exists(job['temp_dir']):
-            shutil.rmtree(job['temp_dir'])
+        cleanup_job_files(job)
         
         # Remove job from memory
         del conversion_jobs[job_id]
+        job_events.discard(job_id)
         
         return jsonify({'message': 'Job cleaned up successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def convert_tracks_background(job_id):
-    """Background function to convert tracks"""
-    job = conversion_jobs[job_id]
+def format_sse(event_type, data, event_id=None):
+    """Encode one Server-Sent Events frame"""
+    frame = f"event: {event_type}\n"
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+def job_status_payload(job_id, job):
+    """Aggregate job state sent with 'status' events"""
+    progress = 0
+    if job['total_tracks'] > 0:
+        progress = (job['completed_tracks'] / job['total_tracks']) * 100
     
-    try:
-        job['status'] = 'processing'
-        
-        # Create temporary directory for downloads
-        temp_dir = tempfile.mkdtemp(prefix=f'spotify_converter_{job_id}_')
-        job['temp_dir'] = temp_dir
-        
-        # Initialize downloaders
-        youtube_downloader = EnhancedYouTubeDownloader()
-        alternative_downloader = AlternativeAudioDownloader()
-        advanced_bypass = AdvancedYouTubeBypass()
-        simple_bypass = SimpleBypass()
-        auth_bypass = AuthenticatedBypass()
-        downloaded_files = []
-        
-        # Check if we should use demo mode (for YouTube bot issues)
-        demo_mode = os.getenv('DEMO_MODE', 'false').lower() == 'true'
-        force_advanced_bypass = os.getenv('FORCE_ADVANCED_BYPASS', 'true').lower() == 'true'
-        use_authentication = os.getenv('USE_AUTHENTICATION', 'true').lower() == 'true'
-        
-        for i, track in enumerate(job['tracks']):
-            try:
-                # Update current track status
-                track_name = f"{track['name']} - {', '.join(track['artists'])}"
-                job['current_track'] = track_name
-                
-                print(f"Processing track {i+1}/{len(job['tracks'])}: {track_name}")
-                
-                success = False
-                message = ""
-                
-                if demo_mode:
-                    # Use simple demo mode
-                    success, message = simple_bypass.create_demo_file(
-                        track['name'], 
-                        track['artists'], 
-                        temp_dir
-                    )
-                else:
-                    # Try authenticated bypass first (most effective)
-                    if use_authentication:
-                        print(f"🔐 Trying authenticated bypass...")
-                        success, message = auth_bypass.download_with_authentication(
-                            track['name'], 
-                            track['artists'], 
-                            temp_dir
-                        )
-                    
-                    # If auth fails, try simple bypass
-                    if not success:
-                        print(f"🎵 Trying simple bypass...")
-                        success, message = simple_bypass.download_simple(
-                            track['name'], 
-                            track['artists'], 
-                            temp_dir
-                        )
-                    
-                    # If simple bypass fails and advanced is enabled, try advanced
-                    if not success and force_advanced_bypass:
-                        print(f"🚀 Trying advanced bypass...")
-                        try:
-                            success, message = advanced_bypass.download_with_advanced_bypass(
-                                track['name'], 
-                                track['artists'], 
-                                temp_dir,
-                                max_attempts=1  # Quick attempt only
-                            )
-                        except Exception as e:
-                            print(f"Advanced bypass error: {e}")
-                            success = False
-                    
-                    # If all real methods fail, create demo file
-                    if not success:
-                        print(f"All download methods failed, creating demo...")
-                        success, message = simple_bypass.create_demo_file(
-                            track['name'], 
-                            track['artists'], 
-                            temp_dir
-                        )
-                
-                if success:
-                    # Find the downloaded file
-                    file_found = False
-                    for file in os.listdir(temp_dir):
-                        if (file.endswith('.mp3') or file.endswith('.txt')) and \
-                           any(artist.lower() in file.lower() for artist in track['artists']):
-                            downloaded_files.append(os.path.join(temp_dir, file))
-                            print(f"Successfully processed: {file}")
-                            job['completed_tracks'] += 1
-                            job['completed_track_list'].append({
-                                'name': track['name'],
-                                'artists': track['artists'],
-                                'filename': file,
-                                'status': 'success'
-                            })
-                            file_found = True
-                            break
-                    
-                    if not file_found:
-                        print(f"Processed but couldn't find file for: {track_name}")
-                        job['failed_tracks'] += 1
-                        job['failed_track_list'].append({
-                            'name': track['name'],
-                            'artists': track['artists'],
-                            'reason': 'File not found after processing',
-                            'status': 'failed'
-                        })
-                else:
-                    print(f"Failed to process: {track_name} - {message}")
-                    job['failed_tracks'] += 1
-                    job['failed_track_list'].append({
-                        'name': track['name'],
-                        'artists': track['artists'],
-                        'reason': message or 'Unknown error during processing',
-                        'status': 'failed'
-                    })
-                
-                # Rate limiting between tracks
-                time.sleep(random.uniform(3, 7))
-                
-            except Exception as e:
-                print(f"Error converting track {track['name']}: {str(e)}")
-                job['failed_tracks'] += 1
-                continue
-        
-        # Always create ZIP file, even with partial success
-        zip_filename = f"playlist_{job_id}.zip"
-        zip_path = os.path.join(temp_dir, zip_filename)
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add successfully downloaded files (avoid duplicates)
-            added_files = set()
-            for file_path in downloaded_files:
-                filename = os.path.basename(file_path)
-                if filename not in added_files:
-                    zipf.write(file_path, filename)
-                    added_files.add(filename)
-            
-            # Add a summary report
-            summary_content = f"""NasmyTunes Conversion Report
+    return {
+        'status': job['status'],
+        'total_tracks': job['total_tracks'],
+        'completed_tracks': job['completed_tracks'],
+        'failed_tracks': job['failed_tracks'],
+        'timed_out_tracks': job.get('timed_out_tracks', 0),
+        'current_track': job['current_track'],
+        'progress': round(progress, 1),
+        'download_ready': is_download_ready(job),
+        'error': job.get('error'),
+        'queue_position': get_queue_position(job_id) if job['status'] == 'queued' else None
+    }
+
+def publish_track_event(job_id, job, event, index, track, **data):
+    """Publish a per-track event along with the job counters"""
+    return job_events.publish(
+        job_id,
+        'track',
+        event=event,
+        index=index,
+        name=track['name'],
+        artists=track['artists'],
+        completed_tracks=job['completed_tracks'],
+        failed_tracks=job['failed_tracks'],
+        **data
+    )
+
+def record_track_change(job, entry, event):
+    """Tag a completed/failed track entry with the event that reported it, for ?since= queries"""
+    entry['seq'] = event['seq']
+    job['change_seq'] = max(job.get('change_seq', 0), event['seq'])
+
+def is_download_ready(job):
+    """Whether a finished job's archive can be downloaded"""
+    if job['status'] != 'completed':
+        return False
+    if job.get('zip_mode') == 'stream':
+        return bool(job['temp_dir']) and os.path.isdir(job['temp_dir'])
+    return bool(job['zip_path']) and os.path.exists(job['zip_path'])
+
+def build_conversion_report(job, partial=False):
+    """Text of the CONVERSION_REPORT.txt included in every archive"""
+    summary_content = f"""NasmyTunes Conversion Report
 Playlist: {job['playlist_name']}
 Conversion Date: {job['created_at'].strftime('%Y-%m-%d %H:%M:%S')}
+"""
+    if partial:
+        summary_content += "Partial download: conversion is still in progress\n"
+    
+    summary_content += f"""
 
 SUMMARY:
 ========
@@ -312,22 +412,441 @@ Success Rate: {(job['completed_tracks'] / job['total_tracks'] * 100):.1f}%
 SUCCESSFULLY CONVERTED TRACKS:
 ==============================
 """
+    
+    for track in job['completed_track_list']:
+        summary_content += f"✅ {track['name']} - {', '.join(track['artists'])}"
+        if track.get('match_score') is not None:
+            summary_content += f" (match confidence {track['match_score']:.2f})"
+        summary_content += "\n"
+    
+    if job['failed_track_list']:
+        summary_content += f"\nFAILED TRACKS:\n==============\n"
+        for track in job['failed_track_list']:
+            summary_content += f"❌ {track['name']} - {', '.join(track['artists'])}\n"
+            summary_content += f"   Reason: {track['reason']}\n\n"
+    
+    summary_content += f"\nNOTE: This conversion was performed in demo mode due to YouTube's bot detection.\n"
+    summary_content += f"For actual audio files, please run the application locally on your computer.\n"
+    summary_content += f"\nThank you for using NasmyTunes! 🎵"
+    return summary_content
+
+def get_archive_entries(job, partial=False):
+    """(arcname, path or bytes) entries of a job's archive, in track order"""
+    entries = []
+    added_files = set()
+    
+    # Add successfully downloaded files (avoid duplicates)
+    for track in sorted(job['completed_track_list'], key=lambda t: t.get('index', 0)):
+        filename = track['filename']
+        file_path = os.path.join(job['temp_dir'], filename)
+        if filename not in added_files and os.path.exists(file_path):
+            entries.append((filename, file_path))
+            added_files.add(filename)
+    
+    entries.append(('CONVERSION_REPORT.txt', build_conversion_report(job, partial).encode('utf-8')))
+    return entries
+
+def cleanup_job_files(job):
+    """Remove a job's temporary directory"""
+    if job['temp_dir'] and os.path.exists(job['temp_dir']):
+        shutil.rmtree(job['temp_dir'])
+
+def get_conversion_workers():
+    """Maximum number of tracks of one job converted in parallel"""
+    try:
+        workers = int(os.getenv('CONVERSION_WORKERS', DEFAULT_CONVERSION_WORKERS))
+    except ValueError:
+        workers = DEFAULT_CONVERSION_WORKERS
+    return max(1, workers)
+
+def create_track_dir(temp_dir, index):
+    """Fresh scratch directory for one attempt at a track, inside the job directory"""
+    scratch_root = os.path.join(temp_dir, TRACK_SCRATCH_DIR)
+    os.makedirs(scratch_root, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f'{index:04d}_', dir=scratch_root)
+
+def finalize_track_file(job, index, scratch_path, context):
+    """Move a finished track out of its scratch directory into the job directory.
+
+    The rename is atomic, so the job directory only ever holds complete files.
+    A name already taken by another track gets the track number appended.
+    Returns the filename in the job directory.
+    """
+    file = os.path.basename(scratch_path)
+    with jobs_lock:
+        if file in context['claimed_files']:
+            stem, ext = os.path.splitext(file)
+            file = f"{stem} ({index + 1}){ext}"
+        context['claimed_files'].add(file)
+    os.replace(scratch_path, os.path.join(job['temp_dir'], file))
+    return file
+
+def get_worker_downloaders(worker_state, created_downloaders):
+    """Get the downloaders owned by the current worker thread"""
+    if not hasattr(worker_state, 'downloaders'):
+        # Imported here: yt-dlp and the downloaders are only needed once a job runs
+        from src.utils.simple_bypass import SimpleBypass
+        from src.utils.advanced_youtube_bypass import AdvancedYouTubeBypass
+        from src.utils.authenticated_bypass import AuthenticatedBypass
+        
+        worker_state.downloaders = {
+            'simple': SimpleBypass(),
+            'advanced': AdvancedYouTubeBypass(),
+            'auth': AuthenticatedBypass(),
+        }
+        for downloader in worker_state.downloaders.values():
+            # Only fetch raw audio here; encoding happens in the transcode pool, or in
+            # transcode_inline where ffmpeg can be stopped at the track's deadline
+            downloader.extract_audio = False
+        with jobs_lock:
+            created_downloaders.append(worker_state.downloaders)
+    return worker_state.downloaders
+
+def record_track_success(job_id, job, index, track, file, context, match=None):
+    """Count a finished track and add it to the archive; ``match`` is the search result it came from"""
+    match_info = {}
+    if match:
+        match_info = {'video_id': match.get('id'), 'match_score': match.get('match_score')}
+    
+    with jobs_lock:
+        job['completed_tracks'] += 1
+        job['completed_track_list'].append(dict({
+            'index': index,
+            'name': track['name'],
+            'artists': track['artists'],
+            'filename': file,
+            'status': 'success'
+        }, **match_info))
+        event = publish_track_event(job_id, job, 'completed', index, track, filename=file, **match_info)
+        record_track_change(job, job['completed_track_list'][-1], event)
+    
+    print(f"Successfully processed: {file}")
+    if context['packager'] is not None:
+        try:
+            context['packager'].add(file, os.path.join(job['temp_dir'], file))
+        except Exception as e:
+            # finalize_conversion retries entries that are missing from the archive
+            print(f"Error adding {file} to archive: {e}")
+
+def record_track_failure(job_id, job, index, track, reason, status='failed'):
+    """Count a failed track with the reason shown in the report (``status='timed_out'`` past its deadline)"""
+    with jobs_lock:
+        job['failed_tracks'] += 1
+        if status == 'timed_out':
+            job['timed_out_tracks'] = job.get('timed_out_tracks', 0) + 1
+        job['failed_track_list'].append({
+            'index': index,
+            'name': track['name'],
+            'artists': track['artists'],
+            'reason': reason,
+            'status': status
+        })
+        event = publish_track_event(job_id, job, status, index, track, reason=reason)
+        record_track_change(job, job['failed_track_list'][-1], event)
+
+def submit_transcode(job_id, job, index, track, src_path, track_dir, context, match=None):
+    """Hand a fetched track and its scratch directory to the transcode stage; blocks while that stage is saturated"""
+    with jobs_lock:
+        context['pending_transcodes'] += 1
+    publish_track_event(job_id, job, 'downloaded', index, track)
+    
+    # The track's deadline still applies in the transcode stage
+    deadline = current_deadline()
+    transcode_pool.submit(
+        src_path,
+        f"{os.path.splitext(src_path)[0]}.mp3",
+        PIPELINE_BITRATE,
+        partial(finish_transcode, job_id, job, index, track, track_dir, context, match, deadline),
+        deadline=deadline
+    )
+
+def transcode_inline(job_id, job, index, track, src_path, match):
+    """Encode a fetched track on this worker (TRANSCODE_PIPELINE=false) while holding a shared transcode slot.
+
+    ffmpeg is killed if it runs past the track's deadline.
+    """
+    publish_track_event(job_id, job, 'downloaded', index, track)
+    deadline = current_deadline()
+    if not scheduler.transcode_slots.acquire(timeout=deadline.remaining() if deadline else None):
+        raise TrackTimeoutError(deadline.reason)
+    try:
+        dest_path = transcode_to_mp3(src_path, f"{os.path.splitext(src_path)[0]}.mp3", PIPELINE_BITRATE)
+    finally:
+        scheduler.transcode_slots.release()
+    
+    publish_track_event(job_id, job, 'transcoded', index, track)
+    if match and match.get('id'):
+        audio_cache.insert(match['id'], dest_path, bitrate=PIPELINE_BITRATE)
+    return dest_path
+
+def finish_transcode(job_id, job, index, track, track_dir, context, match, deadline, dest_path, error):
+    """Transcode stage callback: record the result and package the job if it was the last one"""
+    try:
+        if error is None:
+            publish_track_event(job_id, job, 'transcoded', index, track)
+            # Key the cached audio by the video actually downloaded; the search cache entry
+            # may have been reset or replaced by another job since
+            if match and match.get('id'):
+                video_id = match['id']
+            else:
+                video_id = search_cache.chosen_video_id(track['name'], track['artists'], track.get('duration_ms'))
+            if video_id:
+                audio_cache.insert(video_id, dest_path, bitrate=PIPELINE_BITRATE)
+            file = finalize_track_file(job, index, dest_path, context)
+            record_track_success(job_id, job, index, track, file, context, match)
+        elif deadline is not None and deadline.expired():
+            print(f"Transcode timed out for {track['name']}: {error}")
+            record_track_failure(job_id, job, index, track, error, status='timed_out')
+        else:
+            print(f"Transcode failed for {track['name']}: {error}")
+            record_track_failure(job_id, job, index, track, f"Transcode failed: {error}")
+        conversion_jobs.save(job_id)
+    except Exception as e:
+        print(f"Error finishing track {track['name']}: {str(e)}")
+        record_track_failure(job_id, job, index, track, str(e))
+    finally:
+        shutil.rmtree(track_dir, ignore_errors=True)
+        with jobs_lock:
+            context['pending_transcodes'] -= 1
+        maybe_finalize_conversion(job_id, context)
+
+def convert_single_track(job_id, job, index, track, downloaders, context):
+    """Search and download one track, then transcode it or record the result"""
+    settings = context['settings']
+    simple_bypass = downloaders['simple']
+    advanced_bypass = downloaders['advanced']
+    auth_bypass = downloaders['auth']
+    track_name = f"{track['name']} - {', '.join(track['artists'])}"
+    track_dir = None
+    
+    try:
+        # Update current track status
+        job['current_track'] = track_name
+        conversion_jobs.save(job_id)
+        publish_track_event(job_id, job, 'started', index, track)
+        
+        print(f"Processing track {index+1}/{len(job['tracks'])}: {track_name}")
+        
+        # Everything for this track is written here and only moved into the
+        # job directory once it is complete; failures leave nothing behind
+        track_dir = create_track_dir(job['temp_dir'], index)
+        
+        success = False
+        message = ""
+        downloader = simple_bypass
+        
+        if settings['demo_mode']:
+            # Use simple demo mode
+            success, message = simple_bypass.create_demo_file(
+                track['name'], 
+                track['artists'], 
+                track_dir
+            )
+        else:
+            # Search once; every strategy downloads from the same candidates
+            duration_ms = track.get('duration_ms')
+            album, year = track.get('album'), track.get('year')
+            videos = simple_bypass.search_youtube_simple(track['name'], track['artists'], duration_ms, album, year)
+            videos = verify_candidates(videos, track['name'], track['artists'], duration_ms, album, year)
             
-            for track in job['completed_track_list']:
-                summary_content += f"✅ {track['name']} - {', '.join(track['artists'])}\n"
+            strategies = []
+            if settings['use_authentication']:
+                strategies.append(('auth', lambda: auth_bypass.download_with_authentication(
+                    track['name'], track['artists'], track_dir, duration_ms=duration_ms, videos=videos,
+                    album=album, year=year)))
+            strategies.append(('simple', lambda: simple_bypass.download_simple(
+                track['name'], track['artists'], track_dir, duration_ms=duration_ms, videos=videos,
+                album=album, year=year)))
+            if settings['force_advanced_bypass']:
+                strategies.append(('advanced', lambda: advanced_bypass.download_with_advanced_bypass(
+                    track['name'], track['artists'], track_dir,
+                    max_attempts=1,  # Quick attempt only
+                    duration_ms=duration_ms, videos=videos, album=album, year=year)))
             
-            if job['failed_track_list']:
-                summary_content += f"\nFAILED TRACKS:\n==============\n"
-                for track in job['failed_track_list']:
-                    summary_content += f"❌ {track['name']} - {', '.join(track['artists'])}\n"
-                    summary_content += f"   Reason: {track['reason']}\n\n"
+            if videos:
+                # Tried in the order that has been succeeding fastest; failing strategies cool down
+                name, success, message = strategy_runner.run(strategies)
+                if success:
+                    downloader = downloaders[name]
+            else:
+                message = "No search result matches the track"
             
-            summary_content += f"\nNOTE: This conversion was performed in demo mode due to YouTube's bot detection.\n"
-            summary_content += f"For actual audio files, please run the application locally on your computer.\n"
-            summary_content += f"\nThank you for using NasmyTunes! 🎵"
+            # If all real methods fail, create demo file
+            if not success:
+                print(f"All download methods failed, creating demo...")
+                downloader = simple_bypass
+                success, message = simple_bypass.create_demo_file(
+                    track['name'], 
+                    track['artists'], 
+                    track_dir
+                )
+        
+        if success:
+            # The downloader reports the exact file it wrote and the search result it matched
+            output_file = downloader.output_file
+            match = downloader.matched_video
             
-            # Add summary to ZIP
-            zipf.writestr("CONVERSION_REPORT.txt", summary_content)
+            if not output_file or not os.path.exists(output_file):
+                print(f"Processed but couldn't find file for: {track_name}")
+                record_track_failure(job_id, job, index, track, 'File not found after processing')
+            elif output_file.lower().endswith(RAW_AUDIO_EXTENSIONS) and settings['transcode_pipeline']:
+                submit_transcode(job_id, job, index, track, output_file, track_dir, context, match)
+                track_dir = None  # Owned by the transcode stage from here
+            else:
+                if output_file.lower().endswith(RAW_AUDIO_EXTENSIONS):
+                    output_file = transcode_inline(job_id, job, index, track, output_file, match)
+                file = finalize_track_file(job, index, output_file, context)
+                record_track_success(job_id, job, index, track, file, context, match)
+        else:
+            print(f"Failed to process: {track_name} - {message}")
+            record_track_failure(job_id, job, index, track, message or 'Unknown error during processing')
+        
+    except TrackTimeoutError as e:
+        # Past the deadline: no demo fallback, the track is reported as timed out
+        print(f"Timed out converting track {track['name']}: {str(e)}")
+        record_track_failure(job_id, job, index, track, str(e), status='timed_out')
+    
+    except Exception as e:
+        print(f"Error converting track {track['name']}: {str(e)}")
+        record_track_failure(job_id, job, index, track, str(e))
+    
+    finally:
+        if track_dir:
+            shutil.rmtree(track_dir, ignore_errors=True)
+        conversion_jobs.save(job_id)
+        
+        # Optional per-worker rate limiting between tracks
+        if settings['track_delay'] > 0:
+            time.sleep(random.uniform(0, settings['track_delay']))
+
+def get_conversion_settings():
+    """Read conversion behaviour from the environment"""
+    return {
+        # Check if we should use demo mode (for YouTube bot issues)
+        'demo_mode': os.getenv('DEMO_MODE', 'false').lower() == 'true',
+        'force_advanced_bypass': os.getenv('FORCE_ADVANCED_BYPASS', 'true').lower() == 'true',
+        'use_authentication': os.getenv('USE_AUTHENTICATION', 'true').lower() == 'true',
+        'track_delay': float(os.getenv('TRACK_DELAY_SECONDS', '0')),
+        # Longest a track may take, searching through transcoding (0 = no limit)
+        'track_deadline': float(os.getenv('TRACK_DEADLINE_SECONDS', '300')),
+        # Longest a job may take once its first track starts (0 = no limit)
+        'job_time_budget': float(os.getenv('JOB_TIME_BUDGET_SECONDS', '0')),
+        # Fetch in the download slots and encode in the transcode pool, instead of both inline
+        'transcode_pipeline': os.getenv('TRANSCODE_PIPELINE', 'true').lower() == 'true',
+    }
+
+def schedule_conversion(job_id):
+    """Submit a job's tracks to the shared scheduler and return its queue position"""
+    job = conversion_jobs[job_id]
+    
+    # Create temporary directory for downloads
+    job['temp_dir'] = tempfile.mkdtemp(prefix=f'spotify_converter_{job_id}_')
+    conversion_jobs.save(job_id)
+    
+    context = {
+        'settings': get_conversion_settings(),
+        # Each worker thread gets its own downloader instances for this job
+        'worker_state': threading.local(),
+        'created_downloaders': [],
+        'claimed_files': set(),
+        # Finished tracks are appended to the ZIP as they complete
+        'packager': IncrementalZipPackager(os.path.join(job['temp_dir'], f"playlist_{job_id}.zip"))
+                    if ZIP_MODE == 'file' else None,
+        # The job is packaged once all downloads are done and no transcodes are pending
+        'pending_transcodes': 0,
+        'downloads_done': False,
+        'finalized': False,
+        # Set when the first track starts if JOB_TIME_BUDGET_SECONDS is configured
+        'job_deadline': None,
+    }
+    tasks = [partial(run_track_task, job_id, index, track, context)
+             for index, track in enumerate(job['tracks'])]
+    
+    return scheduler.submit(
+        job_id,
+        tasks,
+        on_start=partial(mark_job_processing, job_id),
+        on_complete=partial(finish_downloads, job_id, context),
+        max_concurrency=get_conversion_workers()
+    )
+
+def mark_job_processing(job_id):
+    """Called by the scheduler when a job's first track starts"""
+    job = conversion_jobs.get(job_id)
+    if job and job['status'] == 'queued':
+        job['status'] = 'processing'
+        conversion_jobs.save(job_id, flush=True)
+        job_events.publish(job_id, 'status', **job_status_payload(job_id, job))
+
+def run_track_task(job_id, index, track, context):
+    """Scheduler task fetching a single track of a job"""
+    job = conversion_jobs.get(job_id)
+    if job is None:
+        # Job was cleaned up while queued
+        return
+    
+    deadline = get_track_deadline(context)
+    if deadline is not None and deadline.expired():
+        # The job's time budget ran out before this track's turn
+        record_track_failure(job_id, job, index, track, deadline.reason, status='timed_out')
+        conversion_jobs.save(job_id)
+        return
+    
+    downloaders = get_worker_downloaders(context['worker_state'], context['created_downloaders'])
+    # Sleeps, yt-dlp hooks and ffmpeg give up once the deadline passes
+    with deadline_scope(deadline):
+        convert_single_track(job_id, job, index, track, downloaders, context)
+
+def get_track_deadline(context):
+    """Deadline for a track starting now: its own limit or the job's remaining budget, whichever is sooner"""
+    settings = context['settings']
+    with jobs_lock:
+        if context['job_deadline'] is None and settings['job_time_budget'] > 0:
+            context['job_deadline'] = Deadline(settings['job_time_budget'],
+                                               f"Job time budget of {settings['job_time_budget']:g}s used up")
+        job_deadline = context['job_deadline']
+    
+    if settings['track_deadline'] > 0:
+        return Deadline.earliest(settings['track_deadline'],
+                                 f"Track took longer than {settings['track_deadline']:g}s", job_deadline)
+    return job_deadline
+
+def finish_downloads(job_id, context):
+    """Called by the scheduler when every track of the job has been fetched"""
+    with jobs_lock:
+        context['downloads_done'] = True
+    maybe_finalize_conversion(job_id, context)
+
+def maybe_finalize_conversion(job_id, context):
+    """Package the job once, after its last download and its last transcode"""
+    with jobs_lock:
+        if context['finalized'] or not context['downloads_done'] or context['pending_transcodes']:
+            return
+        context['finalized'] = True
+    finalize_conversion(job_id, context)
+
+def finalize_conversion(job_id, context):
+    """Package the converted tracks once every track of the job has finished"""
+    job = conversion_jobs.get(job_id)
+    if job is None:
+        if context['packager'] is not None:
+            context['packager'].close()
+        return
+    
+    try:
+        with jobs_lock:
+            # Keep the ZIP ordering stable by listing files in track order
+            job['completed_track_list'].sort(key=lambda t: t['index'])
+            job['failed_track_list'].sort(key=lambda t: t['index'])
+            
+            # Always package the tracks, even with partial success
+            job['zip_mode'] = ZIP_MODE
+        if context['packager'] is not None:
+            # Only the report and central directory are left to write
+            zip_path = context['packager'].finalize(get_archive_entries(job))
+        else:
+            # Archive is generated from the track files when it is downloaded
+            zip_path = None
         
         job['zip_path'] = zip_path
         job['current_track'] = None
@@ -350,34 +869,38 @@ SUCCESSFULLY CONVERTED TRACKS:
         print(f"Conversion failed with error: {str(e)}")
     
     finally:
-        # Cleanup authenticated bypass resources
-        try:
-            auth_bypass.cleanup()
-        except:
-            pass
+        if context['packager'] is not None:
+            context['packager'].close()
+        conversion_jobs.save(job_id, flush=True)
+        job_events.publish(job_id, 'status', **job_status_payload(job_id, job))
+        
+        # Cleanup authenticated bypass resources and the workers' yt-dlp instances
+        for downloaders in context['created_downloaders']:
+            try:
+                downloaders['simple'].ydl_pool.close()
+                downloaders['advanced'].ydl_pool.close()
+                downloaders['auth'].cleanup()
+            except:
+                pass
 
 # Cleanup old jobs periodically (in production, use a proper job scheduler)
-def cleanup_old_jobs():
-    """Remove jobs older than 24 hours"""
-    cutoff_time = datetime.now() - timedelta(hours=24)
-    jobs_to_remove = []
-    
-    for job_id, job in conversion_jobs.items():
-        if job['created_at'] < cutoff_time:
-            jobs_to_remove.append(job_id)
+def cleanup_old_jobs(cutoff_time=None):
+    """Remove jobs created before ``cutoff_time`` (default: older than the reaper's job TTL)"""
+    if cutoff_time is None:
+        cutoff_time = datetime.now() - reaper.job_ttl
     
-    for job_id in jobs_to_remove:
+    for job_id in conversion_jobs.expired_job_ids(cutoff_time):
         try:
             job = conversion_jobs[job_id]
-            if job['temp_dir'] and os.path.exists(job['temp_dir']):
-                shutil.rmtree(job['temp_dir'])
+            cleanup_job_files(job)
             del conversion_jobs[job_id]
+            job_events.discard(job_id)
             print(f"Cleaned up old job: {job_id}")
         except Exception as e:
             print(f"Error cleaning up job {job_id}: {str(e)}")
 
-# Start cleanup thread
-cleanup_thread = threading.Thread(target=lambda: [time.sleep(3600), cleanup_old_jobs()])
-cleanup_thread.daemon = True
-cleanup_thread.start()
+# Expired jobs and job directories over the disk budget are removed by the
+# reaper, started by the app and the conversion workers
+reaper.register('conversion', 'spotify_converter_',
+                lambda job_id: conversion_jobs.get(job_id), cleanup_old_jobs)
 
@@ -1,35 +1,54 @@
 import os
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
+import threading
 from flask import Blueprint, request, jsonify
 from dotenv import load_dotenv
+from src.utils.spotify_loader import (
+    fetch_playlist_metadata, fetch_playlist_snapshot, fetch_playlist_tracks, fetch_tracks, track_summary
+)
+from src.utils.playlist_cache import playlist_cache
 
 load_dotenv()
 
 spotify_bp = Blueprint('spotify', __name__)
 
-# Initialize Spotify client with error handling
-try:
-    client_id = os.getenv('SPOTIFY_CLIENT_ID')
-    client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
-    
-    if not client_id or not client_secret:
-        print("Warning: Spotify credentials not found in environment variables")
-        sp = None
-    else:
-        client_credentials_manager = SpotifyClientCredentials(
-            client_id=client_id,
-            client_secret=client_secret
-        )
-        sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
-except Exception as e:
-    print(f"Error initializing Spotify client: {str(e)}")
-    sp = None
+# Spotify client, created on first use so spotipy is not imported at startup
+_sp = None
+_sp_initialized = False
+_sp_lock = threading.Lock()
+
+def get_spotify_client():
+    """Spotify client, or None if credentials are missing or invalid"""
+    global _sp, _sp_initialized
+    with _sp_lock:
+        if _sp_initialized:
+            return _sp
+        _sp_initialized = True
+        
+        # Initialize Spotify client with error handling
+        try:
+            import spotipy
+            from spotipy.oauth2 import SpotifyClientCredentials
+            
+            client_id = os.getenv('SPOTIFY_CLIENT_ID')
+            client_secret = os.getenv('SPOTIFY_CLIENT_SECRET')
+            
+            if not client_id or not client_secret:
+                print("Warning: Spotify credentials not found in environment variables")
+            else:
+                client_credentials_manager = SpotifyClientCredentials(
+                    client_id=client_id,
+                    client_secret=client_secret
+                )
+                _sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+        except Exception as e:
+            print(f"Error initializing Spotify client: {str(e)}")
+        return _sp
 
 @spotify_bp.route('/playlist', methods=['POST'])
 def get_playlist():
     """Extract playlist information from Spotify URL"""
     try:
+        sp = get_spotify_client()
         if sp is None:
             return jsonify({'error': 'Spotify API not configured. Please check environment variables.'}), 500
         
@@ -46,9 +65,18 @@ def get_playlist():
         
         print(f"Attempting to fetch playlist: {playlist_id}")
         
-        # Get playlist information with better error handling
+        # Get playlist information (and the first page of tracks) with better error handling
         try:
-            playlist = sp.playlist(playlist_id)
+            # Unchanged playlists are served from the cache after one snapshot_id request.
+            # Playlists never loaded skip it: the metadata response carries the snapshot_id too
+            if playlist_cache.has_playlist(playlist_id):
+                snapshot_id = fetch_playlist_snapshot(sp, playlist_id)
+                cached = playlist_cache.get(playlist_id, snapshot_id)
+                if cached is not None:
+                    print(f"Serving cached playlist {playlist_id} (snapshot {snapshot_id})")
+                    return jsonify(cached)
+            
+            playlist = fetch_playlist_metadata(sp, playlist_id)
         except Exception as playlist_error:
             print(f"Playlist fetch error: {str(playlist_error)}")
             return jsonify({
@@ -57,39 +85,25 @@ def get_playlist():
         
         tracks = []
         
-        # Get all tracks from the playlist
+        # Get all tracks from the playlist; remaining pages are fetched concurrently
         try:
-            results = sp.playlist_tracks(playlist_id)
-            while results:
-                for item in results['items']:
-                    if item['track'] and item['track']['type'] == 'track':
-                        track = item['track']
-                        tracks.append({
-                            'id': track['id'],
-                            'name': track['name'],
-                            'artists': [artist['name'] for artist in track['artists']],
-                            'duration_ms': track['duration_ms'],
-                            'preview_url': track['preview_url']
-                        })
-                
-                # Check if there are more tracks
-                if results['next']:
-                    results = sp.next(results)
-                else:
-                    results = None
+            for track in fetch_playlist_tracks(sp, playlist_id, playlist):
+                tracks.append(track_summary(track))
         except Exception as tracks_error:
             print(f"Tracks fetch error: {str(tracks_error)}")
             return jsonify({
                 'error': f'Could not fetch playlist tracks: {str(tracks_error)}'
             }), 500
         
-        return jsonify({
+        result = {
             'playlist_id': playlist_id,
             'name': playlist['name'],
             'description': playlist['description'],
             'total_tracks': len(tracks),
             'tracks': tracks
-        })
+        }
+        playlist_cache.set(playlist_id, playlist.get('snapshot_id'), result)
+        return jsonify(result)
         
     except Exception as e:
         print(f"General error in get_playlist: {str(e)}")
@@ -112,19 +126,39 @@ def extract_playlist_id(url):
 def get_track(track_id):
     """Get detailed information about a specific track"""
     try:
+        sp = get_spotify_client()
         if sp is None:
             return jsonify({'error': 'Spotify API not configured. Please check environment variables.'}), 500
             
-        track = sp.track(track_id)
-        return jsonify({
-            'id': track['id'],
-            'name': track['name'],
-            'artists': [artist['name'] for artist in track['artists']],
-            'album': track['album']['name'],
-            'duration_ms': track['duration_ms'],
-            'preview_url': track['preview_url'],
-            'external_urls': track['external_urls']
-        })
+        tracks = fetch_tracks(sp, [track_id])
+        if not tracks[0]:
+            return jsonify({'error': 'Track not found'}), 404
+        
+        track = tracks[0]
+        return jsonify(dict(track_summary(track), external_urls=track['external_urls']))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Most track IDs accepted by one /tracks request
+MAX_TRACK_IDS = 1000
+
+@spotify_bp.route('/tracks', methods=['POST'])
+def get_tracks():
+    """Get track metadata (including ISRC, album and release year) for many track IDs at once"""
+    try:
+        sp = get_spotify_client()
+        if sp is None:
+            return jsonify({'error': 'Spotify API not configured. Please check environment variables.'}), 500
+        
+        data = request.get_json() or {}
+        track_ids = data.get('track_ids') or []
+        if not isinstance(track_ids, list) or not track_ids:
+            return jsonify({'error': 'track_ids must be a non-empty list'}), 400
+        if len(track_ids) > MAX_TRACK_IDS:
+            return jsonify({'error': f'At most {MAX_TRACK_IDS} track IDs per request'}), 400
+        
+        # Unknown IDs come back as null, in the position they were requested
+        tracks = fetch_tracks(sp, track_ids)
+        return jsonify({'tracks': [track_summary(track) if track else None for track in tracks]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -2,17 +2,36 @@ import os
 import tempfile
 import zipfile
 from flask import Blueprint, request, jsonify, send_file
-from youtube_search import YoutubeSearch
-import yt_dlp
+import shutil
 import threading
 import time
 from datetime import datetime
+from src.utils.artifact_reaper import reaper
 
 youtube_bp = Blueprint('youtube', __name__)
 
 # Store conversion jobs in memory (in production, use Redis or database)
 conversion_jobs = {}
 
+def job_dir_id(job_id):
+    """Job ID as used in the job's temp directory name (client-supplied IDs may contain anything)"""
+    return "".join(c for c in str(job_id) if c.isalnum() or c == '-')
+
+def get_job_by_dir_id(dir_id):
+    return next((job for job_id, job in list(conversion_jobs.items()) if job_dir_id(job_id) == dir_id), None)
+
+def cleanup_old_jobs(cutoff_time):
+    """Remove jobs created before ``cutoff_time`` and their files"""
+    for job_id, job in list(conversion_jobs.items()):
+        if job['created_at'] >= cutoff_time:
+            continue
+        if job.get('temp_dir'):
+            shutil.rmtree(job['temp_dir'], ignore_errors=True)
+        conversion_jobs.pop(job_id, None)
+        print(f"Cleaned up old YouTube job: {job_id}")
+
+reaper.register('youtube', 'youtube_converter_', get_job_by_dir_id, cleanup_old_jobs)
+
 @youtube_bp.route('/search', methods=['POST'])
 def search_youtube():
     """Search for a track on YouTube"""
@@ -24,6 +43,7 @@ def search_youtube():
             return jsonify({'error': 'Search query is required'}), 400
         
         # Search for videos
+        from youtube_search import YoutubeSearch
         results = YoutubeSearch(query, max_results=5).to_dict()
         
         videos = []
@@ -109,19 +129,27 @@ def download_zip(job_id):
         return jsonify({'error': 'Conversion not completed or file not available'}), 400
     
     try:
+        job['downloaded_at'] = time.time()
         return send_file(job['download_url'], as_attachment=True, download_name=f'playlist_{job_id}.zip')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 def convert_tracks_background(job_id, tracks):
     """Background function to convert tracks"""
+    from youtube_search import YoutubeSearch
+    import yt_dlp
+    from src.utils.ffmpeg_locator import ffmpeg_locator
+    from src.utils.transcoder import first_audio_output
+    from src.utils.ydl_pool import downloaded_files
+    
     try:
         job = conversion_jobs[job_id]
         job['status'] = 'processing'
         
         # Create temporary directory for downloads
-        temp_dir = tempfile.mkdtemp()
-        downloaded_files = []
+        temp_dir = tempfile.mkdtemp(prefix=f'youtube_converter_{job_dir_id(job_id)}_')
+        job['temp_dir'] = temp_dir
+        converted_files = []
         
         for i, track in enumerate(tracks):
             try:
@@ -138,7 +166,6 @@ def convert_tracks_background(job_id, tracks):
                 video_url = f"https://www.youtube.com/watch?v={results[0]['id']}"
                 
                 # Download and convert to MP3
-                ffmpeg_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'ffmpeg', 'ffmpeg.exe')
                 ydl_opts = {
                     'format': 'bestaudio/best',
                     'outtmpl': os.path.join(temp_dir, f'{i+1:02d}. %(title)s.%(ext)s'),
@@ -147,19 +174,18 @@ def convert_tracks_background(job_id, tracks):
                         'preferredcodec': 'mp3',
                         'preferredquality': '192',
                     }],
-                    'ffmpeg_location': ffmpeg_path,
+                    'ffmpeg_location': ffmpeg_locator.location(),
                     'quiet': True,
                     'no_warnings': True,
                 }
                 
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([video_url])
+                    info = ydl.extract_info(video_url, download=True)
                 
-                # Find the downloaded file
-                for file in os.listdir(temp_dir):
-                    if file.endswith('.mp3') and file.startswith(f'{i+1:02d}.'):
-                        downloaded_files.append(os.path.join(temp_dir, file))
-                        break
+                # yt-dlp reports where the MP3 ended up
+                output_file = first_audio_output(downloaded_files(info))
+                if output_file:
+                    converted_files.append(output_file)
                 
                 job['completed_tracks'] += 1
                 
@@ -168,10 +194,10 @@ def convert_tracks_background(job_id, tracks):
                 job['failed_tracks'] += 1
         
         # Create ZIP file
-        if downloaded_files:
+        if converted_files:
             zip_path = os.path.join(temp_dir, f'playlist_{job_id}.zip')
             with zipfile.ZipFile(zip_path, 'w') as zipf:
-                for file_path in downloaded_files:
+                for file_path in converted_files:
                     zipf.write(file_path, os.path.basename(file_path))
             
             job['download_url'] = zip_path
@@ -2,6 +2,7 @@
 let currentPlaylist = null;
 let currentJobId = null;
 let progressInterval = null;
+let progressSource = null;
 
 // DOM Elements
 const elements = {
@@ -136,8 +137,10 @@ async function startConversion(tracks, playlistName) {
     return await response.json();
 }
 
-async function getConversionStatus(jobId) {
-    const response = await fetch(`${API_BASE}/convert/status/${jobId}`);
+async function getConversionStatus(jobId, since = null) {
+    // With a cursor only track changes after it are returned
+    const query = since === null ? '' : `?since=${since}`;
+    const response = await fetch(`${API_BASE}/convert/status/${jobId}${query}`);
     
     if (!response.ok) {
         const error = await response.json();
@@ -261,27 +264,100 @@ function startProgressMonitoring() {
     elements.progressPercent.textContent = '0%';
     elements.progressFill.style.width = '0%';
     
-    // Start polling
+    // Prefer pushed progress events, fall back to polling
+    if (window.EventSource) {
+        startEventStream(currentJobId);
+    } else {
+        startPolling(currentJobId);
+    }
+}
+
+function startEventStream(jobId) {
+    progressSource = new EventSource(`${API_BASE}/convert/events/${jobId}`);
+    
+    progressSource.addEventListener('status', event => {
+        const status = JSON.parse(event.data);
+        updateProgress(status);
+        
+        if (status.status === 'completed' || status.status === 'failed') {
+            stopProgressMonitoring();
+            finishConversion(jobId, status);
+        }
+    });
+    
+    progressSource.addEventListener('track', event => {
+        updateTrackProgress(JSON.parse(event.data));
+    });
+    
+    progressSource.onerror = () => {
+        // EventSource reconnects on its own unless the stream is unavailable
+        if (progressSource.readyState === EventSource.CLOSED) {
+            stopProgressMonitoring();
+            startPolling(jobId);
+        }
+    };
+}
+
+function startPolling(jobId) {
+    let cursor = 0;
+    
     progressInterval = setInterval(() => {
-        getConversionStatus(currentJobId)
+        getConversionStatus(jobId, cursor)
             .then(status => {
+                cursor = status.cursor;
                 updateProgress(status);
                 
                 if (status.status === 'completed') {
-                    clearInterval(progressInterval);
-                    showDownloadReady(status);
+                    stopProgressMonitoring();
+                    finishConversion(jobId, status);
                 } else if (status.status === 'failed') {
-                    clearInterval(progressInterval);
+                    stopProgressMonitoring();
                     showError(status.error || 'Conversion failed');
                 }
             })
             .catch(error => {
-                clearInterval(progressInterval);
+                stopProgressMonitoring();
                 showError(error.message);
             });
     }, 2000); // Poll every 2 seconds
 }
 
+function stopProgressMonitoring() {
+    if (progressSource) {
+        progressSource.close();
+        progressSource = null;
+    }
+    if (progressInterval) {
+        clearInterval(progressInterval);
+        progressInterval = null;
+    }
+}
+
+function finishConversion(jobId, status) {
+    if (status.status === 'failed') {
+        showError(status.error || 'Conversion failed');
+        return;
+    }
+    
+    // One full status request for the per-track results shown on the download step
+    getConversionStatus(jobId)
+        .then(showDownloadReady)
+        .catch(error => showError(error.message));
+}
+
+function updateTrackProgress(update) {
+    const total = currentPlaylist.total_tracks;
+    const progress = total > 0 ? Math.round(update.completed_tracks / total * 1000) / 10 : 0;
+    
+    updateProgress({
+        status: 'processing',
+        completed_tracks: update.completed_tracks,
+        failed_tracks: update.failed_tracks,
+        progress: progress,
+        current_track: update.event === 'started' ? `${update.name} - ${update.artists.join(', ')}` : null
+    });
+}
+
 function updateProgress(status) {
     elements.completedCount.textContent = status.completed_tracks;
     elements.failedCount.textContent = status.failed_tracks;
@@ -369,11 +445,7 @@ function handleNewConversion() {
     // Reset state
     currentPlaylist = null;
     currentJobId = null;
-    
-    if (progressInterval) {
-        clearInterval(progressInterval);
-        progressInterval = null;
-    }
+    stopProgressMonitoring();
     
     // Clear input
     elements.playlistUrl.value = '';
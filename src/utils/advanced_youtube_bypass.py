@@ -12,14 +12,30 @@ from urllib.parse import urlparse, parse_qs
 import json
 import re
 from youtube_search import YoutubeSearch
-import yt_dlp
 from .cookie_bypass import CookieBypass
+from .search_cache import search_cache
+from .audio_cache import audio_cache
+from .track_matcher import search_ranked, verify_candidates
+from .deadline import TrackTimeoutError, deadline_sleep
+from .ffmpeg_locator import ffmpeg_locator
+from .transcoder import first_audio_output
+from .ydl_pool import YDLPool
 
 class AdvancedYouTubeBypass:
+    AUDIO_BITRATE = '128'
+    
     def __init__(self):
         self.session = requests.Session()
         self.proxies = []
         self.cookie_bypass = CookieBypass()
+        # When False, raw audio is kept and transcoded by the caller
+        self.extract_audio = True
+        # yt-dlp instances reused across tracks, one per player client
+        self.ydl_pool = YDLPool()
+        # Path of the file written by the last successful download
+        self.output_file = None
+        # Search result the last successful download came from (with its match_score)
+        self.matched_video = None
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -32,16 +48,15 @@ class AdvancedYouTubeBypass:
         
     def get_advanced_ydl_opts(self, output_path, filename, use_cookies=True):
         """Get advanced yt-dlp options with maximum bypass techniques"""
-        ffmpeg_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'ffmpeg', 'ffmpeg.exe')
         opts = {
             'format': 'bestaudio/best[height<=480]/worst',
             'outtmpl': os.path.join(output_path, f'{filename}.%(ext)s'),
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
-                'preferredquality': '128',  # Lower quality for faster processing
-            }],
-            'ffmpeg_location': ffmpeg_path,
+                'preferredquality': self.AUDIO_BITRATE,  # Lower quality for faster processing
+            }] if self.extract_audio else [],
+            'ffmpeg_location': ffmpeg_locator.location(),
             'quiet': True,
             'no_warnings': True,
             'extract_flat': False,
@@ -112,7 +127,7 @@ class AdvancedYouTubeBypass:
         return opts
     
     def try_alternative_extractors(self, video_url, output_path, filename):
-        """Try alternative extraction methods"""
+        """Try alternative extraction methods; returns the paths of the downloaded files"""
         methods = [
             self._try_android_client,
             self._try_web_client,
@@ -124,23 +139,37 @@ class AdvancedYouTubeBypass:
             try:
                 result = method(video_url, output_path, filename)
                 if result:
-                    return True
-                time.sleep(random.uniform(1, 3))
+                    return result
+                deadline_sleep(random.uniform(1, 3))
+            except TrackTimeoutError:
+                raise
             except Exception as e:
                 print(f"    Method {method.__name__} failed: {str(e)[:100]}")
                 continue
         
         return False
     
+    def _download_with_client(self, client, customize_opts, video_url, output_path, filename):
+        """Download through the pooled yt-dlp instance for one player client; returns the file paths"""
+        def make_opts():
+            opts = self.get_advanced_ydl_opts(output_path, filename)
+            customize_opts(opts)
+            return opts
+        
+        return self.ydl_pool.download(
+            (client, self.extract_audio),
+            make_opts,
+            [video_url],
+            outtmpl=os.path.join(output_path, f'{filename}.%(ext)s')
+        )
+    
     def _try_android_client(self, video_url, output_path, filename):
         """Try with Android client"""
         try:
-            opts = self.get_advanced_ydl_opts(output_path, filename)
-            opts['extractor_args']['youtube']['player_client'] = ['android']
+            def customize(opts):
+                opts['extractor_args']['youtube']['player_client'] = ['android']
             
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                ydl.download([video_url])
-            return True
+            return self._download_with_client('android', customize, video_url, output_path, filename)
         except Exception as e:
             print(f"      Android client error: {str(e)[:100]}")
             return False
@@ -148,13 +177,11 @@ class AdvancedYouTubeBypass:
     def _try_web_client(self, video_url, output_path, filename):
         """Try with web client and different user agent"""
         try:
-            opts = self.get_advanced_ydl_opts(output_path, filename)
-            opts['extractor_args']['youtube']['player_client'] = ['web']
-            opts['http_headers']['User-Agent'] = random.choice(self.user_agents)
+            def customize(opts):
+                opts['extractor_args']['youtube']['player_client'] = ['web']
+                opts['http_headers']['User-Agent'] = random.choice(self.user_agents)
             
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                ydl.download([video_url])
-            return True
+            return self._download_with_client('web', customize, video_url, output_path, filename)
         except Exception as e:
             print(f"      Web client error: {str(e)[:100]}")
             return False
@@ -162,12 +189,10 @@ class AdvancedYouTubeBypass:
     def _try_embedded_client(self, video_url, output_path, filename):
         """Try with embedded client"""
         try:
-            opts = self.get_advanced_ydl_opts(output_path, filename)
-            opts['extractor_args']['youtube']['player_client'] = ['web_embedded']
+            def customize(opts):
+                opts['extractor_args']['youtube']['player_client'] = ['web_embedded']
             
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                ydl.download([video_url])
-            return True
+            return self._download_with_client('web_embedded', customize, video_url, output_path, filename)
         except Exception as e:
             print(f"      Embedded client error: {str(e)[:100]}")
             return False
@@ -175,60 +200,52 @@ class AdvancedYouTubeBypass:
     def _try_mobile_client(self, video_url, output_path, filename):
         """Try with mobile client"""
         try:
-            opts = self.get_advanced_ydl_opts(output_path, filename)
-            opts['extractor_args']['youtube']['player_client'] = ['mweb']
-            opts['http_headers']['User-Agent'] = 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15'
+            def customize(opts):
+                opts['extractor_args']['youtube']['player_client'] = ['mweb']
+                opts['http_headers']['User-Agent'] = 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15'
             
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                ydl.download([video_url])
-            return True
+            return self._download_with_client('mweb', customize, video_url, output_path, filename)
         except Exception as e:
             print(f"      Mobile client error: {str(e)[:100]}")
             return False
     
-    def search_alternative_sources(self, track_name, artists):
-        """Search for alternative video sources"""
+    def search_alternative_sources(self, track_name, artists, duration_ms=None):
+        """Search for alternative video sources, served from the shared search cache when possible"""
+        return search_cache.get_or_search(track_name, artists, duration_ms,
+                                          lambda: self._search_alternative_sources(track_name, artists, duration_ms))
+    
+    def _search_alternative_sources(self, track_name, artists, duration_ms=None):
+        # Fallback variants are only searched while no candidate is a convincing match
         search_variations = [
             f"{track_name} {' '.join(artists)}",
-            f"{track_name} {artists[0]} official",
-            f"{track_name} {artists[0]} audio",
-            f"{track_name} {artists[0]} music video",
-            f"{track_name} {artists[0]} lyrics",
-            f"{' '.join(artists)} {track_name}",
-            f"{track_name} cover",
-            f"{track_name} karaoke",
-            f"{track_name} instrumental",
+            f"{track_name} {artists[0]} official audio",
+            f"{' '.join(artists)} {track_name} lyrics",
         ]
         
-        all_results = []
-        for query in search_variations:
-            try:
-                results = YoutubeSearch(query, max_results=3).to_dict()
-                all_results.extend(results)
-                time.sleep(random.uniform(0.5, 1.5))
-            except Exception as e:
-                print(f"Search failed for '{query}': {e}")
-                continue
-        
-        # Remove duplicates and sort by relevance
-        unique_results = []
-        seen_ids = set()
-        for result in all_results:
-            if result['id'] not in seen_ids:
-                unique_results.append(result)
-                seen_ids.add(result['id'])
-        
-        return unique_results[:10]  # Return top 10 unique results
+        ranked = search_ranked(
+            search_variations, lambda query: YoutubeSearch(query, max_results=5).to_dict(),
+            track_name, artists, duration_ms, between_queries=lambda: deadline_sleep(random.uniform(0.5, 1.5))
+        )
+        return ranked[:10]  # Return top 10 ranked results
     
-    def download_with_advanced_bypass(self, track_name, artists, output_path, max_attempts=3):
-        """Main download function with all bypass techniques"""
+    def download_with_advanced_bypass(self, track_name, artists, output_path, max_attempts=3, duration_ms=None, videos=None,
+                                      album=None, year=None):
+        """Main download function with all bypass techniques (``videos``: candidates already found by the caller)"""
         print(f"🔄 Advanced bypass for: {track_name} by {', '.join(artists)}")
+        self.output_file = None
+        self.matched_video = None
         
-        # Search for videos
-        videos = self.search_alternative_sources(track_name, artists)
+        # Search for videos unless the caller already did
+        if videos is None:
+            videos = self.search_alternative_sources(track_name, artists, duration_ms)
         if not videos:
             return False, "No videos found"
         
+        # Drop candidates whose length rules them out before fetching anything
+        videos = verify_candidates(videos, track_name, artists, duration_ms, album, year)
+        if not videos:
+            return False, "No search result matches the track length"
+        
         # Try each video with different methods
         for i, video in enumerate(videos):
             video_url = f"https://www.youtube.com/watch?v={video['id']}"
@@ -238,34 +255,54 @@ class AdvancedYouTubeBypass:
             safe_filename = "".join(c for c in f"{track_name} - {', '.join(artists)}" 
                                   if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
             
+            # Reuse an earlier transcode of this video if we have one
+            cached_file = os.path.join(output_path, f"{safe_filename}.mp3")
+            if audio_cache.link_into(video['id'], cached_file, bitrate=self.AUDIO_BITRATE):
+                print(f"  ⚡ Cached: {video['title'][:50]}")
+                search_cache.record_choice(track_name, artists, video, duration_ms)
+                self.output_file = cached_file
+                self.matched_video = video
+                return True, f"Cached: {video['title']}"
+            
             # Try alternative extractors
             for attempt in range(max_attempts):
                 try:
                     print(f"    Attempt {attempt + 1}/{max_attempts}")
                     
-                    if self.try_alternative_extractors(video_url, output_path, safe_filename):
-                        # Check if file was created
-                        for file in os.listdir(output_path):
-                            if file.startswith(safe_filename) and file.endswith('.mp3'):
-                                print(f"  ✅ Success: {file}")
-                                return True, f"Downloaded: {video['title']}"
+                    file_paths = self.try_alternative_extractors(video_url, output_path, safe_filename)
+                    if file_paths:
+                        # yt-dlp reports the final file; no need to scan the directory
+                        output_file = first_audio_output(file_paths, self.extract_audio)
+                        if output_file:
+                            print(f"  ✅ Success: {os.path.basename(output_file)}")
+                            search_cache.record_choice(track_name, artists, video, duration_ms)
+                            if output_file.endswith('.mp3'):
+                                audio_cache.insert(video['id'], output_file, bitrate=self.AUDIO_BITRATE)
+                            self.output_file = output_file
+                            self.matched_video = video
+                            return True, f"Downloaded: {video['title']}"
                         
-                        # If no MP3 found, try to find any audio file
-                        for file in os.listdir(output_path):
-                            if safe_filename.lower() in file.lower() and any(ext in file.lower() for ext in ['.mp3', '.m4a', '.webm', '.ogg']):
-                                print(f"  ✅ Success (alt format): {file}")
-                                return True, f"Downloaded: {video['title']}"
+                        # If no MP3 was produced, accept the raw audio file
+                        output_file = first_audio_output(file_paths, extract_audio=False)
+                        if output_file:
+                            print(f"  ✅ Success (alt format): {os.path.basename(output_file)}")
+                            search_cache.record_choice(track_name, artists, video, duration_ms)
+                            self.output_file = output_file
+                            self.matched_video = video
+                            return True, f"Downloaded: {video['title']}"
                     
+                except TrackTimeoutError:
+                    raise
                 except Exception as e:
                     print(f"    ❌ Attempt {attempt + 1} failed: {str(e)[:100]}")
                     if attempt < max_attempts - 1:
                         delay = random.uniform(3, 8) * (attempt + 1)  # Exponential backoff
                         print(f"    ⏳ Waiting {delay:.1f}s before retry...")
-                        time.sleep(delay)
+                        deadline_sleep(delay)
                     continue
             
             # Wait before trying next video
-            time.sleep(random.uniform(2, 5))
+            deadline_sleep(random.uniform(2, 5))
         
         return False, "All bypass attempts failed"
     
@@ -319,4 +356,6 @@ where YouTube's bot detection is not active.
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(content)
         
+        self.output_file = output_file
+        self.matched_video = None
         return True, f"Enhanced demo file created for: {track_name}"
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+Background reaper for expired conversion jobs and their files on disk
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Job statuses whose directories are still being written
+RUNNING_STATUSES = ('queued', 'started', 'processing')
+
+# Order in which artifacts are evicted when over the disk budget
+EVICTION_ORDER = ('orphaned', 'downloaded', 'finished')
+
+# Seconds after a download during which its archive may still be streaming
+DOWNLOAD_GRACE = 600
+
+# Length of the random suffix tempfile.mkdtemp() appends to the prefix
+MKDTEMP_SUFFIX_LENGTH = 8
+
+def directory_size(path):
+    """Total size in bytes of the files under ``path``"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass  # Removed while walking
+    return total
+
+class ArtifactReaper:
+    """Periodically removes expired jobs and keeps job directories under a disk budget.
+
+    Each blueprint registers its jobs with ``register``: the prefix of the job
+    directories it creates in the temp directory, a lookup for the job owning a
+    directory and the function that expires its old jobs. Every ``interval``
+    seconds the reaper expires jobs older than ``job_ttl`` and, if the remaining
+    directories use more than ``max_bytes``, deletes finished artifacts, oldest
+    first, starting with directories no job owns and then jobs already downloaded.
+    Directories of running jobs and of archives downloaded in the last
+    ``DOWNLOAD_GRACE`` seconds are never touched.
+    """
+
+    def __init__(self, interval=None, job_ttl=None, max_bytes=None, root=None, orphan_grace=3600):
+        self.interval = interval or float(os.getenv('REAPER_INTERVAL_SECONDS', '3600'))
+        self.job_ttl = job_ttl or timedelta(hours=float(os.getenv('JOB_TTL_HOURS', '24')))
+        self.max_bytes = max_bytes or int(os.getenv('ARTIFACT_MAX_BYTES', 5 * 1024 ** 3))
+        self.root = root or tempfile.gettempdir()
+        # Directories without a job are only orphaned once this old (the job may not be saved yet)
+        self.orphan_grace = orphan_grace
+        self._sources = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self.counters = {'runs': 0, 'expired_dirs': 0, 'evicted_dirs': 0, 'bytes_reclaimed': 0}
+        self.disk_usage = 0
+        self.last_run = None
+
+    def register(self, name, dir_prefix, get_job, expire_jobs):
+        """Add a blueprint's jobs.
+
+        ``get_job(job_id)`` returns the job dict or None, and ``expire_jobs(cutoff)``
+        deletes jobs created before ``cutoff`` together with their files.
+        """
+        self._sources.append({'name': name, 'dir_prefix': dir_prefix,
+                              'get_job': get_job, 'expire_jobs': expire_jobs})
+
+    def start(self):
+        """Run the reaper in a daemon thread (only the first call starts it)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name='artifact-reaper')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def run_once(self):
+        """One reaper pass; returns the bytes reclaimed"""
+        now = time.time()
+        cutoff = datetime.now() - self.job_ttl
+        artifacts = self._scan()
+
+        for source in self._sources:
+            try:
+                source['expire_jobs'](cutoff)
+            except Exception as e:
+                print(f"Error expiring {source['name']} jobs: {e}")
+
+        reclaimed = 0
+        remaining = []
+        for artifact in artifacts:
+            if not os.path.exists(artifact['path']):
+                # Removed together with its expired job
+                reclaimed += artifact['size']
+                self.counters['expired_dirs'] += 1
+            elif artifact['state'] == 'orphaned' and artifact['created'] < cutoff.timestamp():
+                reclaimed += self._remove(artifact)
+                self.counters['expired_dirs'] += 1
+            else:
+                remaining.append(artifact)
+
+        usage = sum(artifact['size'] for artifact in remaining)
+        if usage > self.max_bytes:
+            candidates = [artifact for artifact in remaining
+                          if artifact['state'] in EVICTION_ORDER
+                          and not (artifact['state'] == 'orphaned' and now - artifact['created'] < self.orphan_grace)]
+            candidates.sort(key=lambda artifact: (EVICTION_ORDER.index(artifact['state']), artifact['created']))
+
+            for artifact in candidates:
+                if usage <= self.max_bytes:
+                    break
+                freed = self._remove(artifact)
+                usage -= artifact['size']
+                reclaimed += freed
+                self.counters['evicted_dirs'] += 1
+                print(f"Evicted {artifact['state']} artifacts of {artifact['source']} job {artifact['job_id']} "
+                      f"({freed / 1024 ** 2:.1f} MB) to stay under the disk budget")
+
+        with self._lock:
+            self.counters['runs'] += 1
+            self.counters['bytes_reclaimed'] += reclaimed
+            self.disk_usage = usage
+            self.last_run = now
+        return reclaimed
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, disk_usage_bytes=self.disk_usage, max_bytes=self.max_bytes,
+                        interval=self.interval, job_ttl_hours=self.job_ttl.total_seconds() / 3600,
+                        last_run=self.last_run)
+
+    def _scan(self):
+        """Job directories of every registered blueprint with their size and state"""
+        artifacts = []
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError as e:
+            print(f"Reaper cannot list {self.root}: {e}")
+            return artifacts
+
+        for source in self._sources:
+            prefix = source['dir_prefix']
+            for entry in entries:
+                if not entry.name.startswith(prefix) or not entry.is_dir(follow_symlinks=False):
+                    continue
+                # <prefix><job_id>_<random suffix from mkdtemp>
+                job_id = entry.name[len(prefix):-(MKDTEMP_SUFFIX_LENGTH + 1)]
+                try:
+                    job = source['get_job'](job_id)
+                    created = entry.stat().st_mtime
+                except Exception as e:
+                    print(f"Reaper skipped {entry.path}: {e}")
+                    continue
+
+                if job is None:
+                    state = 'orphaned'
+                elif job.get('status') in RUNNING_STATUSES:
+                    state = 'running'
+                elif job.get('downloaded_at') and time.time() - job['downloaded_at'] < DOWNLOAD_GRACE:
+                    state = 'downloading'
+                elif job.get('downloaded_at'):
+                    state = 'downloaded'
+                else:
+                    state = 'finished'
+                if job is not None and isinstance(job.get('created_at'), datetime):
+                    created = job['created_at'].timestamp()
+
+                artifacts.append({'source': source['name'], 'job_id': job_id, 'path': entry.path,
+                                  'state': state, 'created': created, 'size': directory_size(entry.path)})
+        return artifacts
+
+    def _remove(self, artifact):
+        shutil.rmtree(artifact['path'], ignore_errors=True)
+        if os.path.exists(artifact['path']):
+            return artifact['size'] - directory_size(artifact['path'])
+        return artifact['size']
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                reclaimed = self.run_once()
+                if reclaimed:
+                    print(f"Reaper reclaimed {reclaimed / 1024 ** 2:.1f} MB")
+            except Exception as e:
+                print(f"Reaper pass failed: {e}")
+
+reaper = ArtifactReaper()
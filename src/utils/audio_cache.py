@@ -0,0 +1,157 @@
+"""
+Content-addressed cache of transcoded audio files
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from src.utils.tiered_cache import get_cache_dir
+
+# ioctl request for reflinking a file on Linux filesystems that support it (btrfs, xfs)
+FICLONE = 0x40049409
+
+def link_file(src, dest):
+    """Place ``src`` at ``dest`` as a hardlink, reflink or (last resort) a copy"""
+    try:
+        os.link(src, dest)
+        return 'hardlink'
+    except OSError:
+        pass
+
+    try:
+        import fcntl
+        with open(src, 'rb') as s, open(dest, 'wb') as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return 'reflink'
+    except (ImportError, OSError):
+        pass
+
+    shutil.copyfile(src, dest)
+    return 'copy'
+
+class AudioCache:
+    """Transcoded audio keyed by (video id, codec, bitrate).
+
+    Files are stored under the SHA-256 of their key and inserted with a
+    write-then-rename so readers never see partial files. The cache keeps to a
+    byte budget by evicting the least recently used files (by mtime, which is
+    refreshed on every hit).
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or os.getenv('AUDIO_CACHE_DIR') or os.path.join(get_cache_dir(), 'audio_cache')
+        self.max_bytes = max_bytes or int(os.getenv('AUDIO_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+        self._lock = threading.Lock()
+        self._size = None
+        self.counters = {'hits': 0, 'misses': 0, 'inserts': 0, 'evictions': 0}
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, video_id, codec, bitrate):
+        digest = hashlib.sha256(f"{video_id}|{codec}|{bitrate}".encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}.{codec}")
+
+    def lookup(self, video_id, codec='mp3', bitrate='128'):
+        """Path of the cached file, or None"""
+        path = self.path_for(video_id, codec, bitrate)
+        try:
+            os.utime(path)
+        except OSError:
+            self.counters['misses'] += 1
+            return None
+        self.counters['hits'] += 1
+        return path
+
+    def link_into(self, video_id, dest_path, codec='mp3', bitrate='128'):
+        """Place a cached file at ``dest_path``; returns True on a cache hit"""
+        path = self.lookup(video_id, codec, bitrate)
+        if path is None:
+            return False
+        # Link next to the destination and rename over it, so an existing file at
+        # dest_path (possibly another link to the cached inode) is never truncated
+        temp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            link_file(path, temp_path)
+            os.replace(temp_path, dest_path)
+            # rename() is a no-op when both names are already links to the same file
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return True
+        except OSError as e:
+            # Evicted between lookup and link
+            print(f"Audio cache link failed for {video_id}: {e}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return False
+
+    def insert(self, video_id, src_path, codec='mp3', bitrate='128'):
+        """Add a transcoded file to the cache"""
+        path = self.path_for(video_id, codec, bitrate)
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        os.close(fd)
+        try:
+            os.unlink(temp_path)
+            link_file(src_path, temp_path)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Audio cache insert failed for {video_id}: {e}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return None
+
+        with self._lock:
+            self.counters['inserts'] += 1
+            if self._size is not None:
+                self._size += os.path.getsize(path)
+            if self._current_size() > self.max_bytes:
+                self._evict()
+        return path
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, bytes=self._current_size(), max_bytes=self.max_bytes)
+
+    def _entries(self):
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if name.endswith('.part'):
+                    continue
+                path = os.path.join(shard_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _current_size(self):
+        # Caller holds self._lock
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._entries())
+        return self._size
+
+    def _evict(self):
+        # Caller holds self._lock. Rescan so files added by other processes are counted.
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        size = sum(entry[2] for entry in entries)
+        target = self.max_bytes * 0.9
+
+        for path, _, file_size in entries:
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+                size -= file_size
+                self.counters['evictions'] += 1
+            except OSError:
+                continue
+        self._size = size
+
+# Shared by all downloaders in this process
+audio_cache = AudioCache()
@@ -8,10 +8,18 @@ import tempfile
 import subprocess
 import json
 from pathlib import Path
-import yt_dlp
 from youtube_search import YoutubeSearch
+from src.utils.search_cache import search_cache
+from src.utils.audio_cache import audio_cache
+from src.utils.track_matcher import search_ranked, verify_candidates
+from src.utils.deadline import TrackTimeoutError, deadline_sleep
+from src.utils.ffmpeg_locator import ffmpeg_locator
+from src.utils.transcoder import first_audio_output
+from src.utils.ydl_pool import YDLPool
 
 class AuthenticatedBypass:
+    AUDIO_BITRATE = '128'
+    
     def __init__(self):
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -21,6 +29,14 @@ class AuthenticatedBypass:
         ]
         self.download_archive = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
         self.download_archive.close()
+        # When False, raw audio is kept and transcoded by the caller
+        self.extract_audio = True
+        # yt-dlp instances reused across tracks, keeping one cookie jar (deleted on cleanup)
+        self.ydl_pool = YDLPool(temp_file_options=('cookiefile',))
+        # Path of the file written by the last successful download
+        self.output_file = None
+        # Search result the last successful download came from (with its match_score)
+        self.matched_video = None
     
     def create_realistic_cookies(self):
         """Create realistic YouTube cookies"""
@@ -96,7 +112,6 @@ class AuthenticatedBypass:
     def get_authenticated_opts(self, output_path, filename):
         """Get yt-dlp options with authentication and rate limiting"""
         cookie_file = self.create_realistic_cookies()
-        ffmpeg_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'ffmpeg', 'ffmpeg.exe')
         
         return {
             'format': 'bestaudio[ext=m4a]/bestaudio/best',
@@ -104,9 +119,9 @@ class AuthenticatedBypass:
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
-                'preferredquality': '128',
-            }],
-            'ffmpeg_location': ffmpeg_path,
+                'preferredquality': self.AUDIO_BITRATE,
+            }] if self.extract_audio else [],
+            'ffmpeg_location': ffmpeg_locator.location(),
             
             # Authentication
             'cookiefile': cookie_file,
@@ -164,37 +179,41 @@ class AuthenticatedBypass:
             'geo_bypass_country': random.choice(['US', 'CA', 'GB']),
         }
     
-    def download_with_authentication(self, track_name, artists, output_path):
-        """Download with full authentication and rate limiting"""
-        print(f"🔐 Authenticated bypass: {track_name} by {', '.join(artists)}")
-        
-        # Search for videos
+    def search_authenticated(self, track_name, artists, duration_ms=None):
+        """Rate-limited search over a few query variants, served from the shared search cache when possible"""
+        return search_cache.get_or_search(track_name, artists, duration_ms,
+                                          lambda: self._search_authenticated(track_name, artists, duration_ms))
+    
+    def _search_authenticated(self, track_name, artists, duration_ms=None):
         search_queries = [
             f"{track_name} {' '.join(artists)}",
             f"{track_name} {artists[0]} official",
             f"{track_name} {artists[0]} audio"
         ]
         
-        all_videos = []
-        for query in search_queries:
-            try:
-                results = YoutubeSearch(query, max_results=2).to_dict()
-                all_videos.extend(results)
-                time.sleep(random.uniform(1, 3))  # Rate limit searches
-            except Exception as e:
-                print(f"  Search failed for '{query}': {e}")
-                continue
+        # Extra queries only while the best result is not a convincing match
+        return search_ranked(
+            search_queries, lambda query: YoutubeSearch(query, max_results=5).to_dict(),
+            track_name, artists, duration_ms, between_queries=lambda: deadline_sleep(random.uniform(1, 3))  # Rate limit searches
+        )
+    
+    def download_with_authentication(self, track_name, artists, output_path, duration_ms=None, videos=None, album=None, year=None):
+        """Download with full authentication and rate limiting (``videos``: candidates already found by the caller)"""
+        print(f"🔐 Authenticated bypass: {track_name} by {', '.join(artists)}")
+        self.output_file = None
+        self.matched_video = None
         
-        if not all_videos:
+        # Search for videos unless the caller already did
+        unique_videos = videos
+        if unique_videos is None:
+            unique_videos = self.search_authenticated(track_name, artists, duration_ms)
+        if not unique_videos:
             return False, "No videos found"
         
-        # Remove duplicates
-        unique_videos = []
-        seen_ids = set()
-        for video in all_videos:
-            if video['id'] not in seen_ids:
-                unique_videos.append(video)
-                seen_ids.add(video['id'])
+        # Drop candidates whose length rules them out before fetching anything
+        unique_videos = verify_candidates(unique_videos, track_name, artists, duration_ms, album, year)
+        if not unique_videos:
+            return False, "No search result matches the track length"
         
         # Try each video with authentication
         for i, video in enumerate(unique_videos[:3]):  # Limit to 3 attempts
@@ -202,41 +221,53 @@ class AuthenticatedBypass:
             safe_filename = "".join(c for c in f"{track_name} - {', '.join(artists)}" 
                                   if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
             
+            # Reuse an earlier transcode of this video if we have one
+            cached_file = os.path.join(output_path, f"{safe_filename}.mp3")
+            if audio_cache.link_into(video['id'], cached_file, bitrate=self.AUDIO_BITRATE):
+                print(f"  ⚡ Cached: {video['title'][:50]}")
+                search_cache.record_choice(track_name, artists, video, duration_ms)
+                self.output_file = cached_file
+                self.matched_video = video
+                return True, f"Cached: {video['title']}"
+            
             print(f"  🔐 Attempt {i+1}: {video['title'][:50]}...")
             
             try:
-                opts = self.get_authenticated_opts(output_path, safe_filename)
-                
-                with yt_dlp.YoutubeDL(opts) as ydl:
-                    ydl.download([video_url])
+                file_paths = self.ydl_pool.download(
+                    ('authenticated', self.extract_audio),
+                    lambda: self.get_authenticated_opts(output_path, safe_filename),
+                    [video_url],
+                    outtmpl=os.path.join(output_path, f'{safe_filename}.%(ext)s')
+                )
                 
-                # Check if file was created
-                for file in os.listdir(output_path):
-                    if safe_filename.lower() in file.lower() and file.endswith('.mp3'):
-                        print(f"  ✅ Authenticated success: {file}")
-                        return True, f"Downloaded with auth: {video['title']}"
+                # yt-dlp reports the final file; no need to scan the directory
+                output_file = first_audio_output(file_paths, self.extract_audio)
+                if output_file:
+                    print(f"  ✅ Authenticated success: {os.path.basename(output_file)}")
+                    search_cache.record_choice(track_name, artists, video, duration_ms)
+                    if output_file.endswith('.mp3'):
+                        audio_cache.insert(video['id'], output_file, bitrate=self.AUDIO_BITRATE)
+                    self.output_file = output_file
+                    self.matched_video = video
+                    return True, f"Downloaded with auth: {video['title']}"
                 
+            except TrackTimeoutError:
+                raise
             except Exception as e:
                 print(f"  ❌ Auth attempt failed: {str(e)[:100]}")
                 
-                # Clean up cookie file
-                try:
-                    if 'cookiefile' in opts:
-                        os.unlink(opts['cookiefile'])
-                except:
-                    pass
-                
                 # Wait longer between failed attempts
                 if i < len(unique_videos) - 1:
                     wait_time = random.uniform(15, 30)
                     print(f"  ⏳ Waiting {wait_time:.1f}s before next attempt...")
-                    time.sleep(wait_time)
+                    deadline_sleep(wait_time)
                 continue
         
         return False, "All authenticated attempts failed"
     
     def cleanup(self):
         """Clean up temporary files"""
+        self.ydl_pool.close()
         try:
             os.unlink(self.download_archive.name)
         except:
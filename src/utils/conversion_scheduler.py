@@ -0,0 +1,171 @@
+"""
+Process-wide conversion scheduler shared by all jobs
+"""
+import os
+import threading
+from collections import OrderedDict, deque
+
+DEFAULT_DOWNLOAD_SLOTS = max(2, min(8, os.cpu_count() or 2))
+DEFAULT_TRANSCODE_SLOTS = max(1, os.cpu_count() or 1)
+
+class SchedulerFullError(Exception):
+    """Raised when the scheduler cannot accept another job"""
+    def __init__(self, queued_jobs):
+        super().__init__(f"Conversion queue is full ({queued_jobs} jobs waiting)")
+        self.queued_jobs = queued_jobs
+
+class _ScheduledJob:
+    def __init__(self, job_id, tasks, max_concurrency, on_start, on_complete):
+        self.job_id = job_id
+        self.pending = deque(tasks)
+        self.in_flight = 0
+        self.max_concurrency = max_concurrency
+        self.on_start = on_start
+        self.on_complete = on_complete
+        self.started = False
+
+class ConversionScheduler:
+    """Runs track tasks from all jobs on a fixed set of download slots.
+
+    Active jobs are served round-robin, one task per turn, so a large playlist
+    cannot starve a small one. Jobs beyond ``max_active_jobs`` wait in a bounded
+    queue; when that queue is full ``submit`` raises ``SchedulerFullError``.
+    Tracks encoded on their download slot (no transcode pipeline) share the
+    separate ``transcode_slots`` semaphore.
+    """
+
+    def __init__(self, download_slots=None, transcode_slots=None, max_active_jobs=None, max_queued_jobs=None):
+        self.download_slots = download_slots or DEFAULT_DOWNLOAD_SLOTS
+        self.transcode_slot_count = transcode_slots or DEFAULT_TRANSCODE_SLOTS
+        self.max_active_jobs = max_active_jobs or self.download_slots
+        self.max_queued_jobs = max_queued_jobs if max_queued_jobs is not None else 20
+        self.transcode_slots = threading.BoundedSemaphore(self.transcode_slot_count)
+        self._cond = threading.Condition()
+        self._active = OrderedDict()
+        self._waiting = deque()
+        self._workers = []
+
+    def submit(self, job_id, tasks, on_start=None, on_complete=None, max_concurrency=None):
+        """Queue a job's tasks and return its queue position (0 = running now)"""
+        if not tasks:
+            raise ValueError("A scheduled job needs at least one task")
+
+        entry = _ScheduledJob(
+            job_id,
+            tasks,
+            max_concurrency or self.download_slots,
+            on_start,
+            on_complete
+        )
+
+        with self._cond:
+            if len(self._active) < self.max_active_jobs:
+                self._active[job_id] = entry
+                position = 0
+            elif len(self._waiting) < self.max_queued_jobs:
+                self._waiting.append(entry)
+                position = len(self._waiting)
+            else:
+                raise SchedulerFullError(len(self._waiting))
+
+            self._ensure_workers()
+            self._cond.notify_all()
+
+        return position
+
+    def queue_position(self, job_id):
+        """Estimated start position of a job: 0 if running, None if unknown"""
+        with self._cond:
+            if job_id in self._active:
+                return 0
+            for position, entry in enumerate(self._waiting, 1):
+                if entry.job_id == job_id:
+                    return position
+        return None
+
+    def stats(self):
+        """Snapshot of scheduler load"""
+        with self._cond:
+            return {
+                'download_slots': self.download_slots,
+                'transcode_slots': self.transcode_slot_count,
+                'active_jobs': len(self._active),
+                'queued_jobs': len(self._waiting),
+                'max_queued_jobs': self.max_queued_jobs,
+                'tasks_in_flight': sum(entry.in_flight for entry in self._active.values()),
+                'tasks_pending': sum(len(entry.pending) for entry in self._active.values()) +
+                                 sum(len(entry.pending) for entry in self._waiting),
+            }
+
+    def _ensure_workers(self):
+        # Caller holds self._cond
+        while len(self._workers) < self.download_slots:
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f'conversion-slot-{len(self._workers) + 1}'
+            )
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _next_task(self):
+        # Caller holds self._cond. The chosen job moves to the back of the rotation.
+        for job_id in list(self._active):
+            entry = self._active[job_id]
+            if entry.pending and entry.in_flight < entry.max_concurrency:
+                self._active.move_to_end(job_id)
+                entry.in_flight += 1
+                first_task = not entry.started
+                entry.started = True
+                return entry, entry.pending.popleft(), first_task
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                item = self._next_task()
+                while item is None:
+                    self._cond.wait()
+                    item = self._next_task()
+
+            entry, task, first_task = item
+
+            try:
+                if first_task and entry.on_start:
+                    entry.on_start()
+                task()
+            except Exception as e:
+                print(f"Scheduled task for job {entry.job_id} failed: {e}")
+
+            self._task_done(entry)
+
+    def _task_done(self, entry):
+        with self._cond:
+            entry.in_flight -= 1
+            finished = not entry.pending and entry.in_flight == 0
+            if finished:
+                self._active.pop(entry.job_id, None)
+                while self._waiting and len(self._active) < self.max_active_jobs:
+                    waiting = self._waiting.popleft()
+                    self._active[waiting.job_id] = waiting
+            self._cond.notify_all()
+
+        if finished and entry.on_complete:
+            try:
+                entry.on_complete()
+            except Exception as e:
+                print(f"Completion handler for job {entry.job_id} failed: {e}")
+
+def _env_int(name, default=None):
+    try:
+        return int(os.getenv(name)) if os.getenv(name) else default
+    except ValueError:
+        return default
+
+# Shared scheduler for every conversion job in this process
+scheduler = ConversionScheduler(
+    download_slots=_env_int('CONVERSION_DOWNLOAD_SLOTS'),
+    transcode_slots=_env_int('CONVERSION_TRANSCODE_SLOTS'),
+    max_active_jobs=_env_int('MAX_ACTIVE_JOBS'),
+    max_queued_jobs=_env_int('MAX_QUEUED_JOBS'),
+)
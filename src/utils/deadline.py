@@ -0,0 +1,65 @@
+"""
+Deadlines bounding how long a track (and a whole job) may keep working
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+class TrackTimeoutError(Exception):
+    """Raised when a track runs past its deadline"""
+
+class Deadline:
+    """A point in time after which work is abandoned, with the reason to report"""
+
+    def __init__(self, seconds, reason):
+        self.expires_at = time.monotonic() + seconds
+        self.reason = reason
+
+    @classmethod
+    def earliest(cls, seconds, reason, other=None):
+        """A deadline ``seconds`` from now, or ``other`` if that one comes first"""
+        deadline = cls(seconds, reason)
+        if other is not None and other.expires_at < deadline.expires_at:
+            return other
+        return deadline
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        """Raise ``TrackTimeoutError`` once the deadline has passed"""
+        if self.expired():
+            raise TrackTimeoutError(self.reason)
+
+# Deadline of the work running on the current thread, checked by sleeps and download hooks
+_current = threading.local()
+
+@contextmanager
+def deadline_scope(deadline):
+    """Make ``deadline`` the current thread's deadline inside the block"""
+    previous = getattr(_current, 'deadline', None)
+    _current.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _current.deadline = previous
+
+def current_deadline():
+    return getattr(_current, 'deadline', None)
+
+def check_deadline():
+    """Raise ``TrackTimeoutError`` if the current thread's deadline has passed"""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+
+def deadline_sleep(seconds):
+    """``time.sleep`` that gives up (raising ``TrackTimeoutError``) instead of sleeping past the deadline"""
+    deadline = current_deadline()
+    if deadline is not None and deadline.remaining() < seconds:
+        time.sleep(deadline.remaining())
+        raise TrackTimeoutError(deadline.reason)
+    time.sleep(seconds)
@@ -0,0 +1,142 @@
+"""
+Shared FFmpeg discovery: the binary is resolved once and probed in the background
+"""
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Encoders per output codec, fastest first; the first one FFmpeg was built with is used
+ENCODER_PREFERENCE = {
+    'mp3': ('libmp3lame', 'libshine', 'mp3_mf'),
+    'opus': ('libopus', 'opus'),
+    'aac': ('aac_at', 'libfdk_aac', 'aac'),
+}
+
+class FFmpegLocator:
+    """Finds FFmpeg (FFMPEG_PATH, the bundled ffmpeg/ folder, then PATH) and caches what it can do.
+
+    ``start_probe`` runs ``ffmpeg -encoders`` and ``-hwaccels`` once in a daemon
+    thread, so startup never waits on a subprocess. Until the probe has finished,
+    ``encoder_for`` answers with the usual default encoder.
+    """
+
+    def __init__(self, bundled_dir=None):
+        self.bundled_dir = bundled_dir or os.path.join(PROJECT_ROOT, 'ffmpeg')
+        self._lock = threading.Lock()
+        self._path = None
+        self._resolved = False
+        self._probe_thread = None
+        self._probed = threading.Event()
+        self._capabilities = {'version': None, 'encoders': [], 'hwaccels': [], 'threads': os.cpu_count() or 1}
+
+    @property
+    def path(self):
+        """Absolute path of the FFmpeg binary, or None if there is none"""
+        with self._lock:
+            if not self._resolved:
+                self._path = self._resolve()
+                self._resolved = True
+            return self._path
+
+    def binary(self):
+        """What to execute: the resolved binary, or plain 'ffmpeg' to fail with a clear error"""
+        return self.path or 'ffmpeg'
+
+    def location(self):
+        """Value for yt-dlp's ``ffmpeg_location``; None lets yt-dlp search PATH itself"""
+        return self.path
+
+    def start_probe(self):
+        """Probe capabilities in the background (only the first call starts a thread)"""
+        with self._lock:
+            if self._probe_thread is not None:
+                return
+            self._probe_thread = threading.Thread(target=self._probe, name='ffmpeg-probe')
+            self._probe_thread.daemon = True
+            self._probe_thread.start()
+
+    def capabilities(self, timeout=None):
+        """Probed capabilities; waits up to ``timeout`` seconds for the probe when given"""
+        if timeout is not None:
+            self.start_probe()
+            self._probed.wait(timeout)
+        with self._lock:
+            return dict(self._capabilities, encoders=list(self._capabilities['encoders']),
+                        hwaccels=list(self._capabilities['hwaccels']))
+
+    def encoder_for(self, codec):
+        """Fastest available encoder for ``codec``, without blocking on the probe"""
+        preference = ENCODER_PREFERENCE[codec]
+        if not self._probed.is_set():
+            return preference[0]
+        with self._lock:
+            available = self._capabilities['encoders']
+        for encoder in preference:
+            if encoder in available:
+                return encoder
+        return preference[0]
+
+    def stats(self):
+        capabilities = self.capabilities()
+        return dict(capabilities, path=self.path, probed=self._probed.is_set())
+
+    def _resolve(self):
+        override = os.getenv('FFMPEG_PATH')
+        if override:
+            if os.path.isdir(override):
+                override = self._find_in_dir(override)
+            if override and os.path.isfile(override):
+                return os.path.abspath(override)
+            print(f"FFMPEG_PATH does not point to an FFmpeg binary: {os.getenv('FFMPEG_PATH')}")
+
+        return self._find_in_dir(self.bundled_dir) or shutil.which('ffmpeg')
+
+    @staticmethod
+    def _find_in_dir(directory):
+        for name in ('ffmpeg', 'ffmpeg.exe'):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                return path
+        return None
+
+    def _probe(self):
+        try:
+            path = self.path
+            if path is None:
+                print("❌ FFmpeg not found")
+                print("Audio conversion may fail without FFmpeg")
+                return
+
+            version = self._run(path, '-version').splitlines()
+            encoders = set()
+            for line in self._run(path, '-encoders').splitlines():
+                # " A....D libmp3lame           libmp3lame MP3 (MPEG audio layer 3)"
+                match = re.match(r'\s*A\S{5}\s+(\S+)', line)
+                if match:
+                    encoders.add(match.group(1))
+            hwaccels = [line.strip() for line in self._run(path, '-hwaccels').splitlines()[1:] if line.strip()]
+
+            with self._lock:
+                self._capabilities['version'] = version[0] if version else None
+                self._capabilities['encoders'] = sorted(
+                    encoder for preference in ENCODER_PREFERENCE.values() for encoder in preference
+                    if encoder in encoders
+                )
+                self._capabilities['hwaccels'] = hwaccels
+            self._probed.set()
+            print(f"✅ FFmpeg is available: {path} (mp3 encoder: {self.encoder_for('mp3')})")
+        except Exception as e:
+            print(f"FFmpeg check failed: {e}")
+        finally:
+            self._probed.set()
+
+    @staticmethod
+    def _run(path, flag):
+        result = subprocess.run([path, '-hide_banner', flag], capture_output=True, text=True, timeout=30)
+        return result.stdout
+
+ffmpeg_locator = FFmpegLocator()
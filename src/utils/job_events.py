@@ -0,0 +1,52 @@
+"""
+Per-job progress events for streaming to clients
+"""
+import os
+import threading
+import time
+
+class JobEventLog:
+    """Ordered progress events of each job, kept in this process.
+
+    Every event gets a per-job sequence number starting at 1, so a client that
+    has seen event ``seq`` asks for everything after it with ``since(job_id, seq)``.
+    """
+
+    def __init__(self):
+        self._events = {}
+        self._cond = threading.Condition()
+
+    def publish(self, job_id, event_type, **data):
+        """Append an event and wake up waiting readers"""
+        with self._cond:
+            events = self._events.setdefault(job_id, [])
+            event = dict(data, seq=len(events) + 1, type=event_type, time=time.time())
+            events.append(event)
+            self._cond.notify_all()
+        return event
+
+    def since(self, job_id, seq=0):
+        """Events with a sequence number above ``seq``"""
+        with self._cond:
+            return list(self._events.get(job_id, [])[seq:])
+
+    def last_seq(self, job_id):
+        with self._cond:
+            return len(self._events.get(job_id, []))
+
+    def wait(self, job_id, seq, timeout):
+        """Block until there are events after ``seq`` or ``timeout`` seconds pass"""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._events.get(job_id, [])) > seq, timeout)
+            return list(self._events.get(job_id, [])[seq:])
+
+    def discard(self, job_id):
+        with self._cond:
+            self._events.pop(job_id, None)
+
+def create_event_log():
+    """Create the event log matching JOB_STORE, shared with worker processes for redis"""
+    if os.getenv('JOB_STORE', 'sqlite').lower() == 'redis':
+        from src.utils.redis_jobs import RedisJobEventLog, get_redis_client
+        return RedisJobEventLog(get_redis_client())
+    return JobEventLog()
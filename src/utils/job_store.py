@@ -0,0 +1,251 @@
+"""
+Pluggable storage for conversion jobs
+"""
+import os
+import threading
+import time
+
+def snapshot_job(job, job_lock):
+    """Copy of a live job taken under ``job_lock``, safe to serialise while workers keep changing it"""
+    with job_lock:
+        return {key: list(value) if isinstance(value, list) else value for key, value in job.items()}
+
+class JobStore:
+    """Dict-like store of conversion jobs.
+
+    Jobs are plain dicts. Workers mutate the dict returned by ``store[job_id]``
+    and then call ``save(job_id)`` so backends that persist jobs can write the
+    change; ``flush=True`` writes immediately instead of in the next batch.
+    """
+
+    def __setitem__(self, job_id, job):
+        raise NotImplementedError
+
+    def __getitem__(self, job_id):
+        raise NotImplementedError
+
+    def __delitem__(self, job_id):
+        raise NotImplementedError
+
+    def __contains__(self, job_id):
+        try:
+            self[job_id]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, job_id, default=None):
+        try:
+            return self[job_id]
+        except KeyError:
+            return default
+
+    def pop(self, job_id, default=None):
+        job = self.get(job_id, default)
+        if job is not default:
+            del self[job_id]
+        return job
+
+    def summary(self, job_id):
+        """A job's status, counters and current track, for status polls.
+
+        Stores may leave out the per-track lists; read those with ``track_lists``.
+        """
+        return self[job_id]
+
+    def track_lists(self, job_id, since=None):
+        """(completed, failed) track entries of a job; only those changed after the ``since`` cursor if given"""
+        job = self[job_id]
+        completed = job.get('completed_track_list', [])
+        failed = job.get('failed_track_list', [])
+        if since is not None:
+            completed = [t for t in completed if t.get('seq', 0) > since]
+            failed = [t for t in failed if t.get('seq', 0) > since]
+        return completed, failed
+
+    def save(self, job_id, flush=False):
+        """Persist changes made to a job"""
+
+    def update(self, job_id, **fields):
+        """Set fields of a job and write them now, including jobs that already finished.
+
+        ``save`` only covers jobs running in this process; finished jobs are read
+        from the backend, so changes to the dict returned for them are not kept.
+        """
+        self[job_id].update(fields)
+        self.save(job_id, flush=True)
+
+    def expired_job_ids(self, cutoff):
+        """IDs of jobs created before ``cutoff``"""
+        raise NotImplementedError
+
+class InMemoryJobStore(JobStore):
+    """Jobs live in this process only"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def __setitem__(self, job_id, job):
+        with self._lock:
+            self._jobs[job_id] = job
+
+    def __getitem__(self, job_id):
+        return self._jobs[job_id]
+
+    def __delitem__(self, job_id):
+        with self._lock:
+            del self._jobs[job_id]
+
+    def __contains__(self, job_id):
+        return job_id in self._jobs
+
+    def expired_job_ids(self, cutoff):
+        with self._lock:
+            return [job_id for job_id, job in self._jobs.items() if job['created_at'] < cutoff]
+
+class SQLiteJobStore(JobStore):
+    """Jobs persisted through Flask-SQLAlchemy so every worker process can read them.
+
+    Jobs created by this process stay in memory while they run and progress
+    writes are batched: ``save`` marks a job dirty and a flusher thread writes
+    all dirty jobs in one transaction every ``flush_interval`` seconds.
+    ``job_lock`` is the lock held by the code changing live jobs; each job is
+    copied under it before it is written.
+    """
+
+    def __init__(self, app, flush_interval=1.0, job_lock=None):
+        from src.models.conversion_job import ConversionJob
+        from src.models.user import db
+
+        self.app = app
+        self.db = db
+        self.model = ConversionJob
+        self.flush_interval = flush_interval
+        self.job_lock = job_lock or threading.RLock()
+        self._live = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        flusher = threading.Thread(target=self._flush_loop, name='job-store-flusher')
+        flusher.daemon = True
+        flusher.start()
+
+    def __setitem__(self, job_id, job):
+        with self._lock:
+            self._live[job_id] = job
+        self._write([job_id])
+
+    def __getitem__(self, job_id):
+        job = self._live.get(job_id)
+        if job is not None:
+            return job
+
+        with self.app.app_context():
+            row = self.db.session.get(self.model, job_id)
+            if row is None:
+                raise KeyError(job_id)
+            return row.to_dict()
+
+    def __delitem__(self, job_id):
+        with self._lock:
+            self._live.pop(job_id, None)
+            self._dirty.discard(job_id)
+
+        with self.app.app_context():
+            deleted = self.model.query.filter_by(id=job_id).delete()
+            self.db.session.commit()
+        if not deleted:
+            raise KeyError(job_id)
+
+    def save(self, job_id, flush=False):
+        if flush:
+            with self._lock:
+                self._dirty.discard(job_id)
+            self._write([job_id])
+
+            # Finished jobs are served from the database from now on
+            job = self._live.get(job_id)
+            if job is not None and job['status'] in ('completed', 'failed'):
+                with self._lock:
+                    self._live.pop(job_id, None)
+        else:
+            with self._lock:
+                self._dirty.add(job_id)
+
+    def update(self, job_id, **fields):
+        job = self._live.get(job_id)
+        if job is not None:
+            with self.job_lock:
+                job.update(fields)
+            self.save(job_id)
+            return
+
+        with self._flush_lock, self.app.app_context():
+            row = self.db.session.get(self.model, job_id)
+            if row is None:
+                raise KeyError(job_id)
+            row.update_from_dict(dict(row.to_dict(), **fields))
+            self.db.session.commit()
+
+    def flush(self):
+        """Write every dirty job now"""
+        with self._lock:
+            job_ids = list(self._dirty)
+            self._dirty.clear()
+        if job_ids:
+            self._write(job_ids)
+
+    def expired_job_ids(self, cutoff):
+        self.flush()
+        with self.app.app_context():
+            rows = self.db.session.query(self.model.id).filter(self.model.created_at < cutoff).all()
+            return [row.id for row in rows]
+
+    def _write(self, job_ids):
+        with self._flush_lock, self.app.app_context():
+            for job_id in job_ids:
+                job = self._live.get(job_id)
+                if job is None:
+                    continue
+                row = self.db.session.get(self.model, job_id)
+                if row is None:
+                    row = self.model(id=job_id)
+                    self.db.session.add(row)
+                row.update_from_dict(snapshot_job(job, self.job_lock))
+            self.db.session.commit()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Job store flush failed: {e}")
+
+def create_job_store(app=None, job_lock=None):
+    """Create the job store selected by JOB_STORE (memory, sqlite or redis)
+
+    ``job_lock`` is the lock workers hold while changing jobs, so persisting
+    stores can copy a consistent job before writing it.
+    """
+    backend = os.getenv('JOB_STORE', 'sqlite').lower()
+
+    if backend == 'redis':
+        from src.utils.redis_jobs import RedisJobStore, get_redis_client
+        return RedisJobStore(get_redis_client(), flush_interval=float(os.getenv('JOB_STORE_FLUSH_INTERVAL', '1.0')),
+                             job_lock=job_lock)
+    if backend == 'sqlite' and app is not None:
+        return SQLiteJobStore(app, flush_interval=float(os.getenv('JOB_STORE_FLUSH_INTERVAL', '1.0')),
+                              job_lock=job_lock)
+    return InMemoryJobStore()
+
+def create_job_queue():
+    """Create the queue feeding separate conversion workers, or None to convert in-process"""
+    if os.getenv('JOB_STORE', 'sqlite').lower() != 'redis':
+        return None
+
+    from src.utils.redis_jobs import RedisJobQueue, get_redis_client
+    max_queued_jobs = os.getenv('MAX_QUEUED_JOBS')
+    return RedisJobQueue(get_redis_client(), max_queued_jobs=int(max_queued_jobs) if max_queued_jobs else None)
@@ -0,0 +1,48 @@
+"""
+Cache of Spotify playlist track lists, keyed by playlist snapshot
+"""
+import os
+from src.utils.tiered_cache import TieredCache
+
+def playlist_cache_key(playlist_id, snapshot_id):
+    return f"{playlist_id}|{snapshot_id}"
+
+class PlaylistCache:
+    """Loaded playlists keyed by (playlist id, snapshot id).
+
+    Spotify gives a playlist a new ``snapshot_id`` whenever it changes, so an
+    entry never needs invalidating: a cheap ``fields=snapshot_id`` request
+    tells whether the cached track list is still current, and entries for old
+    snapshots simply age out of the LRU tiers. The last snapshot stored for
+    each playlist is also kept, so playlists never loaded before skip that
+    request and go straight to the full load.
+    """
+
+    def __init__(self, ttl=None, max_memory_entries=None, max_disk_entries=None, db_path=None):
+        self.cache = TieredCache(
+            'playlist_cache',
+            ttl=ttl or int(os.getenv('PLAYLIST_CACHE_TTL', 7 * 86400)),
+            max_memory_entries=max_memory_entries or int(os.getenv('PLAYLIST_CACHE_MEMORY_ENTRIES', 100)),
+            max_disk_entries=max_disk_entries or int(os.getenv('PLAYLIST_CACHE_DISK_ENTRIES', 2000)),
+            db_path=db_path
+        )
+
+    def get(self, playlist_id, snapshot_id):
+        """Cached playlist for this snapshot, or None"""
+        if not snapshot_id:
+            return None
+        return self.cache.get(playlist_cache_key(playlist_id, snapshot_id))
+
+    def has_playlist(self, playlist_id):
+        """Whether some snapshot of the playlist is cached (worth checking its snapshot_id first)"""
+        return self.cache.get(playlist_id, count=False) is not None
+
+    def set(self, playlist_id, snapshot_id, playlist):
+        if snapshot_id:
+            self.cache.set(playlist_cache_key(playlist_id, snapshot_id), playlist)
+            self.cache.set(playlist_id, snapshot_id)
+
+    def stats(self):
+        return self.cache.stats()
+
+playlist_cache = PlaylistCache()
@@ -0,0 +1,318 @@
+"""
+Redis-backed conversion job store and work queue
+
+The web tier writes new jobs to Redis and pushes their IDs onto a list;
+conversion worker processes (scripts/conversion_worker.py) pop job IDs and run
+them. Job fields live in one hash per job and per-track progress in a second
+hash keyed by track index, mirrored in a sorted set scored by change cursor.
+A status poll reads the job hash alone, and track entries changed since a
+cursor are a range query, so neither scans every track of the job. Workers
+and the web tier must share the temp directory where archives are written.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from src.utils.job_store import JobStore, snapshot_job
+
+KEY_PREFIX = 'nasmytunes'
+
+# Job fields stored as individual hash fields; everything else goes in 'extra'
+JOB_FIELDS = ('status', 'playlist_name', 'total_tracks', 'completed_tracks', 'failed_tracks',
+              'current_track', 'download_url', 'created_at', 'temp_dir', 'zip_path', 'error')
+
+def get_redis_client(url=None):
+    """Create a Redis client from REDIS_URL"""
+    import redis
+    return redis.Redis.from_url(url or os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+                                decode_responses=True)
+
+def job_key(job_id):
+    return f"{KEY_PREFIX}:job:{job_id}"
+
+def progress_key(job_id):
+    return f"{KEY_PREFIX}:job:{job_id}:progress"
+
+def tracks_key(job_id):
+    return f"{KEY_PREFIX}:job:{job_id}:tracks"
+
+def changes_key(job_id):
+    return f"{KEY_PREFIX}:job:{job_id}:changes"
+
+def events_key(job_id):
+    return f"{KEY_PREFIX}:job:{job_id}:events"
+
+class RedisJobStore(JobStore):
+    """Jobs stored in Redis hashes.
+
+    New jobs are written straight to Redis. A worker keeps the jobs it claimed
+    from the queue in memory and writes their changes with a pipeline:
+    immediately when ``flush=True``, otherwise in the next batch of the
+    flusher thread. ``job_lock`` is the lock held by the code changing live
+    jobs; each job is copied under it before it is written.
+    """
+
+    def __init__(self, client, flush_interval=1.0, ttl=86400 * 2, job_lock=None):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.job_lock = job_lock or threading.RLock()
+        self._live = {}
+        self._written_tracks = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+        flusher = threading.Thread(target=self._flush_loop, name='redis-job-flusher')
+        flusher.daemon = True
+        flusher.start()
+
+    def __setitem__(self, job_id, job):
+        self._write({job_id: job}, include_tracks=True)
+
+    def __getitem__(self, job_id):
+        job = self._live.get(job_id)
+        if job is not None:
+            return job
+        return self._load(job_id)
+
+    def __contains__(self, job_id):
+        return job_id in self._live or bool(self.client.exists(job_key(job_id)))
+
+    def __delitem__(self, job_id):
+        with self._lock:
+            self._live.pop(job_id, None)
+            self._written_tracks.pop(job_id, None)
+            self._dirty.discard(job_id)
+        self.client.zrem(f"{KEY_PREFIX}:jobs_by_created", job_id)
+        if not self.client.delete(job_key(job_id), progress_key(job_id), changes_key(job_id),
+                                  tracks_key(job_id), events_key(job_id)):
+            raise KeyError(job_id)
+
+    def summary(self, job_id):
+        """The job hash only: no track list, progress entries or tracks blob are read"""
+        job = self._live.get(job_id)
+        if job is not None:
+            return job
+        fields = self.client.hgetall(job_key(job_id))
+        if not fields:
+            raise KeyError(job_id)
+        return self._decode(fields)
+
+    def track_lists(self, job_id, since=None):
+        if job_id in self._live:
+            return super().track_lists(job_id, since)
+        if since is None:
+            entries = self.client.hvals(progress_key(job_id))
+        else:
+            entries = self.client.zrangebyscore(changes_key(job_id), f"({since}", '+inf')
+        return self._partition(json.loads(entry) for entry in entries)
+
+    def claim(self, job_id):
+        """Load a queued job into this process so a worker can run it"""
+        job = self._load(job_id)
+        with self._lock:
+            self._live[job_id] = job
+            self._written_tracks[job_id] = {
+                t['index'] for t in job['completed_track_list'] + job['failed_track_list'] if 'index' in t
+            }
+        return job
+
+    def save(self, job_id, flush=False):
+        if flush:
+            with self._lock:
+                self._dirty.discard(job_id)
+            self._write({job_id: self._live.get(job_id)})
+
+            # Finished jobs are served from Redis from now on
+            job = self._live.get(job_id)
+            if job is not None and job['status'] in ('completed', 'failed'):
+                with self._lock:
+                    self._live.pop(job_id, None)
+                    self._written_tracks.pop(job_id, None)
+        else:
+            with self._lock:
+                self._dirty.add(job_id)
+
+    def update(self, job_id, **fields):
+        job = self._live.get(job_id)
+        if job is not None:
+            with self.job_lock:
+                job.update(fields)
+            self.save(job_id)
+            return
+
+        extra_fields = {k: v for k, v in fields.items() if k not in JOB_FIELDS}
+        mapping = {k: json.dumps(self._encode(v)) for k, v in fields.items() if k in JOB_FIELDS}
+        if extra_fields:
+            extra = self.client.hget(job_key(job_id), 'extra')
+            if extra is None:
+                raise KeyError(job_id)
+            mapping['extra'] = json.dumps(dict(json.loads(extra), **extra_fields))
+        elif not self.client.exists(job_key(job_id)):
+            raise KeyError(job_id)
+        self.client.hset(job_key(job_id), mapping=mapping)
+
+    def flush(self):
+        """Write every dirty job now"""
+        with self._lock:
+            job_ids = list(self._dirty)
+            self._dirty.clear()
+        if job_ids:
+            self._write({job_id: self._live.get(job_id) for job_id in job_ids})
+
+    def expired_job_ids(self, cutoff):
+        self.flush()
+        index_key = f"{KEY_PREFIX}:jobs_by_created"
+        return self.client.zrangebyscore(index_key, '-inf', f"({cutoff.timestamp()}")
+
+    def _write(self, jobs, include_tracks=False):
+        pipe = self.client.pipeline(transaction=False)
+
+        for job_id, job in jobs.items():
+            if job is None:
+                continue
+            job = snapshot_job(job, self.job_lock)
+
+            fields = {field: json.dumps(self._encode(job.get(field))) for field in JOB_FIELDS}
+            extra = {k: v for k, v in job.items()
+                     if k not in JOB_FIELDS and k not in ('tracks', 'completed_track_list', 'failed_track_list')}
+            fields['extra'] = json.dumps(extra)
+            pipe.hset(job_key(job_id), mapping=fields)
+
+            # Only write per-track entries that changed since the last write
+            written = self._written_tracks.get(job_id, set())
+            new_entries = {}
+            changes = {}
+            for entry in job.get('completed_track_list', []) + job.get('failed_track_list', []):
+                index = entry.get('index')
+                if index is not None and index not in written:
+                    new_entries[str(index)] = changes_entry = json.dumps(entry)
+                    changes[changes_entry] = entry.get('seq', 0)
+                    written.add(index)
+            if new_entries:
+                pipe.hset(progress_key(job_id), mapping=new_entries)
+                pipe.zadd(changes_key(job_id), changes)
+
+            if include_tracks:
+                pipe.set(tracks_key(job_id), json.dumps(job.get('tracks', [])))
+                pipe.zadd(f"{KEY_PREFIX}:jobs_by_created", {job_id: job['created_at'].timestamp()})
+
+            for key in (job_key(job_id), progress_key(job_id), changes_key(job_id), tracks_key(job_id)):
+                pipe.expire(key, self.ttl)
+
+        pipe.execute()
+
+    def _load(self, job_id):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(job_key(job_id))
+        pipe.hvals(progress_key(job_id))
+        pipe.get(tracks_key(job_id))
+        fields, progress, tracks = pipe.execute()
+
+        if not fields:
+            raise KeyError(job_id)
+
+        job = self._decode(fields)
+        job['tracks'] = json.loads(tracks) if tracks else []
+        job['completed_track_list'], job['failed_track_list'] = self._partition(
+            json.loads(entry) for entry in progress)
+        return job
+
+    @staticmethod
+    def _decode(fields):
+        job = json.loads(fields.pop('extra', '{}'))
+        for field, value in fields.items():
+            job[field] = json.loads(value)
+        job['created_at'] = datetime.fromisoformat(job['created_at'])
+        return job
+
+    @staticmethod
+    def _partition(entries):
+        """(completed, failed) entries in track order"""
+        entries = sorted(entries, key=lambda t: t['index'])
+        return ([t for t in entries if t['status'] == 'success'],
+                [t for t in entries if t['status'] != 'success'])
+
+    @staticmethod
+    def _encode(value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Redis job flush failed: {e}")
+
+class RedisJobQueue:
+    """FIFO of job IDs waiting for a conversion worker"""
+
+    def __init__(self, client, max_queued_jobs=None):
+        self.client = client
+        self.key = f"{KEY_PREFIX}:queue"
+        self.max_queued_jobs = max_queued_jobs
+
+    def enqueue(self, job_id):
+        """Push a job and return its position in the queue (1 = next)"""
+        return self.client.lpush(self.key, job_id)
+
+    def dequeue(self, timeout=5):
+        """Block until a job ID is available, or return None after ``timeout`` seconds"""
+        item = self.client.brpop([self.key], timeout=timeout)
+        return item[1] if item else None
+
+    def __len__(self):
+        return self.client.llen(self.key)
+
+    def is_full(self):
+        return self.max_queued_jobs is not None and len(self) >= self.max_queued_jobs
+
+    def position(self, job_id):
+        """1-based position of a queued job counted from the front, or None"""
+        index = self.client.lpos(self.key, job_id)
+        if index is None:
+            return None
+        return len(self) - index
+
+class RedisJobEventLog:
+    """Job progress events in a Redis list per job, readable from any process.
+
+    An event's sequence number is its 1-based position in the list.
+    """
+
+    def __init__(self, client, ttl=86400 * 2, poll_interval=0.5):
+        self.client = client
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+
+    def publish(self, job_id, event_type, **data):
+        event = dict(data, type=event_type, time=time.time())
+        pipe = self.client.pipeline(transaction=False)
+        pipe.rpush(events_key(job_id), json.dumps(event))
+        pipe.expire(events_key(job_id), self.ttl)
+        event['seq'] = pipe.execute()[0]
+        return event
+
+    def since(self, job_id, seq=0):
+        events = []
+        for offset, raw in enumerate(self.client.lrange(events_key(job_id), seq, -1)):
+            event = json.loads(raw)
+            event['seq'] = seq + offset + 1
+            events.append(event)
+        return events
+
+    def last_seq(self, job_id):
+        return self.client.llen(events_key(job_id))
+
+    def wait(self, job_id, seq, timeout):
+        deadline = time.time() + timeout
+        while True:
+            events = self.since(job_id, seq)
+            if events or time.time() >= deadline:
+                return events
+            time.sleep(min(self.poll_interval, max(0, deadline - time.time())))
+
+    def discard(self, job_id):
+        self.client.delete(events_key(job_id))
@@ -0,0 +1,73 @@
+"""
+Shared cache of YouTube search results per track
+"""
+import os
+import re
+from src.utils.tiered_cache import TieredCache
+
+# Durations within the same bucket share a cache entry
+DURATION_BUCKET_SECONDS = 5
+
+def normalize_text(text):
+    """Lowercase, drop featuring credits and punctuation, collapse whitespace"""
+    text = text.lower()
+    text = re.sub(r'[\(\[](feat|ft|with)\.?\s[^\)\]]*[\)\]]', ' ', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+def track_cache_key(track_name, artists, duration_ms=None):
+    """Normalized (title, artists, duration bucket) key for a track"""
+    artist_part = ','.join(sorted(normalize_text(artist) for artist in artists))
+    bucket = '' if not duration_ms else str(int(duration_ms / 1000 // DURATION_BUCKET_SECONDS))
+    return f"{normalize_text(track_name)}|{artist_part}|{bucket}"
+
+class SearchCache:
+    """Track -> YouTube candidates, shared by every downloader.
+
+    Each entry stores the ranked candidate list returned by a search and, once
+    a download succeeds, the chosen video id, which is moved to the front of
+    the candidates for later lookups.
+    """
+
+    def __init__(self, ttl=None, max_memory_entries=None, max_disk_entries=None, db_path=None):
+        self.cache = TieredCache(
+            'search_cache',
+            ttl=ttl or int(os.getenv('SEARCH_CACHE_TTL', 7 * 86400)),
+            max_memory_entries=max_memory_entries or int(os.getenv('SEARCH_CACHE_MEMORY_ENTRIES', 2000)),
+            max_disk_entries=max_disk_entries or int(os.getenv('SEARCH_CACHE_DISK_ENTRIES', 100000)),
+            db_path=db_path
+        )
+
+    def get(self, track_name, artists, duration_ms=None):
+        """Cached entry ({'video_id', 'candidates'}) for a track, or None"""
+        return self.cache.get(track_cache_key(track_name, artists, duration_ms))
+
+    def get_or_search(self, track_name, artists, duration_ms, search_fn):
+        """Return cached candidates for a track, or run ``search_fn()`` and cache its results"""
+        entry = self.get(track_name, artists, duration_ms)
+        if entry and entry['candidates']:
+            return entry['candidates']
+
+        candidates = search_fn()
+        if candidates:
+            self.cache.set(track_cache_key(track_name, artists, duration_ms),
+                           {'video_id': None, 'candidates': candidates})
+        return candidates
+
+    def record_choice(self, track_name, artists, video, duration_ms=None):
+        """Remember the video that was successfully downloaded for a track"""
+        key = track_cache_key(track_name, artists, duration_ms)
+        entry = self.cache.get(key, count=False) or {'video_id': None, 'candidates': []}
+        candidates = [c for c in entry['candidates'] if c['id'] != video['id']]
+        self.cache.set(key, {'video_id': video['id'], 'candidates': [video] + candidates})
+
+    def chosen_video_id(self, track_name, artists, duration_ms=None):
+        """ID of the video last downloaded for a track, without counting a lookup"""
+        entry = self.cache.get(track_cache_key(track_name, artists, duration_ms), count=False)
+        return entry['video_id'] if entry else None
+
+    def stats(self):
+        return self.cache.stats()
+
+# Shared by all downloaders in this process
+search_cache = SearchCache()
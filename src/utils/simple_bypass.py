@@ -2,32 +2,46 @@
 Simplified but effective YouTube bypass
 """
 import os
-import time
 import random
 import tempfile
-import yt_dlp
 from youtube_search import YoutubeSearch
+from src.utils.search_cache import search_cache
+from src.utils.audio_cache import audio_cache
+from src.utils.track_matcher import distinct_album, search_ranked, verify_candidates
+from src.utils.deadline import TrackTimeoutError, deadline_sleep
+from src.utils.ffmpeg_locator import ffmpeg_locator
+from src.utils.transcoder import first_audio_output
+from src.utils.ydl_pool import YDLPool
 
 class SimpleBypass:
+    AUDIO_BITRATE = '128'
+    
     def __init__(self):
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         ]
+        # When False, raw audio is kept and transcoded by the caller
+        self.extract_audio = True
+        # yt-dlp instances reused across tracks
+        self.ydl_pool = YDLPool()
+        # Path of the file written by the last successful download
+        self.output_file = None
+        # Search result the last successful download came from (with its match_score)
+        self.matched_video = None
     
     def get_simple_opts(self, output_path, filename):
         """Get simplified but effective yt-dlp options"""
-        ffmpeg_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'ffmpeg', 'ffmpeg.exe')
         return {
             'format': 'bestaudio[ext=m4a]/bestaudio/best',
             'outtmpl': os.path.join(output_path, f'{filename}.%(ext)s'),
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
-                'preferredquality': '128',
-            }],
-            'ffmpeg_location': ffmpeg_path,
+                'preferredquality': self.AUDIO_BITRATE,
+            }] if self.extract_audio else [],
+            'ffmpeg_location': ffmpeg_locator.location(),
             'quiet': True,
             'no_warnings': True,
             'ignoreerrors': True,
@@ -49,60 +63,89 @@ class SimpleBypass:
             'geo_bypass': True,
         }
     
-    def search_youtube_simple(self, track_name, artists):
-        """Simple YouTube search"""
+    def search_youtube_simple(self, track_name, artists, duration_ms=None, album=None, year=None):
+        """Simple YouTube search, served from the shared search cache when possible"""
+        return search_cache.get_or_search(track_name, artists, duration_ms,
+                                          lambda: self._search_youtube_simple(track_name, artists, duration_ms,
+                                                                              album, year))
+    
+    def _search_youtube_simple(self, track_name, artists, duration_ms=None, album=None, year=None):
         queries = [
             f"{track_name} {' '.join(artists)}",
             f"{track_name} {artists[0]} official",
             f"{track_name} {artists[0]} audio"
         ]
+        # The album narrows the first search to the studio release (Topic uploads name it)
+        if distinct_album(album, track_name):
+            queries.insert(0, f"{track_name} {artists[0]} {album}")
         
-        for query in queries:
-            try:
-                results = YoutubeSearch(query, max_results=2).to_dict()
-                if results:
-                    return results
-                time.sleep(1)
-            except Exception as e:
-                print(f"Search failed for '{query}': {e}")
-                continue
-        
-        return []
+        # Best match first; the other queries only run when the first finds nothing convincing
+        return search_ranked(
+            queries, lambda query: YoutubeSearch(query, max_results=3).to_dict(),
+            track_name, artists, duration_ms, between_queries=lambda: deadline_sleep(1),
+            album=album, year=year
+        )
     
-    def download_simple(self, track_name, artists, output_path):
-        """Simple download with basic bypass"""
+    def download_simple(self, track_name, artists, output_path, duration_ms=None, videos=None, album=None, year=None):
+        """Simple download with basic bypass (``videos``: candidates already found by the caller)"""
         print(f"🎵 Simple bypass: {track_name} by {', '.join(artists)}")
+        self.output_file = None
+        self.matched_video = None
         
-        # Search for videos
-        videos = self.search_youtube_simple(track_name, artists)
+        # Search for videos unless the caller already did
+        if videos is None:
+            videos = self.search_youtube_simple(track_name, artists, duration_ms, album, year)
         if not videos:
             return False, "No videos found"
         
+        # Drop candidates whose length rules them out before fetching anything
+        videos = verify_candidates(videos, track_name, artists, duration_ms, album, year)
+        if not videos:
+            return False, "No search result matches the track length"
+        
         # Try each video
         for video in videos:
             video_url = f"https://www.youtube.com/watch?v={video['id']}"
             safe_filename = "".join(c for c in f"{track_name} - {', '.join(artists)}" 
                                   if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
             
+            # Reuse an earlier transcode of this video if we have one
+            cached_file = os.path.join(output_path, f"{safe_filename}.mp3")
+            if audio_cache.link_into(video['id'], cached_file, bitrate=self.AUDIO_BITRATE):
+                print(f"  ⚡ Cached: {video['title'][:50]}")
+                search_cache.record_choice(track_name, artists, video, duration_ms)
+                self.output_file = cached_file
+                self.matched_video = video
+                return True, f"Cached: {video['title']}"
+            
             print(f"  Trying: {video['title'][:50]}...")
             
             try:
-                opts = self.get_simple_opts(output_path, safe_filename)
-                
-                with yt_dlp.YoutubeDL(opts) as ydl:
-                    ydl.download([video_url])
+                file_paths = self.ydl_pool.download(
+                    ('simple', self.extract_audio),
+                    lambda: self.get_simple_opts(output_path, safe_filename),
+                    [video_url],
+                    outtmpl=os.path.join(output_path, f'{safe_filename}.%(ext)s')
+                )
                 
-                # Check if file was created
-                for file in os.listdir(output_path):
-                    if safe_filename.lower() in file.lower() and file.endswith('.mp3'):
-                        print(f"  ✅ Success: {file}")
-                        return True, f"Downloaded: {video['title']}"
+                # yt-dlp reports the final file; no need to scan the directory
+                output_file = first_audio_output(file_paths, self.extract_audio)
+                if output_file:
+                    print(f"  ✅ Success: {os.path.basename(output_file)}")
+                    search_cache.record_choice(track_name, artists, video, duration_ms)
+                    if output_file.endswith('.mp3'):
+                        audio_cache.insert(video['id'], output_file, bitrate=self.AUDIO_BITRATE)
+                    self.output_file = output_file
+                    self.matched_video = video
+                    return True, f"Downloaded: {video['title']}"
                 
+            except TrackTimeoutError:
+                raise
             except Exception as e:
                 print(f"  ❌ Failed: {str(e)[:100]}")
                 continue
             
-            time.sleep(random.uniform(2, 4))
+            deadline_sleep(random.uniform(2, 4))
         
         return False, "All attempts failed"
     
@@ -129,4 +172,6 @@ For actual MP3 files, run locally on your computer.
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(content)
         
+        self.output_file = output_file
+        self.matched_video = None
         return True, f"Demo file created for: {track_name}"
\ No newline at end of file
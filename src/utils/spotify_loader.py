@@ -0,0 +1,117 @@
+"""
+Playlist loading from the Spotify Web API with field filtering and concurrent pagination
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Largest page the playlist items endpoint returns
+PAGE_SIZE = 100
+
+# Pages fetched in parallel per playlist (override with SPOTIFY_PAGE_WORKERS)
+DEFAULT_PAGE_WORKERS = 8
+
+# Largest number of ids the tracks endpoint accepts per request
+TRACKS_BATCH_SIZE = 50
+
+# Track fields the converter uses (ISRC, album and release date help matching); everything
+# else is left out of the responses
+TRACK_FIELDS = ('track(id,name,type,duration_ms,preview_url,artists(name),'
+                'album(name,release_date),external_ids(isrc))')
+
+# Playlist metadata plus the first page of tracks, in one request
+PLAYLIST_FIELDS = f'id,name,description,public,snapshot_id,owner(id,display_name),tracks(total,items({TRACK_FIELDS}))'
+
+# Fields of each further page of tracks
+PAGE_FIELDS = f'items({TRACK_FIELDS})'
+
+def page_offsets(total, first_page_size=PAGE_SIZE):
+    """Offsets of the pages still to fetch after the first ``first_page_size`` items"""
+    return list(range(first_page_size, total, PAGE_SIZE))
+
+def playlist_tracks_from_items(items):
+    """Track objects of a page, without removed tracks and podcast episodes"""
+    return [item['track'] for item in items
+            if item and item.get('track') and item['track'].get('type') == 'track']
+
+def release_year(release_date):
+    """Year of a Spotify release date ('2019', '2019-05' or '2019-05-17'), or None"""
+    if release_date and release_date[:4].isdigit():
+        return int(release_date[:4])
+    return None
+
+def track_summary(track):
+    """The track metadata passed on to the converter"""
+    album = track.get('album') or {}
+    return {
+        'id': track['id'],
+        'name': track['name'],
+        'artists': [artist['name'] for artist in track['artists']],
+        'album': album.get('name'),
+        'year': release_year(album.get('release_date')),
+        'isrc': (track.get('external_ids') or {}).get('isrc'),
+        'duration_ms': track['duration_ms'],
+        'preview_url': track.get('preview_url')
+    }
+
+def fetch_playlist_snapshot(sp, playlist_id):
+    """Current ``snapshot_id`` of a playlist (changes whenever the playlist does)"""
+    return sp.playlist(playlist_id, fields='snapshot_id').get('snapshot_id')
+
+def fetch_playlist_metadata(sp, playlist_id):
+    """Playlist name, description, owner, visibility and track count, with the first page of tracks"""
+    return sp.playlist(playlist_id, fields=PLAYLIST_FIELDS, additional_types=('track',))
+
+def fetch_playlist_tracks(sp, playlist_id, playlist, workers=None):
+    """Every track of a playlist, in playlist order.
+
+    ``playlist`` is the result of ``fetch_playlist_metadata``; its first page is
+    reused and the offsets of the remaining pages are computed from
+    ``tracks.total``, so the pages are fetched concurrently instead of by
+    following ``next`` links one after another.
+    """
+    first_page = playlist['tracks'].get('items') or []
+    offsets = page_offsets(playlist['tracks']['total'], len(first_page) or PAGE_SIZE)
+    if not first_page:
+        offsets.insert(0, 0)
+
+    def fetch_page(offset):
+        page = sp.playlist_items(playlist_id, fields=PAGE_FIELDS, limit=PAGE_SIZE,
+                                 offset=offset, additional_types=('track',))
+        return page.get('items') or []
+
+    pages = [first_page] if first_page else []
+    if offsets:
+        workers = workers or int(os.getenv('SPOTIFY_PAGE_WORKERS', DEFAULT_PAGE_WORKERS))
+        with ThreadPoolExecutor(max_workers=min(workers, len(offsets))) as executor:
+            # map() yields results in offset order regardless of completion order
+            pages.extend(executor.map(fetch_page, offsets))
+
+    return [track for page in pages for track in playlist_tracks_from_items(page)]
+
+def load_playlist(sp, playlist_id, workers=None):
+    """(playlist metadata, tracks) using one metadata request plus the remaining pages in parallel"""
+    playlist = fetch_playlist_metadata(sp, playlist_id)
+    return playlist, fetch_playlist_tracks(sp, playlist_id, playlist, workers)
+
+def fetch_tracks(sp, track_ids, workers=None):
+    """Full track objects for ``track_ids`` (None for unknown ids), in the order given.
+
+    Uses the batched tracks endpoint, ``TRACKS_BATCH_SIZE`` ids per request,
+    with the batches fetched concurrently.
+    """
+    unique_ids = list(dict.fromkeys(track_ids))
+    batches = [unique_ids[start:start + TRACKS_BATCH_SIZE]
+               for start in range(0, len(unique_ids), TRACKS_BATCH_SIZE)]
+    if not batches:
+        return []
+
+    def fetch_batch(batch):
+        return sp.tracks(batch).get('tracks') or []
+
+    workers = workers or int(os.getenv('SPOTIFY_PAGE_WORKERS', DEFAULT_PAGE_WORKERS))
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        found = {}
+        for batch, tracks in zip(batches, executor.map(fetch_batch, batches)):
+            found.update((track_id, track) for track_id, track in zip(batch, tracks) if track)
+
+    return [found.get(track_id) for track_id in track_ids]
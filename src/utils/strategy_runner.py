@@ -0,0 +1,125 @@
+"""
+Adaptive ordering of the download strategies tried for each track
+"""
+import os
+import threading
+import time
+from src.utils.deadline import TrackTimeoutError, check_deadline
+
+# Consecutive failures after which a strategy is put on cool-down
+DEFAULT_FAILURE_THRESHOLD = 5
+
+# Seconds a strategy is skipped once it reaches the failure threshold
+DEFAULT_COOLDOWN_SECONDS = 300
+
+class StrategyRunner:
+    """Tries download strategies in the order most likely to succeed quickly.
+
+    Process-wide: every job shares what has been learned about each strategy.
+    Strategies that have succeeded before come first, ordered by their
+    expected seconds per success (average latency divided by the smoothed
+    success rate), so a strategy YouTube is currently blocking drops behind
+    one that works. Untried strategies follow in the order given (they get
+    measured whenever the others fail a track), then those that have only
+    failed. A strategy that has failed ``failure_threshold`` times in a row is
+    skipped for ``cooldown`` seconds, unless every strategy is cooling down.
+    """
+
+    def __init__(self, failure_threshold=None, cooldown=None):
+        self.failure_threshold = failure_threshold or int(os.getenv('STRATEGY_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD))
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv('STRATEGY_COOLDOWN_SECONDS', DEFAULT_COOLDOWN_SECONDS))
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def run(self, strategies):
+        """Try ``strategies`` ([(name, fn)], ``fn()`` returning (success, message)) until one succeeds.
+
+        Returns (name of the successful strategy or None, success, message).
+        ``TrackTimeoutError`` from the current deadline is passed on to the caller.
+        """
+        functions = dict(strategies)
+        message = "No download strategy available"
+
+        for name in self.order([name for name, _ in strategies]):
+            check_deadline()
+            started = time.monotonic()
+            try:
+                success, message = functions[name]()
+            except TrackTimeoutError:
+                self.record(name, False, time.monotonic() - started)
+                raise
+            except Exception as e:
+                print(f"{name} strategy error: {e}")
+                success, message = False, str(e)
+            self.record(name, success, time.monotonic() - started)
+            if success:
+                return name, True, message
+        return None, False, message
+
+    def order(self, names):
+        """``names`` in the order to try them, without those cooling down"""
+        now = time.monotonic()
+        with self._lock:
+            stats = {name: self._stats_for(name) for name in names}
+            available = [name for name in names if stats[name]['cooldown_until'] <= now]
+            for name in names:
+                if name not in available:
+                    stats[name]['skipped'] += 1
+        if not available:
+            # Everything is cooling down: probe anyway rather than fail the track untried
+            available = list(names)
+        # sorted() is stable, so ties keep the given priority
+        return sorted(available, key=lambda name: self._sort_key(stats[name]))
+
+    def record(self, name, success, seconds):
+        with self._lock:
+            stats = self._stats_for(name)
+            stats['attempts'] += 1
+            stats['total_seconds'] += seconds
+            if success:
+                stats['successes'] += 1
+                stats['consecutive_failures'] = 0
+            else:
+                stats['failures'] += 1
+                stats['consecutive_failures'] += 1
+                if stats['consecutive_failures'] >= self.failure_threshold:
+                    stats['cooldown_until'] = time.monotonic() + self.cooldown
+                    stats['cooldowns'] += 1
+                    stats['consecutive_failures'] = 0
+                    print(f"⏸️  {name} strategy failed {self.failure_threshold} times in a row; "
+                          f"skipping it for {self.cooldown:.0f}s")
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                attempts = stats['attempts']
+                result[name] = {
+                    'attempts': attempts,
+                    'successes': stats['successes'],
+                    'failures': stats['failures'],
+                    'skipped': stats['skipped'],
+                    'cooldowns': stats['cooldowns'],
+                    'success_rate': round(stats['successes'] / attempts, 3) if attempts else None,
+                    'avg_seconds': round(stats['total_seconds'] / attempts, 2) if attempts else None,
+                    'cooling_down_for': max(0, round(stats['cooldown_until'] - now, 1)),
+                }
+            return result
+
+    def _stats_for(self, name):
+        # Caller holds self._lock
+        if name not in self._stats:
+            self._stats[name] = {'attempts': 0, 'successes': 0, 'failures': 0, 'skipped': 0, 'cooldowns': 0,
+                                 'consecutive_failures': 0, 'total_seconds': 0.0, 'cooldown_until': 0.0}
+        return self._stats[name]
+
+    @staticmethod
+    def _sort_key(stats):
+        """(0 proven / 1 untried / 2 only failed, expected seconds per success)"""
+        if not stats['attempts']:
+            return (1, 0.0)
+        success_rate = (stats['successes'] + 1) / (stats['attempts'] + 2)
+        return (0 if stats['successes'] else 2, stats['total_seconds'] / stats['attempts'] / success_rate)
+
+strategy_runner = StrategyRunner()
@@ -0,0 +1,134 @@
+"""
+Two-tier cache: in-process LRU in front of a shared on-disk SQLite table
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def get_cache_dir():
+    """Directory for on-disk caches (CACHE_DIR, defaults to src/database)"""
+    cache_dir = os.getenv('CACHE_DIR') or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database')
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+class TieredCache:
+    """JSON values with a TTL, kept in a bounded in-memory LRU and a bounded SQLite table.
+
+    Lookups try memory first, then disk (promoting disk hits into memory).
+    Both tiers evict least-recently-used entries when over their limit, and
+    expired entries are dropped when they are read.
+    """
+
+    def __init__(self, name, ttl, max_memory_entries=1000, max_disk_entries=50000, db_path=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.db_path = db_path or os.path.join(get_cache_dir(), f'{name}.db')
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self.counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_last_used ON cache (last_used)')
+        self._conn.commit()
+
+    def get(self, key, count=True):
+        """Return the cached value for ``key`` or None (``count=False`` skips the hit/miss counters)"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.counters['memory_hits'] += count
+                    return value
+                del self._memory[key]
+
+            row = self._conn.execute('SELECT value, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                    self._conn.commit()
+                self.counters['misses'] += count
+                return None
+
+            value = json.loads(row[0])
+            self._conn.execute('UPDATE cache SET last_used = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self._remember(key, row[1], value)
+            self.counters['disk_hits'] += count
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store ``value`` under ``key`` in both tiers"""
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), expires_at, now)
+            )
+
+            # Trim the disk tier every so often rather than on every write
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= 100:
+                self._writes_since_evict = 0
+                self._evict_disk(now)
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+            self._conn.commit()
+
+    def stats(self):
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            disk_entries = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            lookups = self.counters['memory_hits'] + self.counters['disk_hits'] + self.counters['misses']
+            hits = lookups - self.counters['misses']
+            return dict(
+                self.counters,
+                memory_entries=len(self._memory),
+                disk_entries=disk_entries,
+                hit_rate=round(hits / lookups, 3) if lookups else 0.0
+            )
+
+    def _remember(self, key, expires_at, value):
+        # Caller holds self._lock
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _evict_disk(self, now):
+        # Caller holds self._lock
+        self._conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+        excess = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_used LIMIT ?)',
+                (excess,)
+            )
+            self.counters['evictions'] += excess
@@ -0,0 +1,172 @@
+"""
+Ranking of YouTube search results against Spotify track metadata
+"""
+import os
+from src.utils.search_cache import normalize_text
+
+# Score at which the best candidate is trusted and no further query variants are searched
+DEFAULT_MATCH_THRESHOLD = 0.75
+
+# Weights of the score components (they add up to 1)
+TITLE_WEIGHT = 0.35
+ARTIST_WEIGHT = 0.25
+DURATION_WEIGHT = 0.3
+CHANNEL_WEIGHT = 0.1
+
+# Bonus for each of the album and the release year named by the title or description
+# snippet ("Provided to YouTube by ..." descriptions of Topic uploads carry both)
+METADATA_BONUS = 0.05
+
+# Duration difference in seconds at which the duration component reaches zero
+DURATION_SCALE_SECONDS = 30
+
+# Largest difference from the Spotify duration a candidate may have before it is rejected
+# unseen: the larger of a fixed number of seconds and a fraction of the track length
+DEFAULT_DURATION_TOLERANCE_SECONDS = 15
+DURATION_TOLERANCE_RATIO = 0.1
+
+# Words marking a different rendition of the song, unless the Spotify title has them too
+PENALTY_TERMS = ('cover', 'karaoke', 'live', 'instrumental', 'remix', 'nightcore', 'sped up', 'slowed',
+                 'reverb', '8d', 'reaction', 'tutorial', 'lesson')
+PENALTY = 0.3
+
+def parse_duration(duration):
+    """Seconds of a YouTube duration ('3:33', '1:02:03'), or None"""
+    if not duration or not isinstance(duration, str):
+        return None
+    seconds = 0
+    for part in duration.split(':'):
+        if not part.isdigit():
+            return None
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+def token_overlap(expected, text):
+    """Fraction of the words of ``expected`` that appear in ``text``"""
+    expected_tokens = set(normalize_text(expected).split())
+    if not expected_tokens:
+        return 0.0
+    return len(expected_tokens & set(normalize_text(text).split())) / len(expected_tokens)
+
+def distinct_album(album, track_name):
+    """The album name, unless it only repeats the track name (singles) and so tells nothing"""
+    if album and normalize_text(album) != normalize_text(track_name):
+        return album
+    return None
+
+def metadata_matches(candidate, track_name, album=None, year=None):
+    """How many of the album and release year the title or description snippet names (0-2)"""
+    description = f"{candidate.get('title') or ''} {candidate.get('long_desc') or ''}"
+    matches = 0
+    if distinct_album(album, track_name) and token_overlap(album, description) >= 0.8:
+        matches += 1
+    if year and str(year) in normalize_text(description).split():
+        matches += 1
+    return matches
+
+def score_candidate(candidate, track_name, artists, duration_ms=None, album=None, year=None):
+    """How well a search result matches the track, from 0 (unrelated) to 1"""
+    title = candidate.get('title') or ''
+    channel = candidate.get('channel') or ''
+    normalized_title = f" {normalize_text(title)} "
+    normalized_name = f" {normalize_text(track_name)} "
+
+    score = TITLE_WEIGHT * token_overlap(track_name, title)
+
+    if artists:
+        found = sum(1 for artist in artists if token_overlap(artist, f"{title} {channel}") >= 0.5)
+        score += ARTIST_WEIGHT * found / len(artists)
+
+    video_seconds = parse_duration(candidate.get('duration'))
+    if duration_ms and video_seconds is not None:
+        delta = abs(video_seconds - duration_ms / 1000)
+        score += DURATION_WEIGHT * max(0.0, 1 - delta / DURATION_SCALE_SECONDS)
+    else:
+        # Unknown either way: neither reward nor rule out the candidate
+        score += DURATION_WEIGHT / 2
+
+    # Auto-generated "Artist - Topic" channels carry the studio recording
+    lowered_channel = channel.lower()
+    if lowered_channel.endswith(' - topic'):
+        score += CHANNEL_WEIGHT
+    elif 'vevo' in lowered_channel or 'official' in lowered_channel or 'official audio' in normalized_title:
+        score += CHANNEL_WEIGHT / 2
+
+    score += METADATA_BONUS * metadata_matches(candidate, track_name, album, year)
+
+    for term in PENALTY_TERMS:
+        if f" {term} " in normalized_title and f" {term} " not in normalized_name:
+            score -= PENALTY
+
+    return round(max(0.0, min(1.0, score)), 3)
+
+def rank_candidates(candidates, track_name, artists, duration_ms=None, album=None, year=None):
+    """Unique candidates, best match first, each with its ``match_score``"""
+    ranked = {}
+    for candidate in candidates:
+        if candidate.get('id') and candidate['id'] not in ranked:
+            ranked[candidate['id']] = dict(candidate, match_score=score_candidate(
+                candidate, track_name, artists, duration_ms, album, year))
+    # Scores are capped at 1, so the album and year also decide between capped candidates;
+    # sorted() is stable, so remaining ties keep YouTube's order
+    return sorted(ranked.values(), key=lambda candidate: (
+        -candidate['match_score'], -metadata_matches(candidate, track_name, album, year)))
+
+def search_ranked(queries, search_fn, track_name, artists, duration_ms=None, threshold=None, between_queries=None,
+                  album=None, year=None):
+    """Search ``queries`` in order until the best candidate scores at least ``threshold``.
+
+    ``search_fn(query)`` returns YouTube results. Only the first query is always
+    searched; the others are fallbacks for when nothing found so far is a
+    convincing match. ``between_queries()`` runs before each fallback (e.g. to
+    rate-limit). Returns all candidates found, ranked.
+    """
+    if threshold is None:
+        threshold = float(os.getenv('SEARCH_MATCH_THRESHOLD', DEFAULT_MATCH_THRESHOLD))
+
+    candidates = []
+    ranked = []
+    for i, query in enumerate(queries):
+        if i > 0 and between_queries:
+            between_queries()
+        try:
+            candidates.extend(search_fn(query) or [])
+        except Exception as e:
+            print(f"Search failed for '{query}': {e}")
+            continue
+
+        ranked = rank_candidates(candidates, track_name, artists, duration_ms, album, year)
+        if ranked and ranked[0]['match_score'] >= threshold:
+            break
+    return ranked
+
+def duration_tolerance(duration_ms):
+    """Seconds a candidate may differ from a track of ``duration_ms``"""
+    seconds = float(os.getenv('MATCH_DURATION_TOLERANCE_SECONDS', DEFAULT_DURATION_TOLERANCE_SECONDS))
+    return max(seconds, duration_ms / 1000 * DURATION_TOLERANCE_RATIO)
+
+def duration_matches(candidate, duration_ms):
+    """Whether a candidate's length is close enough to the track's (unknown lengths pass)"""
+    video_seconds = parse_duration(candidate.get('duration'))
+    if not duration_ms or video_seconds is None:
+        return True
+    return abs(video_seconds - duration_ms / 1000) <= duration_tolerance(duration_ms)
+
+def verify_candidates(candidates, track_name, artists, duration_ms=None, album=None, year=None):
+    """Candidates worth downloading, in the order given, each with its ``match_score``.
+
+    Runs before anything is fetched: candidates whose duration is off by more
+    than ``duration_tolerance`` (hour-long loops, live versions, mixes) are
+    dropped, so they never cost a download or a transcode.
+    """
+    accepted = []
+    for candidate in candidates:
+        if not duration_matches(candidate, duration_ms):
+            print(f"  Skipping {candidate.get('title', candidate.get('id'))!r}: "
+                  f"{candidate.get('duration')} does not match the track length")
+            continue
+        if 'match_score' not in candidate:
+            candidate = dict(candidate, match_score=score_candidate(candidate, track_name, artists, duration_ms,
+                                                                    album, year))
+        accepted.append(candidate)
+    return accepted
@@ -0,0 +1,131 @@
+"""
+Transcode stage of the conversion pipeline: raw downloaded audio to MP3
+"""
+import os
+import queue
+import subprocess
+import threading
+from src.utils.deadline import TrackTimeoutError, current_deadline, deadline_scope
+from src.utils.ffmpeg_locator import ffmpeg_locator
+
+# What yt-dlp leaves behind when it downloads bestaudio without postprocessing
+RAW_AUDIO_EXTENSIONS = ('.m4a', '.webm', '.opus', '.ogg', '.aac', '.mp4')
+
+def is_audio_output(filename, extract_audio=True):
+    """Whether a downloaded file is finished output: an MP3, or raw audio if transcoding happens later"""
+    if filename.endswith('.mp3'):
+        return True
+    return not extract_audio and filename.lower().endswith(RAW_AUDIO_EXTENSIONS)
+
+def first_audio_output(file_paths, extract_audio=True):
+    """The first reported download path that exists and is finished output, or None"""
+    for path in file_paths:
+        if os.path.exists(path) and is_audio_output(path, extract_audio):
+            return path
+    return None
+
+def transcode_to_mp3(src_path, dest_path, bitrate='128'):
+    """Encode ``src_path`` to an MP3 at ``dest_path`` and remove the source.
+
+    Under a deadline (see ``deadline_scope``) ffmpeg is killed when it runs
+    past it and ``TrackTimeoutError`` is raised.
+    """
+    temp_path = f"{dest_path}.part"
+    command = [
+        ffmpeg_locator.binary(), '-y', '-loglevel', 'error', '-nostdin',
+        '-i', src_path, '-vn', '-codec:a', ffmpeg_locator.encoder_for('mp3'), '-b:a', f'{bitrate}k',
+        '-f', 'mp3', temp_path
+    ]
+    deadline = current_deadline()
+    try:
+        try:
+            # subprocess.run kills the child before raising TimeoutExpired
+            result = subprocess.run(command, capture_output=True, text=True,
+                                    timeout=deadline.remaining() if deadline else None)
+        except subprocess.TimeoutExpired:
+            raise TrackTimeoutError(deadline.reason)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip()[-300:] or f"ffmpeg exited with {result.returncode}")
+        os.replace(temp_path, dest_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    os.unlink(src_path)
+    return dest_path
+
+class TranscodePool:
+    """CPU stage of the pipeline: a fixed number of workers, each driving one ffmpeg process.
+
+    Work arrives through a bounded queue. ``submit`` blocks while the queue is
+    full, which holds the calling download slot until an encoder frees up, so
+    fetching never runs far ahead of encoding.
+    """
+
+    def __init__(self, workers, max_pending=None, transcode_fn=transcode_to_mp3):
+        self.workers = max(1, workers)
+        self.transcode_fn = transcode_fn
+        self._queue = queue.Queue(maxsize=max_pending or self.workers * 2)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._active = 0
+        self.counters = {'completed': 0, 'failed': 0, 'timed_out': 0}
+
+    def submit(self, src_path, dest_path, bitrate, callback, deadline=None):
+        """Queue a transcode; ``callback(dest_path, error)`` runs on the worker when it is done.
+
+        A transcode still queued at its ``deadline`` is never started; one
+        running past it is killed. Both report the deadline's reason as error.
+        While the queue is full this blocks until the deadline at most, then
+        reports the timeout to ``callback`` on the calling thread.
+        """
+        self._start_workers()
+        try:
+            self._queue.put((src_path, dest_path, bitrate, callback, deadline),
+                            timeout=deadline.remaining() if deadline else None)
+        except queue.Full:
+            with self._lock:
+                self.counters['timed_out'] += 1
+            callback(dest_path, deadline.reason)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, workers=self.workers, active=self._active,
+                        pending=self._queue.qsize(), max_pending=self._queue.maxsize)
+
+    def _start_workers(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                worker = threading.Thread(target=self._worker, name=f'transcode-{len(self._threads) + 1}')
+                worker.daemon = True
+                worker.start()
+                self._threads.append(worker)
+
+    def _worker(self):
+        while True:
+            src_path, dest_path, bitrate, callback, deadline = self._queue.get()
+            with self._lock:
+                self._active += 1
+
+            error = None
+            timed_out = False
+            try:
+                with deadline_scope(deadline):
+                    if deadline is not None:
+                        deadline.check()
+                    self.transcode_fn(src_path, dest_path, bitrate)
+            except TrackTimeoutError as e:
+                error = str(e)
+                timed_out = True
+            except Exception as e:
+                error = str(e)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self.counters['timed_out' if timed_out else 'failed' if error else 'completed'] += 1
+
+            try:
+                callback(dest_path, error)
+            except Exception as e:
+                print(f"Transcode callback for {dest_path} failed: {e}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,140 @@
+"""
+Reusable yt-dlp instances, so extractor state, HTTP connections and cookies survive across tracks
+"""
+import os
+import yt_dlp
+from src.utils.deadline import TrackTimeoutError, current_deadline
+
+class DeadlineCancelled(yt_dlp.utils.DownloadCancelled):
+    """Raised from yt-dlp hooks once the track's deadline has passed.
+
+    yt-dlp re-raises DownloadCancelled even with ``ignoreerrors`` set, so the
+    download is abandoned instead of being logged and skipped.
+    """
+    msg = 'Track deadline reached'
+
+# Pauses yt-dlp takes on its own; capped on each download at what is left of the track's deadline
+SLEEP_OPTIONS = ('sleep_interval', 'max_sleep_interval', 'sleep_interval_requests')
+
+def downloaded_files(info):
+    """Final paths of the files written for an ``extract_info(..., download=True)`` result"""
+    if not info:
+        return []
+    return [download['filepath'] for download in info.get('requested_downloads', [])
+            if download.get('filepath')]
+
+class PooledYoutubeDL:
+    """A YoutubeDL whose output template, format and hooks can change per download.
+
+    YoutubeDL resolves the output template and builds its format selector in
+    ``__init__``; both are swapped in place here instead of constructing a new
+    instance. Progress hooks are registered once as a dispatcher that calls
+    whatever is in the hook list at download time, so hooks added later are
+    honoured.
+    """
+
+    def __init__(self, opts):
+        opts = dict(opts)
+        self.progress_hooks = opts.pop('progress_hooks', None)
+        if self.progress_hooks is None:
+            self.progress_hooks = []
+        opts['postprocessor_hooks'] = [self._postprocessor_hook]
+        opts['progress_hooks'] = [self._dispatch_progress_hook]
+
+        self.ydl = yt_dlp.YoutubeDL(opts)
+        self.sleep_options = {option: opts[option] for option in SLEEP_OPTIONS if opts.get(option)}
+        self.default_format = opts.get('format')
+        self._format_selectors = {self.default_format: self.ydl.format_selector}
+
+    def download(self, urls, outtmpl=None, format=None):
+        """Download ``urls`` and return the final paths of the files written.
+
+        The paths come from the info dicts yt-dlp returns, after postprocessing
+        (e.g. the .mp3 from FFmpegExtractAudio), so callers never need to scan
+        the output directory.
+        """
+        if outtmpl is not None:
+            self.ydl.params['outtmpl']['default'] = outtmpl
+
+        format = format or self.default_format
+        if format not in self._format_selectors:
+            self._format_selectors[format] = self.ydl.build_format_selector(format)
+        self.ydl.params['format'] = format
+        self.ydl.format_selector = self._format_selectors[format]
+
+        file_paths = []
+        for url in urls:
+            self._check_deadline()
+            deadline = current_deadline()
+            for option, seconds in self.sleep_options.items():
+                self.ydl.params[option] = min(seconds, deadline.remaining()) if deadline else seconds
+            try:
+                # None when the download failed and ignoreerrors is set
+                file_paths.extend(downloaded_files(self.ydl.extract_info(url, download=True)))
+            except DeadlineCancelled as e:
+                raise TrackTimeoutError(e.msg) from e
+        return file_paths
+
+    def close(self):
+        self.ydl.close()
+
+    def _postprocessor_hook(self, d):
+        # An expired track never starts ffmpeg (only when audio is extracted here)
+        if d.get('status') == 'started':
+            self._check_deadline()
+
+    def _dispatch_progress_hook(self, d):
+        # Called for every downloaded chunk, so a stalled or slow download stops soon after the deadline
+        self._check_deadline()
+        for hook in list(self.progress_hooks):
+            hook(d)
+
+    @staticmethod
+    def _check_deadline():
+        deadline = current_deadline()
+        if deadline is not None and deadline.expired():
+            raise DeadlineCancelled(deadline.reason)
+
+class YDLPool:
+    """One PooledYoutubeDL per options profile, owned by a single downloader.
+
+    Not thread-safe: conversion workers each own their downloader instances.
+    ``opts_factory`` is only called the first time a profile is used, so
+    per-call values must be passed as ``outtmpl``/``format`` overrides.
+    Files named by the ``temp_file_options`` of an instance's options (e.g. a
+    generated ``cookiefile``) belong to the pool and are deleted by ``close``.
+    """
+
+    def __init__(self, temp_file_options=()):
+        self.temp_file_options = temp_file_options
+        self._instances = {}
+        self._temp_files = []
+        self.counters = {'created': 0, 'reused': 0}
+
+    def download(self, profile, opts_factory, urls, outtmpl=None, format=None):
+        """Download with the instance for ``profile``; returns the final file paths"""
+        pooled = self._instances.get(profile)
+        if pooled is None:
+            opts = opts_factory()
+            self._temp_files.extend(opts[option] for option in self.temp_file_options if opts.get(option))
+            pooled = self._instances[profile] = PooledYoutubeDL(opts)
+            self.counters['created'] += 1
+        else:
+            self.counters['reused'] += 1
+        return pooled.download(urls, outtmpl=outtmpl, format=format)
+
+    def close(self):
+        for pooled in self._instances.values():
+            try:
+                pooled.close()
+            except Exception as e:
+                print(f"Error closing yt-dlp instance: {e}")
+        self._instances.clear()
+
+        # After closing: yt-dlp writes its cookie jar back to the cookie file on close
+        for path in self._temp_files:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self._temp_files.clear()
@@ -2,12 +2,19 @@
 Enhanced YouTube downloader with anti-bot measures
 """
 import os
-import time
 import random
-import yt_dlp
 from youtube_search import YoutubeSearch
+from src.utils.search_cache import search_cache
+from src.utils.audio_cache import audio_cache
+from src.utils.track_matcher import search_ranked, verify_candidates
+from src.utils.deadline import TrackTimeoutError, deadline_sleep
+from src.utils.ffmpeg_locator import ffmpeg_locator
+from src.utils.transcoder import first_audio_output
+from src.utils.ydl_pool import YDLPool
 
 class EnhancedYouTubeDownloader:
+    AUDIO_BITRATE = '192'
+    
     def __init__(self):
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -15,19 +22,24 @@ class EnhancedYouTubeDownloader:
             'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
         ]
+        # yt-dlp instances reused across tracks
+        self.ydl_pool = YDLPool()
+        # Path of the file written by the last successful download
+        self.output_file = None
+        # Search result the last successful download came from (with its match_score)
+        self.matched_video = None
     
     def get_ydl_opts(self, output_path, filename):
         """Get yt-dlp options with anti-bot measures"""
-        ffmpeg_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'ffmpeg', 'ffmpeg.exe')
         return {
             'format': 'bestaudio/best',
             'outtmpl': os.path.join(output_path, f'{filename}.%(ext)s'),
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
-                'preferredquality': '192',
+                'preferredquality': self.AUDIO_BITRATE,
             }],
-            'ffmpeg_location': ffmpeg_path,
+            'ffmpeg_location': ffmpeg_locator.location(),
             'quiet': True,
             'no_warnings': True,
             'extract_flat': False,
@@ -55,37 +67,35 @@ class EnhancedYouTubeDownloader:
             'max_sleep_interval': 5,
         }
     
-    def search_youtube(self, query, max_results=5):
-        """Search YouTube with multiple fallbacks"""
+    def search_youtube(self, track_name, artists, duration_ms=None, max_results=5):
+        """Search YouTube, trying fallback queries only while no result is a convincing match"""
+        query = f"{track_name} {' '.join(artists)}"
         search_variations = [
             query,
             f"{query} official",
             f"{query} audio",
             f"{query} music",
-            query.replace(" - ", " "),
         ]
         
-        for search_query in search_variations:
-            try:
-                results = YoutubeSearch(search_query, max_results=max_results).to_dict()
-                if results:
-                    return results
-            except Exception as e:
-                print(f"Search failed for '{search_query}': {e}")
-                continue
-        
-        return []
+        return search_ranked(search_variations, lambda search_query: YoutubeSearch(search_query, max_results=max_results).to_dict(),
+                             track_name, artists, duration_ms)
     
-    def download_track(self, track_name, artists, output_dir, max_retries=3):
+    def download_track(self, track_name, artists, output_dir, max_retries=3, duration_ms=None, album=None, year=None):
         """Download a track with enhanced error handling"""
-        # Create search query
-        search_query = f"{track_name} {' '.join(artists)}"
+        self.output_file = None
+        self.matched_video = None
         
-        # Search for videos
-        videos = self.search_youtube(search_query)
+        # Search for videos (shared cache first)
+        videos = search_cache.get_or_search(track_name, artists, duration_ms,
+                                            lambda: self.search_youtube(track_name, artists, duration_ms))
         if not videos:
             return False, "No videos found"
         
+        # Drop candidates whose length rules them out before fetching anything
+        videos = verify_candidates(videos, track_name, artists, duration_ms, album, year)
+        if not videos:
+            return False, "No search result matches the track length"
+        
         # Try each video until one works
         for video in videos:
             video_url = f"https://www.youtube.com/watch?v={video['id']}"
@@ -94,26 +104,42 @@ class EnhancedYouTubeDownloader:
             safe_filename = "".join(c for c in f"{track_name} - {', '.join(artists)}" 
                                   if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
             
+            # Reuse an earlier transcode of this video if we have one
+            cached_file = os.path.join(output_dir, f"{safe_filename}.mp3")
+            if audio_cache.link_into(video['id'], cached_file, bitrate=self.AUDIO_BITRATE):
+                search_cache.record_choice(track_name, artists, video, duration_ms)
+                self.output_file = cached_file
+                self.matched_video = video
+                return True, f"Cached: {video['title']}"
+            
             # Try downloading with retries
             for attempt in range(max_retries):
                 try:
-                    ydl_opts = self.get_ydl_opts(output_dir, safe_filename)
-                    
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        ydl.download([video_url])
+                    file_paths = self.ydl_pool.download(
+                        'enhanced',
+                        lambda: self.get_ydl_opts(output_dir, safe_filename),
+                        [video_url],
+                        outtmpl=os.path.join(output_dir, f'{safe_filename}.%(ext)s')
+                    )
                     
-                    # Check if file was created
-                    for file in os.listdir(output_dir):
-                        if file.startswith(safe_filename) and file.endswith('.mp3'):
-                            return True, f"Downloaded: {video['title']}"
+                    # yt-dlp reports the final file; no need to scan the directory
+                    output_file = first_audio_output(file_paths)
+                    if output_file:
+                        search_cache.record_choice(track_name, artists, video, duration_ms)
+                        audio_cache.insert(video['id'], output_file, bitrate=self.AUDIO_BITRATE)
+                        self.output_file = output_file
+                        self.matched_video = video
+                        return True, f"Downloaded: {video['title']}"
                     
+                except TrackTimeoutError:
+                    raise
                 except Exception as e:
                     print(f"Download attempt {attempt + 1} failed: {e}")
                     if attempt < max_retries - 1:
-                        time.sleep(random.uniform(2, 5))
+                        deadline_sleep(random.uniform(2, 5))
                     continue
             
             # Wait before trying next video
-            time.sleep(random.uniform(1, 3))
+            deadline_sleep(random.uniform(1, 3))
         
         return False, "All download attempts failed"
\ No newline at end of file
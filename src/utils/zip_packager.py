@@ -0,0 +1,145 @@
+"""
+ZIP packaging of converted tracks, either written to disk or streamed
+"""
+import threading
+import time
+import zipfile
+
+# Bytes read from a track file per write, and the size of streamed response chunks
+CHUNK_SIZE = 1024 * 1024
+
+# Already-compressed formats; deflating them costs CPU for no size gain
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.aac', '.ogg', '.opus', '.flac', '.webm')
+
+def compression_for(arcname):
+    """ZIP compression method for an entry: stored for audio, deflated for everything else"""
+    if arcname.lower().endswith(AUDIO_EXTENSIONS):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+class _StreamWriter:
+    """Write-only, non-seekable file object collecting what zipfile writes.
+
+    Without ``seek`` zipfile writes each entry with a data descriptor after its
+    data, so the archive can be emitted front to back.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Return and forget everything written since the last drain"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _zip_info(arcname, source):
+    if isinstance(source, bytes):
+        info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+        info.file_size = len(source)
+    else:
+        info = zipfile.ZipInfo.from_file(source, arcname)
+    info.compress_type = compression_for(arcname)
+    return info
+
+def _read_chunks(source):
+    """Yield the data of an entry; ``source`` is a file path or the entry's bytes"""
+    if isinstance(source, bytes):
+        yield source
+        return
+    with open(source, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+def _open_entry(zipf, arcname, source):
+    # ZIP64 headers on every entry so sizes are never limited to 4 GB
+    return zipf.open(_zip_info(arcname, source), 'w', force_zip64=True)
+
+def write_zip(zip_path, entries):
+    """Write ``entries`` ((arcname, path or bytes) pairs) to a ZIP file on disk"""
+    with zipfile.ZipFile(zip_path, 'w', allowZip64=True) as zipf:
+        for arcname, source in entries:
+            with _open_entry(zipf, arcname, source) as dest:
+                for chunk in _read_chunks(source):
+                    dest.write(chunk)
+    return zip_path
+
+class IncrementalZipPackager:
+    """ZIP file on disk that grows as tracks finish.
+
+    Each finished track is appended with ``add`` while the rest of the job is
+    still converting, so ``finalize`` only has to add the remaining entries
+    (the report) and write the central directory.
+    """
+
+    def __init__(self, zip_path):
+        self.zip_path = zip_path
+        self._zipf = zipfile.ZipFile(zip_path, 'w', allowZip64=True)
+        self._names = set()
+        self._lock = threading.Lock()
+
+    def add(self, arcname, source):
+        """Append an entry; returns False if the name is already in the archive"""
+        with self._lock:
+            if arcname in self._names:
+                return False
+            self._write(arcname, source)
+            return True
+
+    def finalize(self, entries):
+        """Add the ``entries`` not written yet, list everything in ``entries`` order and close"""
+        with self._lock:
+            for arcname, source in entries:
+                if arcname not in self._names:
+                    self._write(arcname, source)
+
+            # Tracks were appended in completion order; the directory follows track order
+            order = {arcname: i for i, (arcname, _) in enumerate(entries)}
+            self._zipf.filelist.sort(key=lambda info: order.get(info.filename, len(order)))
+            self._zipf.close()
+        return self.zip_path
+
+    def close(self):
+        """Close without finalizing, e.g. when the job failed"""
+        with self._lock:
+            self._zipf.close()
+
+    def _write(self, arcname, source):
+        # Caller holds self._lock
+        with _open_entry(self._zipf, arcname, source) as dest:
+            for chunk in _read_chunks(source):
+                dest.write(chunk)
+        self._names.add(arcname)
+
+def stream_zip(entries):
+    """Generate a ZIP archive of ``entries`` chunk by chunk, without writing it to disk"""
+    writer = _StreamWriter()
+
+    with zipfile.ZipFile(writer, 'w', allowZip64=True) as zipf:
+        for arcname, source in entries:
+            with _open_entry(zipf, arcname, source) as dest:
+                for chunk in _read_chunks(source):
+                    dest.write(chunk)
+                    data = writer.drain()
+                    if data:
+                        yield data
+            # Data descriptor written when the entry is closed
+            yield writer.drain()
+
+    # Central directory
+    yield writer.drain()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test the job reaper: TTL expiry, disk budget eviction order and reclaimed-bytes metrics
+"""
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from src.utils.artifact_reaper import ArtifactReaper
+
+PREFIX = 'test_converter_'
+
+def make_job_dir(root, job_id, size, age=0):
+    path = tempfile.mkdtemp(prefix=f'{PREFIX}{job_id}_', dir=root)
+    os.makedirs(os.path.join(path, '.tracks'))
+    with open(os.path.join(path, 'track.mp3'), 'wb') as f:
+        f.write(b'x' * size)
+    if age:
+        past = time.time() - age
+        os.utime(path, (past, past))
+    return path
+
+def make_reaper(root, jobs, max_bytes):
+    def expire_jobs(cutoff):
+        for job_id, job in list(jobs.items()):
+            if job['created_at'] < cutoff:
+                shutil.rmtree(job['path'], ignore_errors=True)
+                del jobs[job_id]
+    
+    reaper = ArtifactReaper(interval=60, job_ttl=timedelta(hours=24), max_bytes=max_bytes, root=root)
+    reaper.register('test', PREFIX, jobs.get, expire_jobs)
+    return reaper
+
+def test_expiry_and_eviction_order():
+    """Expired jobs go first; over budget, orphans then downloaded then finished jobs are evicted"""
+    root = tempfile.mkdtemp()
+    try:
+        now = datetime.now()
+        jobs = {}
+        
+        def add_job(job_id, status, age_hours, downloaded_ago=None):
+            created = now - timedelta(hours=age_hours)
+            jobs[job_id] = {'status': status, 'created_at': created,
+                            'path': make_job_dir(root, job_id, 1000)}
+            if downloaded_ago is not None:
+                jobs[job_id]['downloaded_at'] = time.time() - downloaded_ago
+        
+        add_job('expired', 'completed', 30)
+        add_job('running', 'processing', 5)
+        add_job('finished-old', 'completed', 4)
+        add_job('finished-new', 'completed', 1)
+        add_job('downloaded', 'completed', 2, downloaded_ago=3600)
+        add_job('downloading', 'completed', 3, downloaded_ago=10)
+        orphan = make_job_dir(root, 'orphan', 1000, age=2 * 3600)
+        fresh_orphan = make_job_dir(root, 'fresh-orphan', 1000)
+        unrelated = tempfile.mkdtemp(prefix='other_', dir=root)
+        
+        # 7 directories of 1000 bytes survive expiry; 3 must go to fit 4000 bytes
+        reaper = make_reaper(root, jobs, max_bytes=4000)
+        reclaimed = reaper.run_once()
+        
+        assert 'expired' not in jobs
+        assert not os.path.exists(orphan)
+        assert not os.path.exists(jobs['downloaded']['path'])
+        assert not os.path.exists(jobs['finished-old']['path'])
+        for job_id in ('running', 'finished-new', 'downloading'):
+            assert os.path.exists(jobs[job_id]['path']), job_id
+        assert os.path.exists(fresh_orphan)
+        assert os.path.exists(unrelated)
+        
+        stats = reaper.stats()
+        assert reclaimed == 4000
+        assert stats['bytes_reclaimed'] == 4000
+        assert stats['expired_dirs'] == 1
+        assert stats['evicted_dirs'] == 3
+        assert stats['disk_usage_bytes'] == 4000
+        assert stats['runs'] == 1
+    finally:
+        shutil.rmtree(root)
+
+def test_under_budget_keeps_everything():
+    """Nothing but expired jobs is removed while usage fits the budget"""
+    root = tempfile.mkdtemp()
+    try:
+        jobs = {'done': {'status': 'completed', 'created_at': datetime.now(),
+                         'downloaded_at': time.time() - 3600, 'path': make_job_dir(root, 'done', 500)}}
+        reaper = make_reaper(root, jobs, max_bytes=10000)
+        
+        assert reaper.run_once() == 0
+        assert os.path.exists(jobs['done']['path'])
+        assert reaper.stats()['disk_usage_bytes'] == 500
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    test_expiry_and_eviction_order()
+    test_under_budget_keeps_everything()
+    print("✅ Artifact reaper tests passed")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed transcoded-audio cache
+"""
+import os
+import tempfile
+import time
+from src.utils.audio_cache import AudioCache
+
+def write_file(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+
+def test_insert_and_link_hit():
+    """A second job gets the cached file without re-downloading"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = AudioCache(root=os.path.join(temp_dir, 'cache'), max_bytes=10_000)
+        job_one = os.path.join(temp_dir, 'job1')
+        job_two = os.path.join(temp_dir, 'job2')
+        os.makedirs(job_one)
+        os.makedirs(job_two)
+        
+        assert not cache.link_into('vid1', os.path.join(job_two, 'Song - Artist.mp3'))
+        
+        write_file(os.path.join(job_one, 'Song - Artist.mp3'), 1000)
+        cached_path = cache.insert('vid1', os.path.join(job_one, 'Song - Artist.mp3'))
+        assert cached_path and os.path.getsize(cached_path) == 1000
+        
+        # Job 1 cleaning up must not affect the cache
+        os.unlink(os.path.join(job_one, 'Song - Artist.mp3'))
+        
+        dest = os.path.join(job_two, 'Song - Artist.mp3')
+        assert cache.link_into('vid1', dest)
+        assert os.path.getsize(dest) == 1000
+        
+        # Linking over an existing link to the same inode keeps the cached file intact
+        assert cache.link_into('vid1', dest)
+        assert os.path.getsize(cached_path) == 1000
+        
+        # Different bitrate is a different entry
+        assert cache.lookup('vid1', bitrate='192') is None
+        
+        stats = cache.stats()
+        print(f"   Stats: {stats}")
+        assert stats['hits'] == 2 and stats['inserts'] == 1
+        assert not [name for _, _, names in os.walk(temp_dir) for name in names if name.endswith('.part')]
+
+def test_eviction_keeps_budget():
+    """Least recently used files go first when over the byte budget"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = AudioCache(root=os.path.join(temp_dir, 'cache'), max_bytes=3000)
+        
+        # Separate source files, since hardlinked entries would share an mtime
+        def insert(video_id):
+            source = os.path.join(temp_dir, f'{video_id}.mp3')
+            write_file(source, 1000)
+            cache.insert(video_id, source)
+            time.sleep(0.01)
+        
+        for i in range(3):
+            insert(f'vid{i}')
+        
+        # Touch vid0 so vid1 is the oldest
+        assert cache.lookup('vid0')
+        insert('vid3')
+        
+        assert cache.stats()['bytes'] <= 3000
+        assert cache.lookup('vid1') is None
+        assert cache.lookup('vid0') and cache.lookup('vid3')
+
+if __name__ == "__main__":
+    test_insert_and_link_hit()
+    test_eviction_keeps_budget()
+    print("✅ Audio cache tests passed")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test the shared conversion scheduler (fair share and admission control)
+"""
+import threading
+import time
+from src.utils.conversion_scheduler import ConversionScheduler, SchedulerFullError
+
+def test_fair_share():
+    """A small job should not wait behind a large one"""
+    print("🚀 Testing fair-share scheduling")
+    scheduler = ConversionScheduler(download_slots=1, transcode_slots=1, max_active_jobs=2)
+    order = []
+    done = threading.Event()
+    gate = threading.Event()
+    
+    def task(name):
+        gate.wait()
+        order.append(name)
+    
+    scheduler.submit('big', [lambda i=i: task(f'big-{i}') for i in range(20)])
+    scheduler.submit('small', [lambda i=i: task(f'small-{i}') for i in range(3)],
+                     on_complete=done.set)
+    gate.set()
+    
+    assert done.wait(5), "Small job never finished"
+    # With one slot the small job's last task runs within the first few turns
+    last_small = max(order.index(f'small-{i}') for i in range(3))
+    print(f"   Small job finished after {last_small + 1} tasks")
+    assert last_small < 7
+
+def test_admission_control():
+    """Jobs beyond the active and queued limits are rejected"""
+    print("🚀 Testing admission control")
+    scheduler = ConversionScheduler(download_slots=1, transcode_slots=1, max_active_jobs=1, max_queued_jobs=1)
+    gate = threading.Event()
+    
+    assert scheduler.submit('first', [gate.wait]) == 0
+    assert scheduler.submit('second', [gate.wait]) == 1
+    assert scheduler.queue_position('second') == 1
+    
+    try:
+        scheduler.submit('third', [gate.wait])
+        assert False, "Third job should have been rejected"
+    except SchedulerFullError as e:
+        print(f"   Rejected: {e}")
+    
+    gate.set()
+    for _ in range(50):
+        if scheduler.stats()['active_jobs'] == 0:
+            break
+        time.sleep(0.05)
+    assert scheduler.queue_position('second') is None
+
+if __name__ == "__main__":
+    test_fair_share()
+    test_admission_control()
+    print("✅ Scheduler tests passed")
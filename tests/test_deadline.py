@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test per-track deadlines: interrupted sleeps, strategies and transcodes
+"""
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from src.utils.deadline import Deadline, TrackTimeoutError, check_deadline, current_deadline, deadline_scope, deadline_sleep
+from src.utils.strategy_runner import StrategyRunner
+from src.utils.ffmpeg_locator import ffmpeg_locator
+from src.utils.transcoder import TranscodePool, transcode_to_mp3
+from src.utils.ydl_pool import PooledYoutubeDL
+
+def test_earliest_deadline_wins():
+    job_deadline = Deadline(1, 'job budget')
+    assert Deadline.earliest(60, 'track', job_deadline) is job_deadline
+
+    track_deadline = Deadline.earliest(0.5, 'track', job_deadline)
+    assert track_deadline.reason == 'track'
+    assert Deadline.earliest(60, 'track').reason == 'track'
+
+def test_deadline_scope_is_per_thread():
+    seen = []
+    with deadline_scope(Deadline(60, 'main')):
+        worker = threading.Thread(target=lambda: seen.append(current_deadline()))
+        worker.start()
+        worker.join()
+        assert current_deadline().reason == 'main'
+    assert seen == [None]
+    assert current_deadline() is None
+
+def test_sleep_stops_at_deadline():
+    deadline_sleep(0.01)  # No deadline: a plain sleep
+
+    started = time.monotonic()
+    with deadline_scope(Deadline(0.1, 'too slow')):
+        try:
+            deadline_sleep(5)
+            assert False, "sleep should have been cut short"
+        except TrackTimeoutError as e:
+            assert str(e) == 'too slow'
+    assert time.monotonic() - started < 1
+
+    with deadline_scope(Deadline(0, 'expired')):
+        try:
+            check_deadline()
+            assert False, "expired deadline should raise"
+        except TrackTimeoutError:
+            pass
+
+def test_runner_stops_trying_strategies():
+    runner = StrategyRunner(failure_threshold=5, cooldown=60)
+    calls = []
+
+    def slow():
+        calls.append('slow')
+        deadline_sleep(5)
+        return True, 'slow ok'
+
+    def fallback():
+        calls.append('fallback')
+        return True, 'fallback ok'
+
+    with deadline_scope(Deadline(0.1, 'track deadline')):
+        try:
+            runner.run([('slow', slow), ('fallback', fallback)])
+            assert False, "timeout should reach the caller"
+        except TrackTimeoutError:
+            pass
+
+    # The timed-out strategy counts as a failure and the next one is never started
+    assert calls == ['slow']
+    assert runner.stats()['slow']['failures'] == 1
+
+def test_transcode_pool_skips_and_interrupts():
+    def transcode(src_path, dest_path, bitrate):
+        deadline_sleep(5 if src_path == 'slow' else 0)
+
+    pool = TranscodePool(1, transcode_fn=transcode)
+    done = {}
+    finished = threading.Event()
+
+    def callback(name):
+        def record(dest_path, error):
+            done[name] = error
+            if len(done) == 3:
+                finished.set()
+        return record
+
+    pool.submit('slow', 'slow.mp3', '192k', callback('slow'), deadline=Deadline(0.2, 'slow timed out'))
+    pool.submit('queued', 'queued.mp3', '192k', callback('queued'), deadline=Deadline(0.1, 'queued timed out'))
+    pool.submit('fast', 'fast.mp3', '192k', callback('fast'))
+    assert finished.wait(5), "transcodes did not finish"
+
+    assert done == {'slow': 'slow timed out', 'queued': 'queued timed out', 'fast': None}
+    stats = pool.stats()
+    assert stats['timed_out'] == 2
+    assert stats['completed'] == 1
+
+def test_full_transcode_queue_gives_up_at_deadline():
+    """A download slot waiting on a full transcode queue is released at the track's deadline"""
+    gate = threading.Event()
+    pool = TranscodePool(1, max_pending=1, transcode_fn=lambda src_path, dest_path, bitrate: gate.wait(5))
+    done = {}
+    
+    pool.submit('running', 'running.mp3', '192k', lambda dest_path, error: None)
+    time.sleep(0.1)  # Let the worker pick it up
+    pool.submit('queued', 'queued.mp3', '192k', lambda dest_path, error: None)
+    
+    started = time.monotonic()
+    pool.submit('late', 'late.mp3', '192k', lambda dest_path, error: done.update(late=error),
+                deadline=Deadline(0.2, 'late timed out'))
+    assert time.monotonic() - started < 2
+    assert done == {'late': 'late timed out'}
+    assert pool.stats()['timed_out'] == 1
+    gate.set()
+
+def test_ydl_sleeps_capped_at_deadline():
+    """yt-dlp's own pauses never outlast the track's deadline, and return to normal without one"""
+    pooled = PooledYoutubeDL({'quiet': True, 'sleep_interval': 15, 'max_sleep_interval': 45})
+    seen = []
+    pooled.ydl.extract_info = lambda url, download=True: seen.append(
+        (pooled.ydl.params['sleep_interval'], pooled.ydl.params['max_sleep_interval']))
+    
+    with deadline_scope(Deadline(2, 'track deadline')):
+        pooled.download(['a'])
+    pooled.download(['b'])
+    pooled.close()
+    
+    assert seen[0][0] <= 2 and seen[0][1] <= 2
+    assert seen[1] == (15, 45)
+
+def test_ffmpeg_killed_at_deadline():
+    """A hanging encode is killed when the deadline passes instead of holding the worker"""
+    temp_dir = tempfile.mkdtemp()
+    fake_ffmpeg = os.path.join(temp_dir, 'ffmpeg')
+    with open(fake_ffmpeg, 'w') as f:
+        f.write('#!/bin/sh\nexec sleep 30\n')
+    os.chmod(fake_ffmpeg, os.stat(fake_ffmpeg).st_mode | stat.S_IEXEC)
+    src_path = os.path.join(temp_dir, 'track.webm')
+    open(src_path, 'wb').close()
+    
+    original = ffmpeg_locator.binary, ffmpeg_locator.encoder_for
+    ffmpeg_locator.binary = lambda: fake_ffmpeg
+    ffmpeg_locator.encoder_for = lambda codec: 'libmp3lame'
+    started = time.monotonic()
+    try:
+        with deadline_scope(Deadline(0.3, 'encode too slow')):
+            transcode_to_mp3(src_path, os.path.join(temp_dir, 'track.mp3'))
+        assert False, "transcode should have timed out"
+    except TrackTimeoutError as e:
+        assert str(e) == 'encode too slow'
+    finally:
+        ffmpeg_locator.binary, ffmpeg_locator.encoder_for = original
+    
+    assert time.monotonic() - started < 5
+    assert not os.path.exists(os.path.join(temp_dir, 'track.mp3.part'))
+    shutil.rmtree(temp_dir)
+
+if __name__ == "__main__":
+    test_earliest_deadline_wins()
+    test_deadline_scope_is_per_thread()
+    test_sleep_stops_at_deadline()
+    test_runner_stops_trying_strategies()
+    test_transcode_pool_skips_and_interrupts()
+    test_full_transcode_queue_gives_up_at_deadline()
+    test_ydl_sleeps_capped_at_deadline()
+    test_ffmpeg_killed_at_deadline()
+    print("✅ Deadline tests passed")
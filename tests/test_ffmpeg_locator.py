@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test FFmpeg discovery and the background capability probe
+"""
+import os
+import stat
+import tempfile
+from src.utils.ffmpeg_locator import FFmpegLocator
+
+# Stand-in for ffmpeg answering the probe's -version, -encoders and -hwaccels calls
+FAKE_FFMPEG = """#!/bin/sh
+case "$2" in
+  -version) echo "ffmpeg version 6.1-test" ;;
+  -encoders)
+    echo "Encoders:"
+    echo " A..... = Audio"
+    echo " ------"
+    echo " V....D libx264              libx264 H.264"
+    echo " A....D aac                  AAC (Advanced Audio Coding)"
+    echo " A....D libshine             libshine MP3 (MPEG audio layer 3)"
+    echo " A....D libopus              libopus Opus" ;;
+  -hwaccels)
+    echo "Hardware acceleration methods:"
+    echo "vaapi" ;;
+esac
+"""
+
+def make_fake_ffmpeg(directory):
+    path = os.path.join(directory, 'ffmpeg')
+    with open(path, 'w') as f:
+        f.write(FAKE_FFMPEG)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+def test_resolution_order():
+    """FFMPEG_PATH wins over the bundled binary, which wins over PATH"""
+    with tempfile.TemporaryDirectory() as bundled, tempfile.TemporaryDirectory() as override:
+        bundled_path = make_fake_ffmpeg(bundled)
+        override_path = make_fake_ffmpeg(override)
+        
+        previous = os.environ.pop('FFMPEG_PATH', None)
+        try:
+            assert FFmpegLocator(bundled_dir=bundled).path == bundled_path
+            
+            os.environ['FFMPEG_PATH'] = override  # a directory works too
+            assert FFmpegLocator(bundled_dir=bundled).path == override_path
+            
+            os.environ['FFMPEG_PATH'] = os.path.join(override, 'missing')
+            assert FFmpegLocator(bundled_dir=bundled).path == bundled_path
+        finally:
+            os.environ.pop('FFMPEG_PATH', None)
+            if previous is not None:
+                os.environ['FFMPEG_PATH'] = previous
+
+def test_probe_picks_available_encoders():
+    """Encoders are read once in the background; before that the default is assumed"""
+    with tempfile.TemporaryDirectory() as bundled:
+        make_fake_ffmpeg(bundled)
+        previous = os.environ.pop('FFMPEG_PATH', None)
+        try:
+            locator = FFmpegLocator(bundled_dir=bundled)
+            assert locator.encoder_for('mp3') == 'libmp3lame'
+            
+            capabilities = locator.capabilities(timeout=10)
+        finally:
+            if previous is not None:
+                os.environ['FFMPEG_PATH'] = previous
+        
+        assert capabilities['version'] == 'ffmpeg version 6.1-test'
+        assert capabilities['encoders'] == ['aac', 'libopus', 'libshine']
+        assert capabilities['hwaccels'] == ['vaapi']
+        assert locator.encoder_for('mp3') == 'libshine'
+        assert locator.encoder_for('opus') == 'libopus'
+        assert locator.encoder_for('aac') == 'aac'
+        assert locator.stats()['probed']
+
+def test_missing_ffmpeg():
+    """Without any FFmpeg the probe finishes and the defaults stay in place"""
+    with tempfile.TemporaryDirectory() as empty:
+        locator = FFmpegLocator(bundled_dir=empty)
+        if locator.path is not None:
+            return  # FFmpeg on PATH
+        assert locator.binary() == 'ffmpeg'
+        assert locator.location() is None
+        assert locator.capabilities(timeout=10)['encoders'] == []
+        assert locator.encoder_for('mp3') == 'libmp3lame'
+
+if __name__ == "__main__":
+    test_resolution_order()
+    test_probe_picks_available_encoders()
+    test_missing_ffmpeg()
+    print("✅ FFmpeg locator tests passed")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test the per-job progress event log used by the SSE endpoint
+"""
+import threading
+import time
+from datetime import datetime
+from flask import Flask
+from src.utils.job_events import JobEventLog
+from src.utils.job_store import InMemoryJobStore
+
+def test_sequence_and_cursor():
+    """Events are numbered per job and read after a cursor"""
+    log = JobEventLog()
+    log.publish('job-1', 'track', event='started', index=0)
+    log.publish('job-2', 'track', event='started', index=0)
+    log.publish('job-1', 'track', event='completed', index=0)
+    
+    assert [e['seq'] for e in log.since('job-1')] == [1, 2]
+    assert [e['event'] for e in log.since('job-1', 1)] == ['completed']
+    assert log.last_seq('job-2') == 1
+    
+    log.discard('job-1')
+    assert log.since('job-1') == []
+
+def test_wait_wakes_on_publish():
+    """A waiting reader is woken by the next event instead of the timeout"""
+    log = JobEventLog()
+    timer = threading.Timer(0.1, lambda: log.publish('job-1', 'status', status='completed'))
+    timer.start()
+    
+    start = time.time()
+    events = log.wait('job-1', 0, timeout=5)
+    assert [e['status'] for e in events] == ['completed']
+    assert time.time() - start < 2
+    
+    # Nothing new after the cursor: returns empty after the timeout
+    assert log.wait('job-1', 1, timeout=0.05) == []
+
+def test_stream_ends_when_job_finishes_elsewhere():
+    """A stream whose event log never sees the job (another worker process runs it) still ends"""
+    from src.routes import conversion
+    
+    app = Flask(__name__)
+    app.register_blueprint(conversion.conversion_bp, url_prefix='/api/convert')
+    saved = conversion.conversion_jobs, conversion.job_events, conversion.HEARTBEAT_INTERVAL
+    conversion.conversion_jobs = InMemoryJobStore()
+    conversion.job_events = JobEventLog()
+    conversion.HEARTBEAT_INTERVAL = 0.05
+    try:
+        job = {'status': 'processing', 'total_tracks': 2, 'completed_tracks': 0, 'failed_tracks': 0,
+               'current_track': None, 'created_at': datetime.now(), 'temp_dir': None, 'zip_path': None,
+               'error': None, 'completed_track_list': [], 'failed_track_list': []}
+        conversion.conversion_jobs['job-1'] = job
+        
+        def finish():
+            job['completed_tracks'] = 2
+            job['status'] = 'completed'
+        threading.Timer(0.2, finish).start()
+        
+        start = time.time()
+        response = app.test_client().get('/api/convert/events/job-1')
+        body = response.get_data(as_text=True)
+        assert time.time() - start < 5
+        assert body.count('event: status') == 2
+        assert '"status": "completed"' in body
+    finally:
+        conversion.conversion_jobs, conversion.job_events, conversion.HEARTBEAT_INTERVAL = saved
+
+if __name__ == "__main__":
+    test_sequence_and_cursor()
+    test_wait_wakes_on_publish()
+    test_stream_ends_when_job_finishes_elsewhere()
+    print("✅ Job event tests passed")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test the conversion job stores
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from src.models.user import db
+from src.models.conversion_job import ConversionJob
+import threading
+from src.utils.job_store import InMemoryJobStore, SQLiteJobStore, snapshot_job
+from src.utils.artifact_reaper import ArtifactReaper
+
+def make_job(status='queued', created_at=None):
+    return {
+        'status': status,
+        'playlist_name': 'Test Playlist',
+        'total_tracks': 2,
+        'completed_tracks': 0,
+        'failed_tracks': 0,
+        'current_track': None,
+        'created_at': created_at or datetime.now(),
+        'tracks': [{'name': 'Song', 'artists': ['Artist']}],
+        'temp_dir': None,
+        'zip_path': None,
+        'error': None,
+        'failed_track_list': [],
+        'completed_track_list': []
+    }
+
+def make_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+def test_in_memory_store():
+    """Jobs can be created, read, expired and deleted"""
+    store = InMemoryJobStore()
+    store['old'] = make_job(created_at=datetime.now() - timedelta(days=2))
+    store['new'] = make_job()
+    
+    assert 'new' in store
+    assert store.expired_job_ids(datetime.now() - timedelta(days=1)) == ['old']
+    del store['old']
+    assert store.get('old') is None
+
+def test_sqlite_store_shared_between_workers():
+    """A second worker process sees progress written by the first"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'jobs.db')
+        worker_a = SQLiteJobStore(make_app(db_path), flush_interval=60)
+        worker_b = SQLiteJobStore(make_app(db_path), flush_interval=60)
+        
+        worker_a['job-1'] = make_job()
+        assert worker_b['job-1']['status'] == 'queued'
+        
+        # Batched progress writes become visible after a flush
+        job = worker_a['job-1']
+        job['completed_tracks'] = 1
+        job['completed_track_list'].append({'name': 'Song', 'artists': ['Artist'], 'status': 'success'})
+        worker_a.save('job-1')
+        assert worker_b['job-1']['completed_tracks'] == 0
+        worker_a.flush()
+        assert worker_b['job-1']['completed_tracks'] == 1
+        assert worker_b['job-1']['completed_track_list'][0]['name'] == 'Song'
+        
+        # Status changes are written immediately
+        job['status'] = 'completed'
+        worker_a.save('job-1', flush=True)
+        assert worker_b['job-1']['status'] == 'completed'
+        assert isinstance(worker_b['job-1']['created_at'], datetime)
+        
+        del worker_b['job-1']
+        assert 'job-1' not in worker_a
+
+def test_sqlite_update_of_finished_job():
+    """Updates to a job that finished (and left this process's live set) reach the database"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'jobs.db')
+        store = SQLiteJobStore(make_app(db_path), flush_interval=60)
+        
+        store['job-1'] = make_job()
+        store['job-1']['status'] = 'completed'
+        store.save('job-1', flush=True)
+        
+        downloaded_at = time.time()
+        store.update('job-1', downloaded_at=downloaded_at)
+        assert store['job-1']['downloaded_at'] == downloaded_at
+        assert store['job-1']['status'] == 'completed'
+        
+        # The reaper sees the download, so the archive is protected while it may still stream
+        tempfile.mkdtemp(prefix='test_converter_job-1_', dir=temp_dir)
+        reaper = ArtifactReaper(interval=60, max_bytes=10 ** 9, root=temp_dir)
+        reaper.register('test', 'test_converter_', store.get, lambda cutoff: None)
+        assert [(a['job_id'], a['state']) for a in reaper._scan()] == [('job-1', 'downloading')]
+        
+        try:
+            store.update('missing', downloaded_at=downloaded_at)
+            assert False, "Updating an unknown job should raise KeyError"
+        except KeyError:
+            pass
+
+def test_sqlite_flush_while_workers_change_jobs():
+    """Batched writes copy each job under the workers' lock, so new keys mid-write never break a flush"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        job_lock = threading.RLock()
+        store = SQLiteJobStore(make_app(os.path.join(temp_dir, 'jobs.db')), flush_interval=60, job_lock=job_lock)
+        store['job-1'] = make_job()
+        job = store['job-1']
+        stop = threading.Event()
+        
+        def worker():
+            i = 0
+            while not stop.is_set() and i < 2000:
+                with job_lock:
+                    job[f'extra_{i % 50}'] = i
+                    if i % 50 == 49:
+                        for key in [key for key in job if key.startswith('extra_')]:
+                            del job[key]
+                i += 1
+                time.sleep(0)
+        
+        # Switch threads as often as possible so the worker runs in the middle of writes
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        thread = threading.Thread(target=worker)
+        thread.start()
+        try:
+            for _ in range(50):
+                store.save('job-1')
+                store.flush()
+        finally:
+            stop.set()
+            thread.join()
+            sys.setswitchinterval(switch_interval)
+        
+        snapshot = snapshot_job(job, job_lock)
+        assert snapshot == job and snapshot['completed_track_list'] is not job['completed_track_list']
+        store.flush()
+        assert store['job-1']['status'] == 'queued'
+
+if __name__ == "__main__":
+    test_in_memory_store()
+    test_sqlite_store_shared_between_workers()
+    test_sqlite_update_of_finished_job()
+    test_sqlite_flush_while_workers_change_jobs()
+    print("✅ Job store tests passed")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Measure wrong-match downloads on a corpus of YouTube search results (tests/fixtures/search_results.json)
+
+Each entry holds a Spotify track, the results YoutubeSearch returned for it
+and the ids of the results that are the right recording. A strategy's wasted
+downloads are the wrong candidates it would fetch before reaching a right one.
+"""
+import json
+import os
+from src.utils.track_matcher import duration_matches, rank_candidates, verify_candidates
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'search_results.json')
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+def wasted_downloads(candidates, correct):
+    """(wrong downloads before the first right candidate, whether a right one was reached)"""
+    for i, candidate in enumerate(candidates):
+        if candidate['id'] in correct:
+            return i, True
+    return len(candidates), False
+
+def measure(strategy):
+    """Wasted downloads per track and tracks without a right match for a candidate ordering strategy"""
+    corpus = load_corpus()
+    wasted = 0
+    missed = []
+    for entry in corpus:
+        track = entry['track']
+        candidates = strategy(entry['results'], track['name'], track['artists'], track['duration_ms'])
+        count, found = wasted_downloads(candidates, set(entry['correct']))
+        wasted += count
+        if not found:
+            missed.append(track['name'])
+    return wasted / len(corpus), missed
+
+def download_in_search_order(results, track_name, artists, duration_ms):
+    return results
+
+def download_verified(results, track_name, artists, duration_ms):
+    return verify_candidates(rank_candidates(results, track_name, artists, duration_ms),
+                             track_name, artists, duration_ms)
+
+def test_corpus_is_consistent():
+    """Every right answer in the corpus passes the duration check"""
+    for entry in load_corpus():
+        for result in entry['results']:
+            if result['id'] in entry['correct']:
+                assert duration_matches(result, entry['track']['duration_ms']), result['id']
+
+def test_verified_matching_wastes_fewer_downloads():
+    baseline_rate, baseline_missed = measure(download_in_search_order)
+    verified_rate, verified_missed = measure(download_verified)
+    
+    assert not baseline_missed and not verified_missed
+    assert verified_rate <= 0.1, verified_rate
+    assert verified_rate < baseline_rate / 5, (verified_rate, baseline_rate)
+
+def test_rejects_loops_and_live_versions():
+    """Hour-long loops, mixes and live versions never reach the download stage"""
+    for entry in load_corpus():
+        track = entry['track']
+        kept = {candidate['id'] for candidate in download_verified(entry['results'], track['name'],
+                                                                    track['artists'], track['duration_ms'])}
+        for rejected in ('bl-10h', 'cl-1h', 'rd-mix', 'br-live', 'hc-live', 'st-lesson', 'to-reaction'):
+            assert rejected not in kept
+
+if __name__ == "__main__":
+    test_corpus_is_consistent()
+    test_verified_matching_wastes_fewer_downloads()
+    test_rejects_loops_and_live_versions()
+    for name, strategy in (('search order', download_in_search_order), ('ranked + verified', download_verified)):
+        rate, missed = measure(strategy)
+        print(f"{name:>18}: {rate:.2f} wasted downloads per track, {len(missed)} tracks without a match")
+    print("✅ Match corpus tests passed")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test the Spotify playlist cache: snapshot revalidation, persistence and serving repeat loads
+"""
+import os
+import shutil
+import tempfile
+from src.utils.playlist_cache import PlaylistCache
+
+class FakeSpotify:
+    """A 1,000-track playlist whose snapshot changes when ``snapshot_id`` is updated"""
+
+    def __init__(self, total=1000):
+        self.total = total
+        self.snapshot_id = 'snap-1'
+        self.calls = []
+
+    def items(self, offset, limit):
+        return [{'track': {'id': f'id{index}', 'name': f'Song {index}', 'type': 'track', 'duration_ms': 1000,
+                           'preview_url': None, 'artists': [{'name': 'Artist'}]}}
+                for index in range(offset, min(offset + limit, self.total))]
+
+    def playlist(self, playlist_id, fields=None, additional_types=None):
+        self.calls.append('playlist')
+        if fields == 'snapshot_id':
+            return {'snapshot_id': self.snapshot_id}
+        return {'id': playlist_id, 'name': 'Cached Playlist', 'description': '', 'public': True,
+                'snapshot_id': self.snapshot_id, 'tracks': {'total': self.total, 'items': self.items(0, 100)}}
+
+    def playlist_items(self, playlist_id, fields=None, limit=100, offset=0, additional_types=None):
+        self.calls.append('playlist_items')
+        return {'items': self.items(offset, limit)}
+
+def test_cache_keys_and_persistence():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(temp_dir, 'playlist_cache.db')
+        cache = PlaylistCache(db_path=db_path)
+        cache.set('pl', 'snap-1', {'name': 'A', 'tracks': []})
+        
+        assert cache.get('pl', 'snap-1') == {'name': 'A', 'tracks': []}
+        assert cache.get('pl', 'snap-2') is None
+        assert cache.get('pl', None) is None
+        
+        # Fresh instance = another worker process sharing the same file
+        assert PlaylistCache(db_path=db_path).get('pl', 'snap-1')['name'] == 'A'
+    finally:
+        shutil.rmtree(temp_dir)
+
+def test_repeat_load_is_one_request():
+    """A repeat load of an unchanged playlist costs only the snapshot_id request"""
+    # Keep the app off the tracked src/database/app.db
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    os.environ.setdefault('JOB_STORE', 'memory')
+    from src.main import app
+    import src.routes.spotify as spotify
+    
+    temp_dir = tempfile.mkdtemp()
+    original_cache = spotify.playlist_cache
+    original_client = spotify._sp, spotify._sp_initialized
+    try:
+        sp = FakeSpotify()
+        spotify.playlist_cache = PlaylistCache(db_path=os.path.join(temp_dir, 'playlist_cache.db'))
+        spotify._sp, spotify._sp_initialized = sp, True
+        client = app.test_client()
+        body = {'playlist_url': 'https://open.spotify.com/playlist/abc'}
+        
+        first = client.post('/api/spotify/playlist', json=body).get_json()
+        assert first['total_tracks'] == 1000
+        assert len(sp.calls) == 10  # metadata with first page + 9 pages, no snapshot check on a first load
+        
+        sp.calls.clear()
+        assert client.post('/api/spotify/playlist', json=body).get_json() == first
+        assert sp.calls == ['playlist']
+        
+        # A changed playlist has a new snapshot and is loaded again
+        sp.snapshot_id = 'snap-2'
+        sp.total = 1001
+        sp.calls.clear()
+        assert client.post('/api/spotify/playlist', json=body).get_json()['total_tracks'] == 1001
+        assert len(sp.calls) == 12
+    finally:
+        spotify.playlist_cache = original_cache
+        spotify._sp, spotify._sp_initialized = original_client
+        shutil.rmtree(temp_dir)
+
+if __name__ == "__main__":
+    test_cache_keys_and_persistence()
+    test_repeat_load_is_one_request()
+    print("✅ Playlist cache tests passed")
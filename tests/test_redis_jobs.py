@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Test the Redis job store and queue against an in-process fake Redis
+
+Requires fakeredis: pip install fakeredis
+"""
+import sys
+import threading
+from datetime import datetime, timedelta
+import pytest
+from src.utils.redis_jobs import RedisJobStore, RedisJobQueue, RedisJobEventLog
+
+fakeredis = pytest.importorskip('fakeredis')
+
+def make_job():
+    return {
+        'status': 'queued',
+        'playlist_name': 'Test Playlist',
+        'total_tracks': 2,
+        'completed_tracks': 0,
+        'failed_tracks': 0,
+        'current_track': None,
+        'download_url': None,
+        'created_at': datetime.now(),
+        'tracks': [{'name': 'Song A', 'artists': ['Artist']}, {'name': 'Song B', 'artists': ['Artist']}],
+        'temp_dir': None,
+        'zip_path': None,
+        'error': None,
+        'failed_track_list': [],
+        'completed_track_list': []
+    }
+
+def test_web_and_worker_share_jobs():
+    """The web tier enqueues, a worker claims and reports per-track progress"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    web = RedisJobStore(client, flush_interval=60)
+    worker = RedisJobStore(client, flush_interval=60)
+    queue = RedisJobQueue(client, max_queued_jobs=2)
+    
+    web['job-1'] = make_job()
+    web['job-2'] = make_job()
+    assert queue.enqueue('job-1') == 1
+    assert queue.enqueue('job-2') == 2
+    assert queue.position('job-2') == 2
+    assert queue.is_full()
+    
+    # Worker takes the oldest job first
+    job_id = queue.dequeue(timeout=1)
+    assert job_id == 'job-1'
+    assert queue.position('job-2') == 1
+    
+    job = worker.claim(job_id)
+    assert job['tracks'][1]['name'] == 'Song B'
+    job['status'] = 'processing'
+    worker.save(job_id, flush=True)
+    
+    job['completed_tracks'] += 1
+    job['completed_track_list'].append({'index': 1, 'name': 'Song B', 'artists': ['Artist'], 'status': 'success'})
+    job['failed_tracks'] += 1
+    job['failed_track_list'].append({'index': 0, 'name': 'Song A', 'artists': ['Artist'],
+                                     'reason': 'No videos found', 'status': 'failed'})
+    worker.save(job_id)
+    worker.flush()
+    
+    status = web['job-1']
+    assert status['status'] == 'processing'
+    assert status['completed_tracks'] == 1
+    assert [t['name'] for t in status['completed_track_list']] == ['Song B']
+    assert [t['reason'] for t in status['failed_track_list']] == ['No videos found']
+    assert client.hlen('nasmytunes:job:job-1:progress') == 2
+
+def test_status_reads_skip_track_entries():
+    """A status poll reads the job hash only; track changes after a cursor come from a range query"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    web = RedisJobStore(client, flush_interval=60)
+    worker = RedisJobStore(client, flush_interval=60)
+    
+    web['job-1'] = make_job()
+    job = worker.claim('job-1')
+    job['completed_tracks'] += 1
+    job['completed_track_list'].append({'index': 0, 'name': 'Song A', 'status': 'success', 'seq': 3})
+    job['failed_tracks'] += 1
+    job['failed_track_list'].append({'index': 1, 'name': 'Song B', 'status': 'failed', 'seq': 5})
+    job['change_seq'] = 5
+    worker.save('job-1', flush=True)
+    
+    summary = web.summary('job-1')
+    assert (summary['completed_tracks'], summary['failed_tracks'], summary['change_seq']) == (1, 1, 5)
+    assert 'completed_track_list' not in summary and 'tracks' not in summary
+    
+    completed, failed = web.track_lists('job-1')
+    assert [t['name'] for t in completed] == ['Song A'] and [t['name'] for t in failed] == ['Song B']
+    assert web.track_lists('job-1', since=3) == ([], failed)
+    assert web.track_lists('job-1', since=5) == ([], [])
+    
+    with pytest.raises(KeyError):
+        web.summary('missing')
+    
+    # The finished job is no longer live in the worker; later updates still reach Redis
+    job['status'] = 'completed'
+    worker.save('job-1', flush=True)
+    worker.update('job-1', downloaded_at=123.0, error=None)
+    assert web.summary('job-1')['downloaded_at'] == 123.0
+    assert web.summary('job-1')['change_seq'] == 5
+
+def test_flush_while_workers_change_jobs():
+    """Jobs are copied under the workers' lock, so keys added mid-write never break a flush"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    job_lock = threading.RLock()
+    store = RedisJobStore(client, flush_interval=60, job_lock=job_lock)
+    store['job-1'] = make_job()
+    job = store.claim('job-1')
+    
+    stop = threading.Event()
+    
+    def worker():
+        i = 0
+        while not stop.is_set():
+            with job_lock:
+                job[f'extra_{i % 50}'] = i
+                if i % 50 == 49:
+                    for key in [key for key in job if key.startswith('extra_')]:
+                        del job[key]
+            i += 1
+    
+    # Switch threads as often as possible so the worker runs in the middle of writes
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=worker)
+    thread.start()
+    try:
+        for _ in range(200):
+            store.save('job-1')
+            store.flush()
+    finally:
+        stop.set()
+        thread.join()
+        sys.setswitchinterval(switch_interval)
+    assert store.summary('job-1')['status'] == 'queued'
+
+def test_expired_jobs_and_delete():
+    """Expired jobs are found through the created_at index"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    store = RedisJobStore(client, flush_interval=60)
+    
+    old_job = make_job()
+    old_job['created_at'] = datetime.now() - timedelta(days=2)
+    store['old'] = old_job
+    store['new'] = make_job()
+    
+    assert store.expired_job_ids(datetime.now() - timedelta(days=1)) == ['old']
+    del store['old']
+    assert 'old' not in store
+    assert store.expired_job_ids(datetime.now() - timedelta(days=1)) == []
+
+def test_event_log_shared_between_processes():
+    """Events published by a worker are read by the web tier after a cursor"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    worker = RedisJobEventLog(client)
+    web = RedisJobEventLog(client, poll_interval=0.05)
+    
+    assert web.wait('job-1', 0, timeout=0.1) == []
+    worker.publish('job-1', 'track', event='started', index=0)
+    worker.publish('job-1', 'track', event='completed', index=0)
+    
+    events = web.since('job-1', 1)
+    assert [(e['seq'], e['event']) for e in events] == [(2, 'completed')]
+    assert web.last_seq('job-1') == 2
+    
+    web.discard('job-1')
+    assert web.since('job-1') == []
+
+if __name__ == "__main__":
+    test_web_and_worker_share_jobs()
+    test_status_reads_skip_track_entries()
+    test_flush_while_workers_change_jobs()
+    test_expired_jobs_and_delete()
+    test_event_log_shared_between_processes()
+    print("✅ Redis job tests passed")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test the shared track -> YouTube search cache
+"""
+import os
+import tempfile
+import time
+from src.utils.search_cache import SearchCache, track_cache_key
+
+VIDEOS = [
+    {'id': 'aaa', 'title': 'Song (Official Video)', 'duration': '3:33'},
+    {'id': 'bbb', 'title': 'Song (Audio)', 'duration': '3:31'},
+]
+
+def test_key_normalization():
+    """Equivalent track metadata maps to the same key"""
+    assert track_cache_key("Song (feat. Someone)", ["B", "A"], 213000) == \
+        track_cache_key("song", ["a", "b"], 214000)
+    assert track_cache_key("Song", ["A"], 213000) != track_cache_key("Song", ["A"], 260000)
+
+def test_search_runs_once_and_persists():
+    """Repeated lookups hit memory, a new process hits the disk tier"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'search_cache.db')
+        cache = SearchCache(db_path=db_path)
+        calls = []
+        
+        def search():
+            calls.append(1)
+            return list(VIDEOS)
+        
+        for _ in range(3):
+            assert cache.get_or_search("Song", ["Artist"], 213000, search) == VIDEOS
+        assert len(calls) == 1
+        
+        cache.record_choice("Song", ["Artist"], VIDEOS[1], 213000)
+        
+        # Fresh instance = another worker process sharing the same file
+        other = SearchCache(db_path=db_path)
+        entry = other.get("Song", ["Artist"], 213000)
+        assert entry['video_id'] == 'bbb'
+        assert [v['id'] for v in entry['candidates']] == ['bbb', 'aaa']
+        
+        stats = cache.stats()
+        print(f"   Stats: {stats}")
+        assert stats['memory_hits'] == 2 and stats['misses'] == 1
+        assert other.stats()['disk_hits'] == 1
+
+def test_ttl_and_lru_eviction():
+    """Expired entries miss and the memory tier stays bounded"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = SearchCache(ttl=1, max_memory_entries=2, db_path=os.path.join(temp_dir, 'cache.db'))
+        for i in range(3):
+            cache.get_or_search(f"Song {i}", ["Artist"], None, lambda: list(VIDEOS))
+        assert cache.stats()['memory_entries'] == 2
+        
+        time.sleep(1.1)
+        assert cache.get("Song 2", ["Artist"]) is None
+
+if __name__ == "__main__":
+    test_key_normalization()
+    test_search_runs_once_and_persists()
+    test_ttl_and_lru_eviction()
+    print("✅ Search cache tests passed")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test playlist loading: field filtering, page offsets and concurrent page fetches in playlist order
+"""
+import threading
+import time
+from src.utils.spotify_loader import (
+    PAGE_SIZE, TRACKS_BATCH_SIZE, fetch_tracks, load_playlist, page_offsets, release_year, track_summary
+)
+
+class FakeSpotify:
+    """Serves a playlist of ``total`` tracks; every 7th item is a podcast episode"""
+
+    def __init__(self, total, latency=0.02):
+        self.total = total
+        self.latency = latency
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def item(self, index):
+        kind = 'episode' if index % 7 == 6 else 'track'
+        return {'track': {'id': f'id{index}', 'name': f'Song {index}', 'type': kind,
+                          'duration_ms': 180000, 'preview_url': None, 'artists': [{'name': 'Artist'}]}}
+
+    def page(self, offset, limit):
+        return [self.item(index) for index in range(offset, min(offset + limit, self.total))]
+
+    def playlist(self, playlist_id, fields=None, additional_types=None):
+        self.calls.append(('playlist', fields))
+        return {'id': playlist_id, 'name': 'Big Playlist', 'description': '', 'public': True,
+                'tracks': {'total': self.total, 'items': self.page(0, PAGE_SIZE)}}
+
+    def tracks(self, track_ids):
+        with self.lock:
+            self.calls.append(('tracks', len(track_ids)))
+        assert len(track_ids) <= TRACKS_BATCH_SIZE
+        return {'tracks': [self.item(int(track_id[2:]))['track'] if track_id.startswith('id') else None
+                           for track_id in track_ids]}
+
+    def playlist_items(self, playlist_id, fields=None, limit=100, offset=0, additional_types=None):
+        with self.lock:
+            self.calls.append(('playlist_items', offset))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+        return {'items': self.page(offset, limit)}
+
+def test_page_offsets():
+    assert page_offsets(0) == []
+    assert page_offsets(100) == []
+    assert page_offsets(101) == [100]
+    assert page_offsets(5000)[-1] == 4900
+    assert len(page_offsets(5000)) == 49
+
+def test_load_playlist_order_and_concurrency():
+    """Pages are fetched in parallel, but tracks come back in playlist order"""
+    sp = FakeSpotify(1234)
+    started = time.time()
+    playlist, tracks = load_playlist(sp, 'abc', workers=8)
+    elapsed = time.time() - started
+    
+    expected = [f'Song {index}' for index in range(1234) if index % 7 != 6]
+    assert [track['name'] for track in tracks] == expected
+    assert playlist['name'] == 'Big Playlist'
+    
+    # One filtered metadata request (with the first page), then one request per remaining page
+    assert sp.calls[0][0] == 'playlist' and 'tracks(total,items(' in sp.calls[0][1]
+    assert sorted(offset for kind, offset in sp.calls[1:]) == list(range(100, 1234, 100))
+    assert 1 < sp.max_in_flight <= 8
+    # 12 pages at 20ms each would take 240ms one after another
+    assert elapsed < 0.2, f"{elapsed:.3f}s"
+
+def test_small_playlist_single_request():
+    sp = FakeSpotify(42)
+    _, tracks = load_playlist(sp, 'abc')
+    assert len(sp.calls) == 1
+    assert len(tracks) == 36
+
+def test_track_summary():
+    track = {'id': 'x', 'name': 'Song', 'duration_ms': 1000, 'preview_url': None,
+             'artists': [{'name': 'A'}, {'name': 'B'}],
+             'album': {'name': 'Album', 'release_date': '1999-03'}, 'external_ids': {'isrc': 'USABC9900001'}}
+    summary = track_summary(track)
+    assert summary['artists'] == ['A', 'B']
+    assert (summary['album'], summary['year'], summary['isrc']) == ('Album', 1999, 'USABC9900001')
+    
+    # Local files have no album date or ISRC
+    summary = track_summary(dict(track, album={'name': None, 'release_date': None}, external_ids={}))
+    assert summary['year'] is None and summary['isrc'] is None
+    assert release_year('0000') == 0 and release_year('') is None
+
+def test_fetch_tracks_batches():
+    """Track lookups go through the batched endpoint, 50 ids per request, in the order given"""
+    sp = FakeSpotify(0)
+    track_ids = [f'id{index}' for index in range(120)] + ['missing', 'id3']
+    tracks = fetch_tracks(sp, track_ids)
+    
+    assert [track and track['id'] for track in tracks] == [f'id{index}' for index in range(120)] + [None, 'id3']
+    assert sorted(size for kind, size in sp.calls) == [21, 50, 50]
+    assert fetch_tracks(sp, []) == []
+
+if __name__ == "__main__":
+    test_page_offsets()
+    test_load_playlist_order_and_concurrency()
+    test_small_playlist_single_request()
+    test_track_summary()
+    test_fetch_tracks_batches()
+    print("✅ Spotify loader tests passed")
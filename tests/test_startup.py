@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test cold start of the Flask app: heavy dependencies stay unloaded until used,
+and the first /health response arrives within the startup budget
+"""
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Time from interpreter start to the first /health response (override with STARTUP_BUDGET_MS)
+HEALTH_BUDGET_MS = int(os.getenv('STARTUP_BUDGET_MS', '1500'))
+
+# Only needed once a conversion or Spotify request runs
+LAZY_MODULES = [
+    'yt_dlp',
+    'spotipy',
+    'youtube_search',
+    'src.utils.simple_bypass',
+    'src.utils.advanced_youtube_bypass',
+    'src.utils.authenticated_bypass',
+    'src.utils.youtube_downloader',
+]
+
+FIRST_HEALTH_SCRIPT = """
+import time
+start = time.perf_counter()
+import src.main
+response = src.main.app.test_client().get('/health')
+print(response.status_code, (time.perf_counter() - start) * 1000)
+"""
+
+def run_app_python(args):
+    """Run Python against a fresh import of the app, leaving the tracked database untouched"""
+    db_path = os.path.join(PROJECT_ROOT, 'src', 'database', 'app.db')
+    with open(db_path, 'rb') as f:
+        db_snapshot = f.read()
+    
+    env = dict(os.environ, JOB_STORE='memory')
+    try:
+        return subprocess.run([sys.executable] + args, cwd=PROJECT_ROOT, env=env,
+                              capture_output=True, text=True, timeout=120)
+    finally:
+        with open(db_path, 'wb') as f:
+            f.write(db_snapshot)
+
+def import_times():
+    """Cumulative import time in microseconds of every module loaded by ``import src.main``"""
+    result = run_app_python(['-X', 'importtime', '-c', 'import src.main'])
+    assert result.returncode == 0, result.stderr[-500:]
+    
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line.split('|')
+        times[module.strip()] = int(cumulative)
+    return times
+
+def test_heavy_modules_are_lazy():
+    """Downloaders, yt-dlp and spotipy are not imported at startup"""
+    times = import_times()
+    assert 'src.main' in times
+    
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:10]
+    print(f"\nimport src.main: {times['src.main'] / 1000:.0f}ms")
+    for module, cumulative in slowest:
+        print(f"  {cumulative / 1000:7.1f}ms  {module}")
+    
+    loaded = [module for module in LAZY_MODULES if module in times]
+    assert loaded == [], f"imported at startup: {loaded}"
+
+def test_time_to_first_health():
+    """A fresh process serves /health within the budget"""
+    result = run_app_python(['-c', FIRST_HEALTH_SCRIPT])
+    assert result.returncode == 0, result.stderr[-500:]
+    
+    status, elapsed_ms = result.stdout.strip().splitlines()[-1].split()
+    print(f"\nfirst /health: {float(elapsed_ms):.0f}ms (budget {HEALTH_BUDGET_MS}ms)")
+    assert status == '200'
+    assert float(elapsed_ms) < HEALTH_BUDGET_MS
+
+if __name__ == "__main__":
+    test_heavy_modules_are_lazy()
+    test_time_to_first_health()
+    print("✅ Startup tests passed")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test adaptive strategy ordering, per-strategy stats and failure cool-downs
+"""
+import time
+from src.utils.strategy_runner import StrategyRunner
+
+def make_strategy(calls, name, results, delay=0):
+    """A strategy returning the next value of ``results`` (True/False/Exception) on each call"""
+    results = iter(results)
+    
+    def strategy():
+        calls.append(name)
+        if delay:
+            time.sleep(delay)
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result, f"{name} {'ok' if result else 'failed'}"
+    return strategy
+
+def test_first_success_wins():
+    runner = StrategyRunner(failure_threshold=5, cooldown=60)
+    calls = []
+    strategies = [('auth', make_strategy(calls, 'auth', [False])),
+                  ('simple', make_strategy(calls, 'simple', [True])),
+                  ('advanced', make_strategy(calls, 'advanced', [True]))]
+    
+    assert runner.run(strategies) == ('simple', True, 'simple ok')
+    assert calls == ['auth', 'simple']
+    
+    stats = runner.stats()
+    assert stats['auth']['failures'] == 1 and stats['simple']['successes'] == 1
+    assert stats['advanced']['attempts'] == 0
+
+def test_order_adapts_to_success_and_latency():
+    """A slow, failing strategy drops behind a fast, working one"""
+    runner = StrategyRunner(failure_threshold=100, cooldown=60)
+    calls = []
+    strategies = [('auth', make_strategy(calls, 'auth', [False] * 10, delay=0.02)),
+                  ('simple', make_strategy(calls, 'simple', [True] * 10))]
+    
+    for _ in range(3):
+        assert runner.run(strategies)[0] == 'simple'
+    assert calls == ['auth', 'simple', 'simple', 'simple']
+    assert runner.order(['auth', 'simple']) == ['simple', 'auth']
+    
+    # A proven strategy stays ahead of an untried one; the untried one beats one that only fails
+    assert runner.order(['auth', 'advanced', 'simple']) == ['simple', 'advanced', 'auth']
+    
+    # Among working strategies the faster one goes first
+    runner.record('advanced', True, 5.0)
+    runner.record('simple', True, 0.0)
+    assert runner.order(['advanced', 'simple']) == ['simple', 'advanced']
+
+def test_cooldown_after_consecutive_failures():
+    runner = StrategyRunner(failure_threshold=2, cooldown=0.2)
+    calls = []
+    strategies = [('auth', make_strategy(calls, 'auth', [False, RuntimeError("blocked"), True])),
+                  ('simple', make_strategy(calls, 'simple', [False] * 10))]
+    
+    assert runner.run(strategies) == (None, False, 'simple failed')
+    assert runner.run(strategies)[:2] == (None, False)
+    
+    # Both reached two failures in a row: with everything cooling down they are probed anyway
+    assert runner.stats()['auth']['cooldowns'] == 1
+    assert sorted(runner.order(['auth', 'simple'])) == ['auth', 'simple']
+    
+    time.sleep(0.25)
+    assert runner.run(strategies)[0] == 'auth'
+    assert runner.stats()['auth']['successes'] == 1
+
+def test_cooling_strategy_is_skipped():
+    runner = StrategyRunner(failure_threshold=1, cooldown=60)
+    runner.record('auth', False, 1.0)
+    
+    assert runner.order(['auth', 'simple']) == ['simple']
+    assert runner.stats()['auth']['skipped'] == 1
+    assert runner.stats()['auth']['cooling_down_for'] > 0
+
+if __name__ == "__main__":
+    test_first_success_wins()
+    test_order_adapts_to_success_and_latency()
+    test_cooldown_after_consecutive_failures()
+    test_cooling_strategy_is_skipped()
+    print("✅ Strategy runner tests passed")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test per-track scratch directories and the atomic move into the job directory
+"""
+import os
+import shutil
+import tempfile
+from src.routes.conversion import TRACK_SCRATCH_DIR, create_track_dir, finalize_track_file
+
+def test_scratch_dirs_are_isolated():
+    """Every attempt gets its own directory under the job's scratch area"""
+    job_dir = tempfile.mkdtemp()
+    try:
+        first = create_track_dir(job_dir, 0)
+        retry = create_track_dir(job_dir, 0)
+        other = create_track_dir(job_dir, 1)
+        
+        assert len({first, retry, other}) == 3
+        for path in (first, retry, other):
+            assert os.path.dirname(path) == os.path.join(job_dir, TRACK_SCRATCH_DIR)
+        assert os.path.basename(other).startswith('0001_')
+    finally:
+        shutil.rmtree(job_dir)
+
+def test_finalize_moves_and_deduplicates():
+    """Finished files land in the job directory; a taken name gets the track number"""
+    job_dir = tempfile.mkdtemp()
+    job = {'temp_dir': job_dir}
+    context = {'claimed_files': set()}
+    try:
+        names = []
+        for index in (0, 4):
+            track_dir = create_track_dir(job_dir, index)
+            scratch_file = os.path.join(track_dir, 'Song - Artist.mp3')
+            with open(scratch_file, 'wb') as f:
+                f.write(f'track {index}'.encode())
+            
+            names.append(finalize_track_file(job, index, scratch_file, context))
+            assert not os.path.exists(scratch_file)
+            shutil.rmtree(track_dir)
+        
+        assert names == ['Song - Artist.mp3', 'Song - Artist (5).mp3']
+        assert context['claimed_files'] == set(names)
+        with open(os.path.join(job_dir, names[1]), 'rb') as f:
+            assert f.read() == b'track 4'
+        assert os.listdir(os.path.join(job_dir, TRACK_SCRATCH_DIR)) == []
+    finally:
+        shutil.rmtree(job_dir)
+
+if __name__ == "__main__":
+    test_scratch_dirs_are_isolated()
+    test_finalize_moves_and_deduplicates()
+    print("✅ Track directory tests passed")
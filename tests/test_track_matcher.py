@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the search result ranker and the early stop on a confident match
+"""
+from src.utils.track_matcher import distinct_album, parse_duration, rank_candidates, score_candidate, search_ranked
+
+TRACK = ("Blinding Lights", ["The Weeknd"], 200040)
+
+RESULTS = [
+    {'id': 'cover', 'title': 'Blinding Lights - The Weeknd (Piano Cover)', 'channel': 'Piano Guy', 'duration': '3:21'},
+    {'id': 'live', 'title': 'The Weeknd - Blinding Lights (Live at the Grammys)', 'channel': 'Recording Academy', 'duration': '4:50'},
+    {'id': 'topic', 'title': 'Blinding Lights', 'channel': 'The Weeknd - Topic', 'duration': '3:20'},
+    {'id': 'unrelated', 'title': 'Top 10 songs of 2020', 'channel': 'Charts', 'duration': '12:03'},
+    {'id': 'official', 'title': 'The Weeknd - Blinding Lights (Official Video)', 'channel': 'TheWeekndVEVO', 'duration': '4:22'},
+]
+
+def test_parse_duration():
+    assert parse_duration('3:33') == 213
+    assert parse_duration('1:02:03') == 3723
+    assert parse_duration(0) is None
+    assert parse_duration('LIVE') is None
+
+def test_ranking():
+    """The studio recording beats the music video, covers, live versions and unrelated videos"""
+    ranked = rank_candidates(RESULTS + RESULTS[:1], *TRACK)
+    
+    assert [candidate['id'] for candidate in ranked][:2] == ['topic', 'official']
+    assert ranked[-1]['id'] == 'unrelated'
+    assert len(ranked) == len(RESULTS)
+    assert ranked[0]['match_score'] >= 0.9
+    
+    # "Live" or "Remix" only counts against a video when the Spotify title lacks it
+    live = {'id': 'x', 'title': 'Song (Live)', 'channel': 'Band - Topic', 'duration': '3:00'}
+    assert score_candidate(live, "Song - Live", ["Band"], 180000) > score_candidate(live, "Song", ["Band"], 180000)
+
+def test_album_and_year_break_ties():
+    """A Topic upload naming the album and release year beats a re-release of the same song"""
+    single = {'id': 'single', 'title': 'Blinding Lights', 'channel': 'The Weeknd - Topic', 'duration': '3:20',
+              'long_desc': 'Provided to YouTube by Republic Records Blinding Lights · The Weeknd Blinding Lights ℗ 2019'}
+    album = {'id': 'album', 'title': 'Blinding Lights', 'channel': 'The Weeknd - Topic', 'duration': '3:20',
+             'long_desc': 'Provided to YouTube by Republic Records Blinding Lights · The Weeknd After Hours ℗ 2020'}
+    
+    ranked = rank_candidates([single, album], *TRACK, album='After Hours', year=2020)
+    assert [candidate['id'] for candidate in ranked] == ['album', 'single']
+    
+    # Below the cap the album and year add to the score
+    upload = dict(album, id='upload', channel='Music Uploads')
+    assert score_candidate(upload, *TRACK, album='After Hours', year=2020) > score_candidate(upload, *TRACK)
+    
+    # Without album metadata both score the same, as before
+    assert score_candidate(single, *TRACK) == score_candidate(album, *TRACK)
+    # A single's album is named after the track, which says nothing
+    assert distinct_album('Blinding Lights', 'Blinding Lights') is None
+    assert distinct_album('After Hours', 'Blinding Lights') == 'After Hours'
+
+def test_search_stops_at_confident_match():
+    queries = []
+    
+    def search(query):
+        queries.append(query)
+        return RESULTS if len(queries) == 1 else []
+    
+    ranked = search_ranked(['q1', 'q2', 'q3'], search, *TRACK, threshold=0.75)
+    assert queries == ['q1']
+    assert ranked[0]['id'] == 'topic'
+
+def test_search_falls_back_when_unconvincing():
+    queries = []
+    pauses = []
+    
+    def search(query):
+        queries.append(query)
+        if query == 'q1':
+            raise RuntimeError("rate limited")
+        return RESULTS[3:4] if query == 'q2' else RESULTS[2:3]
+    
+    ranked = search_ranked(['q1', 'q2', 'q3'], search, *TRACK, threshold=0.75,
+                           between_queries=lambda: pauses.append(1))
+    assert queries == ['q1', 'q2', 'q3']
+    assert len(pauses) == 2
+    assert [candidate['id'] for candidate in ranked] == ['topic', 'unrelated']
+
+if __name__ == "__main__":
+    test_parse_duration()
+    test_ranking()
+    test_album_and_year_break_ties()
+    test_search_stops_at_confident_match()
+    test_search_falls_back_when_unconvincing()
+    print("✅ Track matcher tests passed")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test the transcode stage of the conversion pipeline
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import pytest
+from src.utils.transcoder import TranscodePool, first_audio_output, is_audio_output, transcode_to_mp3
+
+def test_audio_output_detection():
+    """Raw audio only counts as output when transcoding is left to the caller"""
+    assert is_audio_output('Song - Artist.mp3')
+    assert not is_audio_output('Song - Artist.webm')
+    assert is_audio_output('Song - Artist.webm', extract_audio=False)
+    assert not is_audio_output('Song - Artist.webm.part', extract_audio=False)
+
+def test_first_audio_output():
+    """Reported download paths are taken as-is when the file exists and is finished output"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        raw = os.path.join(temp_dir, 'Song - Artist.webm')
+        with open(raw, 'wb') as f:
+            f.write(b'raw')
+        missing = os.path.join(temp_dir, 'Song - Artist.mp3')
+        
+        assert first_audio_output([missing, raw]) is None
+        assert first_audio_output([missing, raw], extract_audio=False) == raw
+        assert first_audio_output([]) is None
+
+def test_pool_backpressure():
+    """Submitting blocks while the bounded queue is full, and every callback runs"""
+    release = threading.Event()
+    results = []
+    
+    def slow_transcode(src_path, dest_path, bitrate):
+        release.wait(5)
+        if src_path == 'bad':
+            raise RuntimeError('encoder error')
+    
+    pool = TranscodePool(workers=1, max_pending=1, transcode_fn=slow_transcode)
+    pool.submit('a', 'a.mp3', '128', lambda dest, error: results.append((dest, error)))
+    time.sleep(0.1)  # worker picks up 'a' and blocks
+    pool.submit('bad', 'bad.mp3', '128', lambda dest, error: results.append((dest, error)))
+    
+    # Queue is full: a third submit waits until the worker frees a place
+    third = threading.Thread(target=pool.submit,
+                             args=('c', 'c.mp3', '128', lambda dest, error: results.append((dest, error))))
+    third.start()
+    time.sleep(0.2)
+    assert third.is_alive()
+    
+    release.set()
+    third.join(5)
+    pool._queue.join()
+    assert results == [('a.mp3', None), ('bad.mp3', 'encoder error'), ('c.mp3', None)]
+    assert pool.stats()['failed'] == 1
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='ffmpeg not installed')
+def test_transcode_with_ffmpeg():
+    """A short generated clip is encoded to MP3 and the raw file removed"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        src_path = os.path.join(temp_dir, 'Song - Artist.m4a')
+        subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', 'sine=duration=1',
+                        '-c:a', 'aac', src_path], check=True)
+        dest_path = transcode_to_mp3(src_path, os.path.join(temp_dir, 'Song - Artist.mp3'), '128')
+        assert os.path.getsize(dest_path) > 0
+        assert not os.path.exists(src_path)
+
+if __name__ == "__main__":
+    test_audio_output_detection()
+    test_first_audio_output()
+    test_pool_backpressure()
+    if shutil.which('ffmpeg'):
+        test_transcode_with_ffmpeg()
+    print("✅ Transcoder tests passed")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test reuse of yt-dlp instances across tracks, with a setup-cost benchmark
+"""
+import os
+import time
+import yt_dlp
+from src.utils.authenticated_bypass import AuthenticatedBypass
+from src.utils.simple_bypass import SimpleBypass
+from src.utils.ydl_pool import PooledYoutubeDL, YDLPool, downloaded_files
+
+def fake_download(pooled, seen):
+    """Record what a download would have used instead of hitting the network"""
+    def extract_info(url, download=True):
+        outtmpl = pooled.ydl.params['outtmpl']['default']
+        seen.append((url, outtmpl, pooled.ydl.params['format']))
+        # Info dict as yt-dlp returns it after FFmpegExtractAudio
+        return {'id': url, 'requested_downloads': [{'filepath': outtmpl.replace('%(ext)s', 'mp3')}]}
+    pooled.ydl.extract_info = extract_info
+
+def test_overrides_apply_per_download():
+    """Output template and format change per call without rebuilding the instance"""
+    pooled = PooledYoutubeDL({'format': 'bestaudio/best', 'outtmpl': 'first.%(ext)s', 'quiet': True})
+    seen = []
+    fake_download(pooled, seen)
+    
+    assert pooled.download(['a'], outtmpl='/tmp/one.%(ext)s') == ['/tmp/one.mp3']
+    assert pooled.download(['b'], outtmpl='/tmp/two.%(ext)s', format='worstaudio') == ['/tmp/two.mp3']
+    pooled.download(['c'])
+    
+    assert seen == [
+        ('a', '/tmp/one.%(ext)s', 'bestaudio/best'),
+        ('b', '/tmp/two.%(ext)s', 'worstaudio'),
+        ('c', '/tmp/two.%(ext)s', 'bestaudio/best'),
+    ]
+    assert set(pooled._format_selectors) == {'bestaudio/best', 'worstaudio'}
+
+def test_downloaded_files():
+    """Final paths come from the info dict; failed downloads report nothing"""
+    assert downloaded_files(None) == []
+    assert downloaded_files({'id': 'x'}) == []
+    assert downloaded_files({'requested_downloads': [{'filepath': '/tmp/a.mp3'}, {}]}) == ['/tmp/a.mp3']
+
+def test_hooks_added_later_are_called():
+    """Hooks appended to the caller's list after creation still receive events"""
+    calls = []
+    hooks = [lambda d: calls.append(('first', d['status']))]
+    pooled = PooledYoutubeDL({'quiet': True, 'progress_hooks': hooks})
+    hooks.append(lambda d: calls.append(('second', d['status'])))
+    
+    for hook in pooled.ydl._progress_hooks:
+        hook({'status': 'finished'})
+    
+    assert calls == [('first', 'finished'), ('second', 'finished')]
+
+def test_pool_reuses_per_profile():
+    """The options factory only runs once per profile"""
+    pool = YDLPool()
+    factory_calls = []
+    
+    def factory():
+        factory_calls.append(1)
+        return {'quiet': True}
+    
+    seen = []
+    original_download = PooledYoutubeDL.download
+    PooledYoutubeDL.download = lambda self, urls, outtmpl=None, format=None: seen.append((id(self), urls))
+    try:
+        for profile in ('simple', 'simple', 'other', 'simple'):
+            pool.download(profile, factory, ['x'])
+    finally:
+        PooledYoutubeDL.download = original_download
+    
+    assert len(factory_calls) == 2
+    assert len({instance for instance, _ in seen}) == 2
+    assert pool.counters == {'created': 2, 'reused': 2}
+    pool.close()
+    assert pool._instances == {}
+
+def test_close_removes_generated_cookie_files():
+    """Cookie files created for pooled instances are deleted once the pool is closed"""
+    bypass = AuthenticatedBypass()
+    cookie_files = []
+    
+    def factory():
+        cookie_files.append(bypass.create_realistic_cookies())
+        return {'quiet': True, 'cookiefile': cookie_files[-1]}
+    
+    pool = YDLPool(temp_file_options=('cookiefile',))
+    original_download = PooledYoutubeDL.download
+    PooledYoutubeDL.download = lambda self, urls, outtmpl=None, format=None: []
+    try:
+        pool.download('auth', factory, ['x'])
+        pool.download('auth', factory, ['y'])
+    finally:
+        PooledYoutubeDL.download = original_download
+    
+    assert len(cookie_files) == 1 and os.path.exists(cookie_files[0])
+    pool.close()
+    assert not os.path.exists(cookie_files[0])
+    
+    # The authenticated downloader's own pool owns the cookie files it generates
+    assert bypass.ydl_pool.temp_file_options == ('cookiefile',)
+    bypass.cleanup()
+
+def test_setup_overhead_benchmark():
+    """Per-track setup: a fresh YoutubeDL per attempt vs. one pooled instance"""
+    bypass = SimpleBypass()
+    tracks = 20
+    
+    start = time.perf_counter()
+    for i in range(tracks):
+        opts = bypass.get_simple_opts('/tmp', f'track {i}')
+        ydl = yt_dlp.YoutubeDL(opts)
+        ydl.close()
+    per_attempt = time.perf_counter() - start
+    
+    pooled = PooledYoutubeDL(bypass.get_simple_opts('/tmp', 'track 0'))
+    fake_download(pooled, [])
+    start = time.perf_counter()
+    for i in range(tracks):
+        pooled.download(['x'], outtmpl=f'/tmp/track {i}.%(ext)s')
+    reused = time.perf_counter() - start
+    pooled.close()
+    
+    print(f"\n{tracks} tracks: new instance per attempt {per_attempt * 1000:.1f}ms, "
+          f"pooled {reused * 1000:.1f}ms")
+    assert reused < per_attempt
+
+if __name__ == "__main__":
+    test_overrides_apply_per_download()
+    test_downloaded_files()
+    test_hooks_added_later_are_called()
+    test_pool_reuses_per_profile()
+    test_close_removes_generated_cookie_files()
+    test_setup_overhead_benchmark()
+    print("✅ yt-dlp pool tests passed")
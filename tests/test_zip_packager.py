@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test ZIP packaging of converted tracks
+"""
+import io
+import os
+import tempfile
+import time
+import zipfile
+from src.utils.zip_packager import IncrementalZipPackager, stream_zip, write_zip, compression_for, CHUNK_SIZE
+
+def make_entries(temp_dir, count=3, size=CHUNK_SIZE + 123):
+    entries = []
+    for i in range(count):
+        path = os.path.join(temp_dir, f'Song {i} - Artist.mp3')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        entries.append((os.path.basename(path), path))
+    entries.append(('CONVERSION_REPORT.txt', 'Report ✅\n'.encode('utf-8')))
+    return entries
+
+def check_archive(data, entries):
+    with zipfile.ZipFile(io.BytesIO(data)) as zipf:
+        assert zipf.testzip() is None
+        assert zipf.namelist() == [name for name, _ in entries]
+        for name, source in entries:
+            expected = source if isinstance(source, bytes) else open(source, 'rb').read()
+            assert zipf.read(name) == expected
+
+def test_stream_matches_entries():
+    """The streamed archive is valid and yields data before the last file is read"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        entries = make_entries(temp_dir)
+        chunks = stream_zip(entries)
+        
+        first = next(chunks)
+        assert first.startswith(b'PK\x03\x04')
+        data = first + b''.join(chunks)
+        print(f"   Streamed {len(data)} bytes")
+        check_archive(data, entries)
+
+def test_write_zip():
+    """The on-disk archive has the same entries"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        entries = make_entries(temp_dir, count=2, size=1000)
+        zip_path = write_zip(os.path.join(temp_dir, 'playlist.zip'), entries)
+        with open(zip_path, 'rb') as f:
+            check_archive(f.read(), entries)
+
+def test_incremental_packager():
+    """Tracks appended as they finish end up in track order with the report"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        entries = make_entries(temp_dir, count=3, size=1000)
+        packager = IncrementalZipPackager(os.path.join(temp_dir, 'playlist.zip'))
+        
+        # Tracks finish out of order, and a retry must not duplicate an entry
+        for arcname, source in (entries[2], entries[0], entries[2]):
+            packager.add(arcname, source)
+        
+        zip_path = packager.finalize(entries)
+        packager.close()
+        with open(zip_path, 'rb') as f:
+            check_archive(f.read(), entries)
+
+def test_compression_per_entry():
+    """Audio is stored, the report is deflated"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        entries = make_entries(temp_dir, count=1, size=1000)
+        with zipfile.ZipFile(io.BytesIO(b''.join(stream_zip(entries)))) as zipf:
+            methods = {info.filename: info.compress_type for info in zipf.infolist()}
+        assert methods == {
+            'Song 0 - Artist.mp3': zipfile.ZIP_STORED,
+            'CONVERSION_REPORT.txt': zipfile.ZIP_DEFLATED,
+        }
+        assert compression_for('song.M4A') == zipfile.ZIP_STORED
+
+def test_store_benchmark():
+    """Storing 500 audio files costs far less CPU than deflating them"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Random bytes compress about as well as MP3 frames do: not at all
+        entries = make_entries(temp_dir, count=500, size=32 * 1024)
+        
+        start = time.process_time()
+        with zipfile.ZipFile(os.path.join(temp_dir, 'deflated.zip'), 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for name, source in entries:
+                if isinstance(source, bytes):
+                    zipf.writestr(name, source)
+                else:
+                    zipf.write(source, name)
+        deflate_time = time.process_time() - start
+        
+        start = time.process_time()
+        write_zip(os.path.join(temp_dir, 'stored.zip'), entries)
+        store_time = time.process_time() - start
+        
+        deflated_size = os.path.getsize(os.path.join(temp_dir, 'deflated.zip'))
+        stored_size = os.path.getsize(os.path.join(temp_dir, 'stored.zip'))
+        print(f"   Deflate: {deflate_time:.3f}s CPU, {deflated_size} bytes")
+        print(f"   Store:   {store_time:.3f}s CPU, {stored_size} bytes")
+        
+        assert store_time < deflate_time / 2
+        assert stored_size <= deflated_size * 1.01
+
+if __name__ == "__main__":
+    test_stream_matches_entries()
+    test_write_zip()
+    test_incremental_packager()
+    test_compression_per_entry()
+    test_store_benchmark()
+    print("✅ ZIP packager tests passed")